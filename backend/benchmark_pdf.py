@@ -0,0 +1,73 @@
+"""
+Benchmark serial vs parallel PDF text extraction.
+Usage: python benchmark_pdf.py path/to/file.pdf [runs]
+"""
+import sys
+import time
+
+from services.pdf_service import extract_pdf_pages, get_pdf_workers, shutdown_pdf_pool
+
+
+def print_header(text):
+    """Print a formatted header."""
+    print("\n" + "=" * 60)
+    print(f"  {text}")
+    print("=" * 60 + "\n")
+
+
+def time_extraction(pdf_content: bytes, parallel: bool, runs: int):
+    """
+    Run an extraction mode several times.
+
+    Returns:
+        Tuple of (best time in seconds, extraction result)
+    """
+    best = None
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = extract_pdf_pages(pdf_content, parallel=parallel)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    """Compare both extraction paths on one file."""
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+
+    path = sys.argv[1]
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    with open(path, "rb") as f:
+        pdf_content = f.read()
+
+    print_header(f"PDF Extraction Benchmark: {path}")
+    print(f"File size: {len(pdf_content) / 1024 / 1024:.2f} MB")
+    print(f"Worker processes: {get_pdf_workers()}")
+    print(f"Runs per mode: {runs} (best time reported)")
+
+    # Start the pool before timing so process spawn cost is not counted
+    extract_pdf_pages(pdf_content, parallel=True)
+
+    serial_time, serial = time_extraction(pdf_content, parallel=False, runs=runs)
+    parallel_time, parallel = time_extraction(pdf_content, parallel=True, runs=runs)
+    shutdown_pdf_pool()
+
+    print_header("Results")
+    print(f"Pages:     {serial['page_count']}")
+    print(f"Serial:    {serial_time:.3f}s")
+    print(f"Parallel:  {parallel_time:.3f}s")
+    print(f"Speedup:   {serial_time / parallel_time:.2f}x")
+
+    if serial == parallel:
+        print("\n✅ Parallel output is identical to serial output")
+    else:
+        print("\n❌ Parallel output differs from serial output")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
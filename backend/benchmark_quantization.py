@@ -0,0 +1,157 @@
+"""
+Benchmark CPU quantization modes (int8, int4) against float32.
+Usage: python benchmark_quantization.py [model_name] [runs]
+
+Each mode runs in its own process so peak memory is measured separately.
+Quantized weights are prepared (and saved) before the measured run.
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+
+SAMPLE_TEXT = (
+    "Le Dahir des Obligations et Contrats (DOC) de 1913 est le texte fondamental du droit civil "
+    "marocain. Il définit le contrat comme un accord de volontés destiné à créer des obligations. "
+    "La validité d'un contrat suppose la capacité des parties, un consentement exempt de vices, "
+    "un objet certain et une cause licite. Les vices du consentement sont l'erreur, le dol et la "
+    "violence. La nullité absolue sanctionne l'absence d'un élément essentiel du contrat."
+)
+THROUGHPUT_TOKENS = 64
+AGREEMENT_TOKENS = 32
+MODES = ("none", "int8", "int4")
+
+
+def print_header(text):
+    """Print a formatted header."""
+    print("\n" + "=" * 60)
+    print(f"  {text}")
+    print("=" * 60 + "\n")
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process in MB (None where unsupported)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_worker(runs: int):
+    """Measure the mode selected by CPU_QUANTIZATION in this process and print a JSON line."""
+    import torch
+    from services.local_ai_service import LocalAIService
+    from services.quantization import model_weight_bytes
+
+    service = LocalAIService()
+    start = time.perf_counter()
+    service.load_model()
+    load_time = time.perf_counter() - start
+
+    prompt = service._build_quiz_prompt(SAMPLE_TEXT, 2)
+    inputs = service.tokenizer(prompt, return_tensors="pt")
+    prompt_length = inputs["input_ids"].shape[1]
+
+    # Throughput: greedy decoding of a fixed number of tokens
+    elapsed = 0.0
+    greedy = None
+    with torch.inference_mode():
+        for _ in range(runs):
+            start = time.perf_counter()
+            output = service.model.generate(
+                **inputs,
+                max_new_tokens=THROUGHPUT_TOKENS,
+                min_new_tokens=THROUGHPUT_TOKENS,
+                do_sample=False,
+                pad_token_id=service.tokenizer.eos_token_id,
+            )
+            elapsed += time.perf_counter() - start
+            greedy = output[0, prompt_length:prompt_length + AGREEMENT_TOKENS].tolist()
+
+    # Validity: real quiz generations parsed the way the API parses them
+    valid = 0
+    for _ in range(runs):
+        result = service.extract_json_from_text(service.generate_text(prompt, max_new_tokens=400, max_items=2))
+        questions = (result or {}).get("questions") or []
+        if questions and all(isinstance(q, dict) and len(q.get("options", [])) == 4 for q in questions):
+            valid += 1
+
+    service.shutdown()
+    print(json.dumps({
+        "load_time": load_time,
+        "tokens_per_sec": THROUGHPUT_TOKENS * runs / elapsed if elapsed else 0.0,
+        "peak_rss_mb": peak_rss_mb(),
+        "weights_mb": model_weight_bytes(service.model) / 1e6,
+        "valid": valid,
+        "runs": runs,
+        "greedy": greedy,
+    }))
+
+
+def run_mode(mode: str, model_name: str, runs: int):
+    """Run one mode in a child process and return its measurements."""
+    env = dict(
+        os.environ,
+        LOCAL_MODEL_NAME=model_name,
+        DEVICE="cpu",
+        CPU_QUANTIZATION=mode,
+        # The baseline is float32 whatever CPU_PRECISION the .env picks
+        CPU_PRECISION="fp32",
+        BATCH_MAX_SIZE="1",
+        RESULT_CACHE_SIZE="0",
+    )
+    command = [sys.executable, os.path.abspath(__file__), "--worker", str(runs)]
+
+    if mode != "none":
+        # First load quantizes and saves the weights; measure the reload
+        subprocess.run(command[:2] + ["--worker", "0"], env=env, check=True, capture_output=True)
+
+    completed = subprocess.run(command, env=env, check=True, capture_output=True, text=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main():
+    """Compare float32 and the quantized modes on one model."""
+    if "--worker" in sys.argv:
+        run_worker(int(sys.argv[sys.argv.index("--worker") + 1]))
+        return
+
+    from config import settings
+
+    model_name = sys.argv[1] if len(sys.argv) > 1 else settings.local_model_name
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    print_header(f"CPU Quantization Benchmark: {model_name}")
+    print(f"Runs per mode: {runs}")
+    print(f"Throughput: {THROUGHPUT_TOKENS} greedy tokens per run")
+
+    results = {}
+    for mode in MODES:
+        print(f"\n⏳ Measuring {mode}...")
+        try:
+            results[mode] = run_mode(mode, model_name, runs)
+        except subprocess.CalledProcessError as e:
+            print(f"❌ {mode} failed:\n{e.stderr[-2000:] if e.stderr else e}")
+
+    if "none" not in results:
+        sys.exit(1)
+
+    baseline = results["none"]
+    print_header("Results")
+    print(f"{'Mode':<8}{'Load s':>9}{'Tok/s':>9}{'Speedup':>9}{'Peak RSS MB':>13}{'Weights MB':>12}{'Valid':>8}{'Agree':>8}")
+    for mode, result in results.items():
+        agreement = sum(a == b for a, b in zip(result["greedy"], baseline["greedy"])) / max(1, len(baseline["greedy"]))
+        rss = f"{result['peak_rss_mb']:.0f}" if result["peak_rss_mb"] is not None else "n/a"
+        print(
+            f"{mode:<8}{result['load_time']:>9.1f}{result['tokens_per_sec']:>9.1f}"
+            f"{result['tokens_per_sec'] / baseline['tokens_per_sec']:>8.2f}x{rss:>13}"
+            f"{result['weights_mb']:>12.0f}{result['valid']:>5}/{result['runs']:<2}{agreement:>8.0%}"
+        )
+    print("\nValid: quiz outputs that parse with 4 options per question")
+    print(f"Agree: greedy tokens matching float32 over the first {AGREEMENT_TOKENS}")
+
+
+if __name__ == "__main__":
+    main()
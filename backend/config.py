@@ -1,4 +1,6 @@
 """Configuration settings for the FastAPI backend."""
+import os
+
 from pydantic_settings import BaseSettings
 from typing import List
 
@@ -21,7 +23,83 @@ class Settings(BaseSettings):
     device: str = "auto"  # auto, cpu, cuda
     load_in_8bit: bool = False  # Set to True if you have GPU and want to save memory
     max_length: int = 1024  # Reduced for faster inference
-    temperature: float = 0.7
+    temperature: float = 0.7  # Used by the balanced profile
+    decoding_profile: str = "fast-greedy"  # Default decoding profile: fast-greedy (deterministic, cached), balanced or creative
+    cpu_precision: str = "auto"  # auto (bf16 if the CPU supports it natively), fp32, bf16
+    
+    # CPU Quantization (ignored on CUDA)
+    # Off by default; env_template_phi2 sets int8 for phi-2 on CPU
+    cpu_quantization: str = "none"  # none, int8 (dynamic int8 Linear layers, faster), int4 (weight-only, smallest)
+    quantized_model_dir: str = "models/quantized"  # Quantized weights are saved here and reused on the next start
+    # int4 layers keep their dequantized weight after the first pass (faster, but float32-sized in memory)
+    int4_cache_weights: bool = True
+    
+    # Model Snapshot (prepared weights written by snapshot_model.py, memory-mapped at startup)
+    snapshot_dir: str = "models/snapshots"  # Empty disables snapshots
+    
+    # Multi-Process Serving (worker processes memory-map one shared snapshot of the weights)
+    server_workers: int = 1  # Server processes started by python main.py (uvicorn --workers N also needs WEB_CONCURRENCY=N or this)
+    torch_threads: int = 0  # Torch threads per server process (0 = CPU cores divided among the server processes)
+    
+    # Out-of-Process Inference (start python inference_server.py <socket> for each socket)
+    inference_sockets: str = ""  # Comma-separated Unix socket paths, e.g. /tmp/qrayti-inference.sock (empty = in-process)
+    
+    # Inference Worker Pool
+    inference_workers: int = 1  # Generations running at the same time (each one uses the shared model)
+    
+    # Dynamic Batching
+    batch_max_size: int = 1  # Prompts per model.generate call (1 disables batching)
+    batch_max_wait_ms: int = 50  # How long to wait for more prompts before running a batch
+    
+    # Generation Scheduler (interactive quizzes before bulk summaries, fair queuing between clients)
+    queue_max_size: int = 32  # Requests in progress before new ones are refused with 429, bulk ones at half (0 = unlimited)
+    queue_deadline_seconds: int = 60  # Drop requests whose first generation has waited this long (0 = never; jobs have none)
+    client_id_header: str = "X-Client-Id"  # Header identifying the client for fair queuing (default: client address)
+    
+    # Generation Jobs (POST /api/jobs/quiz|summary, then poll GET /api/jobs/{id})
+    job_store_size: int = 100  # Jobs kept, finished or not (new jobs are refused while all are unfinished)
+    job_ttl_seconds: int = 3600  # How long a finished job's result can be fetched
+    
+    # Result Cache (quiz/summary outputs keyed by content + generation params;
+    # only deterministic profiles, i.e. fast-greedy, are cached)
+    result_cache_size: int = 128  # In-memory entries (0 disables caching)
+    result_cache_ttl_seconds: int = 86400
+    result_cache_path: str = ""  # SQLite file for the on-disk tier, e.g. cache/results.sqlite3 (empty = memory only)
+    result_cache_disk_max_mb: int = 100
+    
+    # PDF Extraction Cache (extracted text keyed by SHA-256 of the uploaded file)
+    pdf_cache_path: str = "cache/pdf_text.sqlite3"  # Empty disables the cache
+    pdf_cache_max_mb: int = 500
+    pdf_cache_ttl_seconds: int = 30 * 86400
+    
+    # Parallel PDF Extraction
+    pdf_workers: int = 0  # Extraction processes (0 = CPU cores divided among the server processes)
+    pdf_parallel_min_pages: int = 20  # Smaller documents are extracted serially
+    
+    # Long-Document Summarization (map-reduce over token-budgeted chunks)
+    summary_chunk_tokens: int = 384  # Tokens of document text per chunk
+    # Chunks summarized per document, about 6k tokens of text; each costs one generation, so
+    # longer documents keep chunks chosen by content hash (0 = every chunk, can take hours on CPU)
+    summary_max_chunks: int = 16
+    summary_max_sections: int = 5  # Sections in the merged summary
+    
+    # Whole-Document Quiz (questions spread over the most informative segments)
+    quiz_segment_tokens: int = 256  # Tokens of document text per segment
+    quiz_max_segments: int = 5  # Segments questions are spread over (generated as one batch)
+    
+    # Prompt Prefix Cache (key/values of the fixed prompt templates, computed at startup)
+    prefix_cache: bool = True
+    
+    # Constrained Decoding (off by default; env_template_phi2 turns it on)
+    constrained_decoding: bool = False  # Mask tokens so quiz/summary output always matches the response schema
+    
+    # Speculative Decoding (a small draft model sharing the tokenizer, e.g. microsoft/phi-1_5 for phi-2)
+    draft_model_name: str = ""  # Empty disables speculative decoding
+    draft_num_tokens: int = 5  # Tokens the draft proposes per step (adapted while generating)
+    
+    # Startup (background loading is off by default; env_template_phi2 turns it on)
+    background_loading: bool = False  # Serve at once and load the model in the background (routes answer 503 until ready)
+    warmup_tokens: int = 16  # Tokens of the warm-up generation run after loading (0 disables)
     
     # Server Configuration
     host: str = "0.0.0.0"
@@ -39,6 +117,19 @@ class Settings(BaseSettings):
     def cors_origins_list(self) -> List[str]:
         """Convert comma-separated CORS origins to list."""
         return [origin.strip() for origin in self.cors_origins.split(",")]
+    
+    @property
+    def inference_socket_list(self) -> List[str]:
+        """Convert comma-separated inference server sockets to list."""
+        return [path.strip() for path in self.inference_sockets.split(",") if path.strip()]
+    
+    @property
+    def server_process_count(self) -> int:
+        """Server processes: SERVER_WORKERS, or WEB_CONCURRENCY (uvicorn's default worker count) when that is left at 1."""
+        if self.server_workers > 1:
+            return self.server_workers
+        web_concurrency = os.environ.get("WEB_CONCURRENCY", "")
+        return max(1, int(web_concurrency)) if web_concurrency.isdigit() else 1
 
 
 # Global settings instance
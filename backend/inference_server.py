@@ -0,0 +1,47 @@
+"""
+Run model inference in its own process, for the API to reach over a Unix socket.
+Usage: python inference_server.py [socket_path]
+
+The socket defaults to the first path in INFERENCE_SOCKETS. Start one
+server per path listed there (each loads the model, memory-mapping the
+snapshot if there is one), then start the API with python main.py.
+"""
+import asyncio
+import logging
+import signal
+import sys
+
+from config import settings
+from services.inference_rpc import InferenceServer
+from services.local_ai_service import LocalAIService
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+async def serve(socket_path: str):
+    """Load the model in the background and serve calls until stopped."""
+    service = LocalAIService()
+    service.start_background_loading()
+    server = InferenceServer(service, socket_path)
+
+    task = asyncio.ensure_future(server.serve_forever())
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, task.cancel)
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    finally:
+        service.shutdown()
+        logger.info("Inference server stopped")
+
+
+if __name__ == "__main__":
+    paths = settings.inference_socket_list
+    socket_path = sys.argv[1] if len(sys.argv) > 1 else (paths[0] if paths else "")
+    if not socket_path:
+        print("❌ No socket path: pass one or set INFERENCE_SOCKETS")
+        sys.exit(1)
+    asyncio.run(serve(socket_path))
@@ -1,13 +1,41 @@
 """Main FastAPI application."""
-from fastapi import FastAPI, UploadFile, File, HTTPException
+from fastapi import FastAPI, UploadFile, File, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-from typing import List, Optional
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+from typing import AsyncIterator, Dict, Iterator, Optional, Tuple
+import asyncio
+import contextlib
+import hashlib
+import json
 import logging
+import os
+import tempfile
 
 from config import settings
-from services.pdf_service import extract_text_from_pdf
-from services.local_ai_service import LocalAIService
+from schemas import (
+    HealthResponse,
+    JobResponse,
+    PDFUploadResponse,
+    QuizRequest,
+    QuizResponse,
+    SummaryRequest,
+    SummaryResponse,
+)
+from services.pdf_service import (
+    assemble_pages,
+    extract_pdf_pages_cached,
+    get_cached_extraction,
+    iter_pdf_pages,
+    shutdown_pdf_pool,
+    store_cached_extraction,
+    split_pages,
+)
+from services.decoding_profiles import DECODING_PROFILES
+from services.jobs import Job, JobStore
+from services.result_cache import DiskCache
+from services.scheduler import AdmittedRequests, GenerationRequest, track_request
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -30,13 +58,65 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
-# Initialize AI Service
-ai_service = LocalAIService()
+# Seconds clients are told to wait (Retry-After) while the model is loading
+LOADING_RETRY_AFTER_SECONDS = 10
+
+# Seconds clients are told to wait (Retry-After) when the job store is full
+JOBS_RETRY_AFTER_SECONDS = 30
+
+# Seconds clients are told to wait (Retry-After) when the generation queue is full
+QUEUE_RETRY_AFTER_SECONDS = 5
+
+# How often generation routes check that their client is still connected
+DISCONNECT_POLL_SECONDS = 1.0
+
+# Streams idle this long send an SSE comment, so client idle timeouts don't fire
+# while a segment, a summary chunk or a queued generation is still pending
+SSE_KEEPALIVE_SECONDS = 15.0
+
+# Upload limits
+MAX_UPLOAD_MB = 50
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # Spool uploads to disk 1 MB at a time
+
+# Initialize AI Service: in this process, or a client of separate inference servers
+if settings.inference_socket_list:
+    from services.inference_rpc import RemoteAIService
+    ai_service = RemoteAIService(settings.inference_socket_list)
+else:
+    from services.local_ai_service import LocalAIService
+    ai_service = LocalAIService()
+
+# Generation requests in progress, counted for 429 admission (see admit)
+admitted_requests = AdmittedRequests()
+
+# Generation jobs, polled by clients instead of holding a connection open
+job_store = JobStore(max_jobs=settings.job_store_size, ttl_seconds=settings.job_ttl_seconds)
+
+# Cache of extracted PDF text, so re-uploading the same file skips parsing
+pdf_cache = None
+if settings.pdf_cache_path:
+    try:
+        pdf_cache = DiskCache(
+            settings.pdf_cache_path,
+            max_bytes=settings.pdf_cache_max_mb * 1024 * 1024,
+            ttl_seconds=settings.pdf_cache_ttl_seconds
+        )
+    except Exception as e:
+        logger.warning(f"PDF extraction cache disabled: {str(e)}")
 
 # Load model on startup
 @app.on_event("startup")
 async def startup_event():
     """Load the AI model when the server starts."""
+    if settings.server_process_count > 1:
+        logger.warning("Generation jobs are disabled with several server processes (each keeps its jobs in memory)")
+    if settings.background_loading or settings.inference_socket_list:
+        # Serve right away; generation routes answer 503 until the model is ready
+        # (inference servers load it in their own processes)
+        logger.info("Loading AI model in the background...")
+        ai_service.start_background_loading()
+        return
+    
     logger.info("Loading AI model...")
     try:
         ai_service.load_model()
@@ -46,60 +126,12 @@ async def startup_event():
         logger.warning("Server will start but AI features will not work")
 
 
-# Pydantic models for request/response
-class QuizRequest(BaseModel):
-    content: str
-    num_questions: int = 5
-
-
-class QuizOption(BaseModel):
-    text: str
-
-
-class QuizQuestion(BaseModel):
-    id: int
-    question: str
-    options: List[str]
-    correctIndex: int
-    explanation: str
-    explanationDarija: str
-
-
-class QuizResponse(BaseModel):
-    questions: List[QuizQuestion]
-
-
-class SummaryRequest(BaseModel):
-    content: str
-
-
-class KeyTerm(BaseModel):
-    term: str
-    definition: str
-    definitionDarija: str
-
-
-class SummarySection(BaseModel):
-    title: str
-    content: str
-    keyTerms: List[KeyTerm]
-    essentialPoints: List[str]
-
-
-class SummaryResponse(BaseModel):
-    sections: List[SummarySection]
-
-
-class PDFUploadResponse(BaseModel):
-    fileName: str
-    content: str
-    pageCount: int
-
-
-class HealthResponse(BaseModel):
-    status: str
-    model_type: str
-    model_ready: bool
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the jobs, inference and PDF extraction pools when the server stops."""
+    job_store.shutdown()
+    ai_service.shutdown()
+    shutdown_pdf_pool()
 
 
 # Routes
@@ -117,13 +149,35 @@ async def root():
 async def health_check():
     """Health check endpoint."""
     model_ready = ai_service.is_ready()
+    stats = ai_service.get_stats()
+    loading = stats["loading"]
+    if model_ready:
+        status = "healthy"
+    else:
+        status = "error" if loading["stage"] == "failed" else "initializing"
     return HealthResponse(
-        status="healthy" if model_ready else "initializing",
+        status=status,
         model_type=f"{settings.model_type} ({settings.local_model_name})",
-        model_ready=model_ready
+        model_ready=model_ready,
+        loading_stage=loading["stage"],
+        loading_progress=loading["progress"],
+        loading_error=loading["error"],
+        queue_depth=stats["executor"]["queue_depth"],
+        in_flight=stats["executor"]["in_flight"],
+        precision=stats["model"]["precision"],
+        tokens_per_sec=stats["model"]["tokens_per_sec"]
     )
 
 
+@app.get("/api/stats", response_model=dict)
+async def get_stats():
+    """Inference worker pool, batching, cache and job statistics."""
+    stats = ai_service.get_stats()
+    stats["pdf_cache"] = pdf_cache.stats() if pdf_cache else None
+    stats["jobs"] = job_store.stats()
+    return stats
+
+
 @app.post("/api/upload-pdf", response_model=PDFUploadResponse)
 async def upload_pdf(file: UploadFile = File(...)):
     """
@@ -146,14 +200,15 @@ async def upload_pdf(file: UploadFile = File(...)):
         logger.info(f"   File size: {file_size_mb:.2f} MB")
         
         # Check file size (50MB limit)
-        if file_size_mb > 50:
+        if file_size_mb > MAX_UPLOAD_MB:
             raise HTTPException(
                 status_code=400,
-                detail=f"File too large ({file_size_mb:.2f} MB). Maximum size is 50 MB."
+                detail=f"File too large ({file_size_mb:.2f} MB). Maximum size is {MAX_UPLOAD_MB} MB."
             )
         
-        # Extract text from PDF
-        text = extract_text_from_pdf(content)
+        # Extract text from PDF (cached by file hash), off the event loop
+        extracted = await run_in_threadpool(extract_pdf_pages_cached, content, pdf_cache)
+        text = extracted["text"]
         
         if not text or len(text.strip()) < 50:
             raise HTTPException(
@@ -161,8 +216,7 @@ async def upload_pdf(file: UploadFile = File(...)):
                 detail="Could not extract sufficient text from PDF. Please ensure the PDF contains readable text, not just images."
             )
         
-        # Count pages (approximate based on content length)
-        page_count = max(1, len(text) // 2000)
+        page_count = max(1, extracted["page_count"])
         
         elapsed = time.time() - start_time
         logger.info(f"✅ Successfully processed PDF: {file.filename}")
@@ -181,8 +235,202 @@ async def upload_pdf(file: UploadFile = File(...)):
         raise HTTPException(status_code=500, detail=f"Error processing PDF: {str(e)}")
 
 
+def pdf_page_events(file_name: str, pdf_path: str, digest: str) -> Iterator[str]:
+    """
+    Extract a spooled PDF page by page and yield SSE messages.
+    Byte-identical files already in the extraction cache are replayed from it.
+    Pages are numbered among all pages, like totalPages; pages without
+    text are only sent when extracting live.
+    """
+    import time
+    start_time = time.time()
+    
+    try:
+        cached = get_cached_extraction(pdf_cache, digest)
+        # Entries stored before page numbers were recorded are extracted again
+        if cached is not None and "page_numbers" in cached:
+            logger.info(f"✅ Using cached extraction for {file_name}")
+            total_pages = cached["page_count"]
+            yield format_sse("start", {"fileName": file_name, "totalPages": total_pages, "cached": True})
+            for number, text in zip(cached["page_numbers"], split_pages(cached)):
+                yield format_sse("page", {"page": number, "totalPages": total_pages, "text": text})
+            yield format_sse("done", {
+                "fileName": file_name,
+                "pageCount": max(1, cached["page_count"]),
+                "characters": len(cached["text"]),
+            })
+            return
+        
+        cleaned_pages = []
+        page_numbers = []
+        total_pages = 0
+        for page in iter_pdf_pages(pdf_path):
+            if total_pages == 0:
+                total_pages = page["total_pages"]
+                yield format_sse("start", {"fileName": file_name, "totalPages": total_pages, "cached": False})
+            if page["text"]:
+                cleaned_pages.append(page["text"])
+                page_numbers.append(page["page"])
+            yield format_sse("page", {"page": page["page"], "totalPages": total_pages, "text": page["text"]})
+        
+        extracted = assemble_pages(cleaned_pages, page_numbers, total_pages)
+        if len(extracted["text"].strip()) < 50:
+            yield format_sse("error", {
+                "detail": "Could not extract sufficient text from PDF. Please ensure the PDF contains readable text, not just images."
+            })
+            return
+        
+        store_cached_extraction(pdf_cache, digest, extracted)
+        
+        elapsed = time.time() - start_time
+        logger.info(f"✅ Streamed PDF: {file_name}")
+        logger.info(f"   Pages: {total_pages}, Characters: {len(extracted['text'])}, Time: {elapsed:.2f}s")
+        
+        yield format_sse("done", {
+            "fileName": file_name,
+            "pageCount": max(1, total_pages),
+            "characters": len(extracted["text"]),
+        })
+    
+    except Exception as e:
+        logger.error(f"❌ Error streaming PDF: {str(e)}")
+        yield format_sse("error", {"detail": f"Error processing PDF: {str(e)}"})
+
+
+@app.post("/api/upload-pdf/stream")
+async def upload_pdf_stream(file: UploadFile = File(...)):
+    """
+    Upload a PDF and stream its text back page by page (Server-Sent Events).
+    The upload is spooled to a temporary file in chunks and pages are
+    extracted one at a time, so memory stays bounded regardless of file size.
+    Sends "start", one "page" event per page, then "done" (or "error").
+    """
+    if not file.filename.endswith(('.pdf', '.PDF')):
+        raise HTTPException(status_code=400, detail="File must be a PDF")
+    
+    logger.info(f"📄 Streaming PDF: {file.filename}")
+    
+    # Spool the upload to disk while hashing it for the extraction cache
+    digest = hashlib.sha256()
+    size = 0
+    spool = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False)
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > MAX_UPLOAD_MB * 1024 * 1024:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"File too large. Maximum size is {MAX_UPLOAD_MB} MB."
+                )
+            digest.update(chunk)
+            spool.write(chunk)
+        spool.close()
+    except BaseException:
+        spool.close()
+        os.unlink(spool.name)
+        raise
+    
+    logger.info(f"   File size: {size / 1024 / 1024:.2f} MB")
+    
+    # A sync generator is iterated in the threadpool, keeping extraction off the event loop.
+    # The spooled file is deleted after the response, even if it was never iterated.
+    return StreamingResponse(
+        pdf_page_events(file.filename, spool.name, digest.hexdigest()),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",
+        },
+        background=BackgroundTask(os.unlink, spool.name)
+    )
+
+
+def require_model():
+    """Answer 503 (with Retry-After while loading) until the model is ready."""
+    if ai_service.is_ready():
+        return
+    loading = ai_service.loading_status()
+    if loading["stage"] == "failed":
+        raise HTTPException(status_code=503, detail=f"Model failed to load: {loading['error']}")
+    raise HTTPException(
+        status_code=503,
+        detail=f"Model is loading ({loading['stage']}, {loading['progress']:.0%})",
+        headers={"Retry-After": str(LOADING_RETRY_AFTER_SECONDS)}
+    )
+
+
+def check_profile(profile: Optional[str]):
+    """Reject unknown decoding profiles with a 400."""
+    if profile and profile not in DECODING_PROFILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown decoding profile: {profile} (expected one of {', '.join(DECODING_PROFILES)})"
+        )
+
+
+def client_id(http_request: Request) -> str:
+    """Client a request is fair-queued as: the CLIENT_ID_HEADER value, or its address."""
+    client = http_request.headers.get(settings.client_id_header)
+    if not client and http_request.client:
+        client = http_request.client.host
+    return client or ""
+
+
+def admit(http_request: Request, priority: str, deadline: bool = True) -> GenerationRequest:
+    """
+    Create the scheduling request of a generation route.
+    Answers 429 at once when QUEUE_MAX_SIZE requests are in progress, or
+    half of that for bulk requests, so summaries always leave room for quizzes.
+    
+    Args:
+        http_request: The incoming HTTP request
+        priority: "interactive" or "bulk"
+        deadline: Whether queued generations are dropped after QUEUE_DEADLINE_SECONDS
+            (off for jobs, whose clients don't hold a connection open)
+    """
+    if priority == "interactive":
+        in_progress, limit = admitted_requests.count(), settings.queue_max_size
+    else:
+        in_progress, limit = admitted_requests.count(priority), max(1, settings.queue_max_size // 2)
+    if settings.queue_max_size > 0 and in_progress >= limit:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many generation requests in progress, try again later",
+            headers={"Retry-After": str(QUEUE_RETRY_AFTER_SECONDS)}
+        )
+    generation = GenerationRequest(
+        client=client_id(http_request),
+        priority=priority,
+        deadline_seconds=settings.queue_deadline_seconds if deadline else 0
+    )
+    admitted_requests.add(generation)
+    return generation
+
+
+async def watch_disconnect(http_request: Request, generation: GenerationRequest):
+    """Abandon a request once its client disconnects, cancelling its generations (queued or running)."""
+    while not await http_request.is_disconnected():
+        await asyncio.sleep(DISCONNECT_POLL_SECONDS)
+    logger.info(f"Client {generation.client or 'unknown'} disconnected, abandoning its request")
+    generation.abandon()
+
+
+@contextlib.asynccontextmanager
+async def scheduled(http_request: Request, generation: GenerationRequest):
+    """Run the block's generations under a scheduling request, watching for disconnects."""
+    watcher = asyncio.create_task(watch_disconnect(http_request, generation))
+    try:
+        with track_request(generation):
+            yield generation
+    finally:
+        watcher.cancel()
+
+
 @app.post("/api/generate-quiz", response_model=QuizResponse)
-async def generate_quiz(request: QuizRequest):
+async def generate_quiz(request: QuizRequest, http_request: Request):
     """
     Generate a quiz from the provided content.
     Creates multiple-choice questions with explanations in French and Darija.
@@ -193,18 +441,19 @@ async def generate_quiz(request: QuizRequest):
     try:
         if not request.content or len(request.content.strip()) < 50:
             raise HTTPException(status_code=400, detail="Content is too short to generate a quiz")
+        check_profile(request.profile)
+        require_model()
+        generation = admit(http_request, "interactive")
         
-        # Truncate content BEFORE sending to AI (critical for speed!)
-        max_content = 400  # Very aggressive truncation
-        content = request.content[:max_content] if len(request.content) > max_content else request.content
+        logger.info(f"Generating quiz with {request.num_questions} questions from {len(request.content)} characters")
         
-        logger.info(f"Generating quiz with {request.num_questions} questions from {len(content)} characters (truncated from {len(request.content)})")
-        
-        # Generate quiz using AI service
-        questions = await ai_service.generate_quiz(
-            content=content,
-            num_questions=request.num_questions
-        )
+        # The AI service segments long documents, so the full content is sent
+        async with scheduled(http_request, generation):
+            questions = await ai_service.generate_quiz(
+                content=request.content,
+                num_questions=request.num_questions,
+                profile=request.profile
+            )
         
         elapsed = time.time() - start_time
         logger.info(f"✅ Quiz generation completed in {elapsed:.2f} seconds")
@@ -219,7 +468,7 @@ async def generate_quiz(request: QuizRequest):
 
 
 @app.post("/api/generate-summary", response_model=SummaryResponse)
-async def generate_summary(request: SummaryRequest):
+async def generate_summary(request: SummaryRequest, http_request: Request):
     """
     Generate a structured summary from the provided content.
     Creates sections with key terms and essential points in French and Darija.
@@ -230,15 +479,15 @@ async def generate_summary(request: SummaryRequest):
     try:
         if not request.content or len(request.content.strip()) < 50:
             raise HTTPException(status_code=400, detail="Content is too short to generate a summary")
+        check_profile(request.profile)
+        require_model()
+        generation = admit(http_request, "bulk")
         
-        # Truncate content BEFORE sending to AI (critical for speed!)
-        max_content = 400  # Very aggressive truncation
-        content = request.content[:max_content] if len(request.content) > max_content else request.content
-        
-        logger.info(f"Generating summary from {len(content)} characters (truncated from {len(request.content)})")
+        logger.info(f"Generating summary from {len(request.content)} characters")
         
-        # Generate summary using AI service
-        sections = await ai_service.generate_summary(content=content)
+        # The AI service chunks long documents, so the full content is sent
+        async with scheduled(http_request, generation):
+            sections = await ai_service.generate_summary(content=request.content, profile=request.profile)
         
         elapsed = time.time() - start_time
         logger.info(f"✅ Summary generation completed in {elapsed:.2f} seconds")
@@ -252,12 +501,238 @@ async def generate_summary(request: SummaryRequest):
         raise HTTPException(status_code=500, detail=f"Error generating summary: {str(e)}")
 
 
+def format_sse(event: str, data: Dict) -> str:
+    """Format one Server-Sent Events message."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def with_keepalive(events: AsyncIterator[Tuple[str, Dict]]) -> AsyncIterator[Optional[Tuple[str, Dict]]]:
+    """Pass events through, yielding None whenever SSE_KEEPALIVE_SECONDS go by without one."""
+    iterator = events.__aiter__()
+    pending = None
+    try:
+        while True:
+            if pending is None:
+                # The task copies the current context, so generations keep the request's scheduling
+                pending = asyncio.ensure_future(iterator.__anext__())
+            done, _ = await asyncio.wait([pending], timeout=SSE_KEEPALIVE_SECONDS)
+            if not done:
+                yield None
+                continue
+            task, pending = pending, None
+            try:
+                item = task.result()
+            except StopAsyncIteration:
+                return
+            yield item
+    finally:
+        if pending is not None:
+            pending.cancel()
+
+
+async def sse_stream(events: AsyncIterator[Tuple[str, Dict]], label: str,
+                     generation: GenerationRequest) -> AsyncIterator[str]:
+    """
+    Turn (event, data) tuples from the AI service into SSE messages.
+    Errors raised mid-stream are sent as a final "error" event, and a
+    ": keep-alive" comment is sent while no event arrives for SSE_KEEPALIVE_SECONDS.
+    Generations run under the request's scheduling request; if the client
+    disconnects, the response is cancelled and so are its generations,
+    queued or running.
+    """
+    import time
+    start_time = time.time()
+    
+    try:
+        with track_request(generation):
+            async for item in with_keepalive(events):
+                yield format_sse(*item) if item else ": keep-alive\n\n"
+        logger.info(f"✅ Streaming {label} completed in {time.time() - start_time:.2f} seconds")
+    except (asyncio.CancelledError, GeneratorExit):
+        logger.info(f"Client disconnected while streaming {label}, cancelling generation")
+        generation.abandon()
+        raise
+    except Exception as e:
+        logger.error(f"Error streaming {label}: {str(e)}")
+        yield format_sse("error", {"detail": f"Error generating {label}: {str(e)}"})
+
+
+def streaming_response(events: AsyncIterator[Tuple[str, Dict]], label: str,
+                       generation: GenerationRequest) -> StreamingResponse:
+    """Build an unbuffered text/event-stream response."""
+    return StreamingResponse(
+        sse_stream(events, label, generation),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # Disable proxy buffering (nginx)
+        }
+    )
+
+
+@app.post("/api/generate-quiz/stream")
+async def generate_quiz_stream(request: QuizRequest, http_request: Request):
+    """
+    Generate a quiz as a Server-Sent Events stream.
+    Sends "token" events as text is produced (or "progress" events for long
+    documents generated segment by segment), a "question" event as soon as
+    each question is complete, then "done" with the full list (or "error").
+    """
+    if not request.content or len(request.content.strip()) < 50:
+        raise HTTPException(status_code=400, detail="Content is too short to generate a quiz")
+    check_profile(request.profile)
+    require_model()
+    generation = admit(http_request, "interactive")
+    
+    logger.info(f"Streaming quiz with {request.num_questions} questions from {len(request.content)} characters")
+    
+    # The AI service segments long documents, so the full content is sent
+    return streaming_response(
+        ai_service.stream_quiz(
+            content=request.content, num_questions=request.num_questions, profile=request.profile
+        ),
+        "quiz",
+        generation
+    )
+
+
+@app.post("/api/generate-summary/stream")
+async def generate_summary_stream(request: SummaryRequest, http_request: Request):
+    """
+    Generate a summary as a Server-Sent Events stream.
+    Sends "token" events as text is produced (or "progress" events for long
+    documents summarized in chunks), a "section" event as soon as each
+    section is complete, then "done" with the full list (or "error").
+    """
+    if not request.content or len(request.content.strip()) < 50:
+        raise HTTPException(status_code=400, detail="Content is too short to generate a summary")
+    check_profile(request.profile)
+    require_model()
+    generation = admit(http_request, "bulk")
+    
+    logger.info(f"Streaming summary from {len(request.content)} characters")
+    
+    # The AI service chunks long documents, so the full content is sent
+    return streaming_response(
+        ai_service.stream_summary(content=request.content, profile=request.profile), "summary", generation
+    )
+
+
+def require_job_store():
+    """
+    Answer 503 when several server processes run: jobs live in the memory of
+    the process that started them, so polling would usually reach another
+    process and get 404.
+    """
+    if settings.server_process_count > 1:
+        raise HTTPException(
+            status_code=503,
+            detail="Generation jobs need a single server process (SERVER_WORKERS / WEB_CONCURRENCY = 1); "
+                   "use the streaming routes instead"
+        )
+
+
+def job_response(job: Job) -> JobResponse:
+    """Current state of a job."""
+    return JobResponse(
+        jobId=job.id,
+        kind=job.kind,
+        status=job.status,
+        tokensGenerated=job.progress.tokens,
+        elapsedSeconds=round(job.elapsed_seconds, 2),
+        result=job.result,
+        error=job.error
+    )
+
+
+def submit_job(kind: str, run, generation: GenerationRequest) -> JobResponse:
+    """Start a job, answering 429 when the job store is full of unfinished jobs."""
+    job = job_store.submit(kind, run, generation)
+    if job is None:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many generation jobs in progress, try again later",
+            headers={"Retry-After": str(JOBS_RETRY_AFTER_SECONDS)}
+        )
+    return job_response(job)
+
+
+@app.post("/api/jobs/quiz", response_model=JobResponse, status_code=202)
+async def create_quiz_job(request: QuizRequest, http_request: Request):
+    """
+    Start generating a quiz in the background.
+    Returns the job at once; poll GET /api/jobs/{jobId} for its progress
+    and, once it has succeeded, the QuizResponse.
+    """
+    if not request.content or len(request.content.strip()) < 50:
+        raise HTTPException(status_code=400, detail="Content is too short to generate a quiz")
+    check_profile(request.profile)
+    require_job_store()
+    require_model()
+    generation = admit(http_request, "interactive", deadline=False)
+    
+    logger.info(f"Quiz job with {request.num_questions} questions from {len(request.content)} characters")
+    
+    async def run() -> QuizResponse:
+        with track_request(generation):
+            questions = await ai_service.generate_quiz(
+                content=request.content,
+                num_questions=request.num_questions,
+                profile=request.profile
+            )
+        return QuizResponse(questions=questions)
+    
+    return submit_job("quiz", run, generation)
+
+
+@app.post("/api/jobs/summary", response_model=JobResponse, status_code=202)
+async def create_summary_job(request: SummaryRequest, http_request: Request):
+    """
+    Start generating a summary in the background.
+    Returns the job at once; poll GET /api/jobs/{jobId} for its progress
+    and, once it has succeeded, the SummaryResponse.
+    """
+    if not request.content or len(request.content.strip()) < 50:
+        raise HTTPException(status_code=400, detail="Content is too short to generate a summary")
+    check_profile(request.profile)
+    require_job_store()
+    require_model()
+    generation = admit(http_request, "bulk", deadline=False)
+    
+    logger.info(f"Summary job from {len(request.content)} characters")
+    
+    async def run() -> SummaryResponse:
+        with track_request(generation):
+            sections = await ai_service.generate_summary(content=request.content, profile=request.profile)
+        return SummaryResponse(sections=sections)
+    
+    return submit_job("summary", run, generation)
+
+
+@app.get("/api/jobs/{job_id}", response_model=JobResponse)
+async def get_job(job_id: str):
+    """
+    Get a generation job's status, tokens generated so far and, once
+    finished, its result or error. Finished jobs expire after JOB_TTL_SECONDS.
+    """
+    require_job_store()
+    job = job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found (unknown or expired)")
+    return job_response(job)
+
+
 if __name__ == "__main__":
     import uvicorn
+    
+    # Each worker prepares the shared snapshot before loading (see services.serving)
+    workers = settings.server_process_count
     uvicorn.run(
         "main:app",
         host=settings.host,
         port=settings.port,
-        reload=settings.debug
+        # Reload runs a single process
+        reload=settings.debug and workers == 1,
+        workers=workers
     )
 
@@ -0,0 +1,77 @@
+"""Pydantic models for API requests and responses."""
+from pydantic import BaseModel
+from typing import List, Optional, Union
+
+
+class QuizRequest(BaseModel):
+    content: str
+    num_questions: int = 5
+    profile: Optional[str] = None  # Decoding profile: fast-greedy, balanced or creative (None = server default)
+
+
+class QuizOption(BaseModel):
+    text: str
+
+
+class QuizQuestion(BaseModel):
+    id: int
+    question: str
+    options: List[str]
+    correctIndex: int
+    explanation: str
+    explanationDarija: str
+
+
+class QuizResponse(BaseModel):
+    questions: List[QuizQuestion]
+
+
+class SummaryRequest(BaseModel):
+    content: str
+    profile: Optional[str] = None  # Decoding profile: fast-greedy, balanced or creative (None = server default)
+
+
+class KeyTerm(BaseModel):
+    term: str
+    definition: str
+    definitionDarija: str
+
+
+class SummarySection(BaseModel):
+    title: str
+    content: str
+    keyTerms: List[KeyTerm]
+    essentialPoints: List[str]
+
+
+class SummaryResponse(BaseModel):
+    sections: List[SummarySection]
+
+
+class JobResponse(BaseModel):
+    jobId: str
+    kind: str  # quiz or summary
+    status: str  # queued, running, succeeded or failed
+    tokensGenerated: int = 0
+    elapsedSeconds: float = 0.0
+    result: Optional[Union[QuizResponse, SummaryResponse]] = None  # Set once succeeded
+    error: Optional[str] = None  # Set once failed
+
+
+class PDFUploadResponse(BaseModel):
+    fileName: str
+    content: str
+    pageCount: int
+
+
+class HealthResponse(BaseModel):
+    status: str
+    model_type: str
+    model_ready: bool
+    queue_depth: int = 0
+    in_flight: int = 0
+    precision: str = ""
+    tokens_per_sec: float = 0.0
+    loading_stage: str = ""
+    loading_progress: float = 0.0
+    loading_error: Optional[str] = None
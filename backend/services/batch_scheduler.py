@@ -0,0 +1,174 @@
+"""Micro-batching scheduler that groups concurrent prompts into one model.generate call."""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# generate_batch(prompts, max_new_tokens, grammar, max_items, scheduling request - one per prompt,
+# decoding profile) -> (result per prompt, total new tokens)
+BatchGenerateFn = Callable[
+    [List[str], List[int], List[Optional[Any]], List[int], List[Optional[Any]], str], Tuple[List[Any], int]
+]
+
+# Queued prompt: (prompt, max_new_tokens, grammar, max_items, decoding profile, future, scheduling request)
+BatchItem = Tuple[str, int, Optional[Any], int, str, Future, Optional[Any]]
+
+
+class BatchScheduler:
+    """
+    Collects prompts submitted by concurrent callers for a short window,
+    runs them as a single padded batch and hands each caller its own output.
+    
+    Sampling parameters apply to a whole generate call, so a batch only
+    holds prompts with the same decoding profile; the others wait for the
+    next batch.
+    """
+
+    def __init__(self, generate_batch: BatchGenerateFn, max_batch_size: int = 4, max_wait_ms: int = 50):
+        """
+        Initialize the scheduler.
+
+        Args:
+            generate_batch: Function that generates a whole batch at once
+            max_batch_size: Maximum number of prompts per batch
+            max_wait_ms: How long to wait for more prompts once the first one arrives
+        """
+        self.generate_batch = generate_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0, max_wait_ms) / 1000
+        self._queue: "queue.Queue[BatchItem]" = queue.Queue()
+        # Prompts set aside for a later batch (changed by the batching thread under the lock,
+        # which stats() takes to count them)
+        self._deferred: List[BatchItem] = []
+        self._lock = threading.Lock()
+        self._thread = None
+        self._batches = 0
+        self._requests = 0
+        self._tokens = 0
+        self._last_tokens_per_sec = 0.0
+
+    def submit(self, prompt: str, max_new_tokens: int, grammar: Optional[Any] = None, max_items: int = 0,
+               profile: str = "balanced", request: Optional[Any] = None) -> Future:
+        """
+        Queue a prompt for the next batch.
+
+        Args:
+            prompt: The input prompt
+            max_new_tokens: Maximum number of new tokens for this prompt
+            grammar: Optional JSON grammar constraining this prompt's output
+            max_items: Stop once the output's JSON list holds this many items (0 = no limit)
+            profile: Decoding profile to generate with
+            request: Scheduling request of the prompt (its row stops once the request is abandoned)
+
+        Returns:
+            Future resolving to the prompt's result from generate_batch
+        """
+        self._ensure_started()
+        future = Future()
+        self._queue.put((prompt, max_new_tokens, grammar, max_items, profile, future, request))
+        return future
+
+    def _ensure_started(self):
+        """Start the batching thread on first use."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="batch-scheduler", daemon=True)
+                self._thread.start()
+                logger.info(
+                    f"Batch scheduler started (max batch: {self.max_batch_size}, "
+                    f"max wait: {self.max_wait * 1000:.0f} ms)"
+                )
+
+    def _collect(self) -> List[BatchItem]:
+        """
+        Take the oldest prompt, then gather more with the same decoding profile
+        until the batch is full or the window closes.
+        """
+        with self._lock:
+            deferred, self._deferred = self._deferred, []
+        batch = [deferred.pop(0) if deferred else self._queue.get()]
+
+        def add(item: BatchItem):
+            if item[4] == batch[0][4] and len(batch) < self.max_batch_size:
+                batch.append(item)
+            else:
+                with self._lock:
+                    self._deferred.append(item)
+
+        for item in deferred:
+            add(item)
+
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                add(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        """Batching thread: collect, generate, dispatch results."""
+        while True:
+            batch = self._collect()
+            # Callers that were cancelled while waiting don't need a slot
+            batch = [item for item in batch if item[5].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            prompts = [item[0] for item in batch]
+            limits = [item[1] for item in batch]
+            grammars = [item[2] for item in batch]
+            max_items = [item[3] for item in batch]
+            requests = [item[6] for item in batch]
+            profile = batch[0][4]
+
+            start = time.time()
+            try:
+                results, new_tokens = self.generate_batch(prompts, limits, grammars, max_items, requests, profile)
+            except Exception as e:
+                logger.error(f"❌ Batch generation failed: {str(e)}")
+                for item in batch:
+                    item[5].set_exception(e)
+                continue
+            elapsed = time.time() - start
+
+            tokens_per_sec = new_tokens / elapsed if elapsed > 0 else 0.0
+            with self._lock:
+                self._batches += 1
+                self._requests += len(batch)
+                self._tokens += new_tokens
+                self._last_tokens_per_sec = tokens_per_sec
+
+            logger.info(
+                f"Batch of {len(batch)} prompt(s) ({profile}): {new_tokens} tokens in {elapsed:.2f}s "
+                f"({tokens_per_sec:.1f} tokens/s)"
+            )
+
+            for item, result in zip(batch, results):
+                item[5].set_result(result)
+
+    def stats(self) -> Dict:
+        """
+        Get batching statistics.
+
+        Returns:
+            Dict with batch counts, average batch size and throughput
+        """
+        with self._lock:
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": int(self.max_wait * 1000),
+                "pending": self._queue.qsize() + len(self._deferred),
+                "batches": self._batches,
+                "requests": self._requests,
+                "avg_batch_size": round(self._requests / self._batches, 2) if self._batches else 0.0,
+                "tokens_generated": self._tokens,
+                "last_tokens_per_sec": round(self._last_tokens_per_sec, 1),
+            }
@@ -0,0 +1,32 @@
+"""Named decoding profiles: the sampling parameters a generation request runs with."""
+from typing import Dict, Optional
+
+from config import settings
+
+# Parameters passed to model.generate (and part of the result cache key;
+# results of sampling profiles are not cached)
+DECODING_PROFILES: Dict[str, Dict] = {
+    # Deterministic: the same prompt always gives the same output, and no
+    # sampling or repetition-penalty work is done per token
+    "fast-greedy": {"do_sample": False},
+    # Moderate sampling; TEMPERATURE sets its temperature
+    "balanced": {"do_sample": True, "temperature": settings.temperature, "top_p": 0.9, "repetition_penalty": 1.1},
+    # More varied wording, e.g. to regenerate a different quiz from the same text
+    "creative": {"do_sample": True, "temperature": 1.0, "top_p": 0.95, "repetition_penalty": 1.15},
+}
+
+
+def resolve_profile(name: Optional[str] = None) -> str:
+    """
+    Check a decoding profile name, falling back to the configured default.
+
+    Args:
+        name: Profile requested by the caller (None = DECODING_PROFILE setting)
+
+    Returns:
+        A key of DECODING_PROFILES
+    """
+    name = name or settings.decoding_profile
+    if name not in DECODING_PROFILES:
+        raise Exception(f"Unknown decoding profile: {name} (expected one of {', '.join(DECODING_PROFILES)})")
+    return name
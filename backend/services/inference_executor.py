@@ -0,0 +1,173 @@
+"""Inference executor that runs blocking model generations off the event loop."""
+import asyncio
+import contextvars
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List
+
+from services.scheduler import FairQueue, current_request
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceExecutor:
+    """
+    Dedicated worker pool for model generations.
+
+    Generation calls are blocking (torch releases the GIL during the heavy
+    matmuls), so running them here keeps the FastAPI event loop free to
+    serve /health, uploads and other requests while the model is busy.
+
+    Waiting calls are served by priority class and fairly between clients
+    (see services.scheduler); calls whose request was abandoned are
+    dropped instead of run.
+    """
+
+    def __init__(self, max_workers: int = 1):
+        """
+        Initialize the executor.
+
+        Args:
+            max_workers: Number of generations allowed to run at the same time
+        """
+        self.max_workers = max(1, max_workers)
+        self._queue = FairQueue()
+        # Reentrant: cancelling a future runs _on_done, also from inside the lock
+        self._lock = threading.RLock()
+        self._work_available = threading.Condition(self._lock)
+        self._shutdown = False
+        self._queued = 0
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._dropped = 0
+
+        self._threads: List[threading.Thread] = []
+        for index in range(self.max_workers):
+            thread = threading.Thread(target=self._worker, name=f"inference_{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+        logger.info(f"Inference executor started with {self.max_workers} worker(s)")
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> "asyncio.Future":
+        """
+        Schedule a blocking call on the worker pool.
+
+        Must be called from within a running event loop. The call is queued
+        under the current request (client and priority class), if any.
+
+        Args:
+            fn: Blocking function to run (e.g. LocalAIService.generate_text)
+            *args, **kwargs: Arguments forwarded to fn
+
+        Returns:
+            An awaitable future resolving to fn's return value
+        """
+        loop = asyncio.get_running_loop()
+        future = Future()
+        # Like asyncio.to_thread: fn sees the caller's context variables (e.g. request progress)
+        context = contextvars.copy_context()
+
+        work = (future, context, fn, args, kwargs)
+        with self._lock:
+            if self._shutdown:
+                raise Exception("Inference executor is shut down")
+            self._queue.push(work, current_request.get())
+            self._queued += 1
+            self._work_available.notify()
+
+        future.add_done_callback(lambda done: self._on_done(done, work))
+        return asyncio.wrap_future(future, loop=loop)
+
+    def _on_done(self, future: Future, work: tuple):
+        """Release the queue slot of calls cancelled before a worker picked them up."""
+        if future.cancelled():
+            with self._lock:
+                if self._queue.remove(work):
+                    self._queued -= 1
+
+    def _worker(self):
+        """Take calls from the queue and run them until shutdown."""
+        while True:
+            with self._lock:
+                while not self._queue and not self._shutdown:
+                    self._work_available.wait()
+                if self._shutdown:
+                    return
+                request, (future, context, fn, args, kwargs) = self._queue.pop()
+                self._queued -= 1
+
+                reason = request.drop_reason() if request else None
+                if reason:
+                    self._dropped += 1
+                elif future.set_running_or_notify_cancel():
+                    self._in_flight += 1
+                    if request:
+                        request.mark_started()
+                else:
+                    # Cancelled just as it was picked up
+                    continue
+
+            if reason:
+                logger.info(f"Dropped queued generation for client {request.client or 'unknown'}: {reason}")
+                if future.set_running_or_notify_cancel():
+                    future.set_exception(Exception(f"Generation dropped: {reason}"))
+                continue
+
+            self._run(future, context, fn, args, kwargs)
+
+    def _run(self, future: Future, context: contextvars.Context, fn: Callable[..., Any], args: tuple, kwargs: dict):
+        """Run fn in the caller's context while tracking in-flight counts."""
+        try:
+            result = context.run(fn, *args, **kwargs)
+        except Exception as e:
+            with self._lock:
+                self._failed += 1
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self._completed += 1
+
+    def queue_depth(self) -> int:
+        """Number of calls waiting for a worker."""
+        with self._lock:
+            return self._queued
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Get a snapshot of the executor counters.
+
+        Returns:
+            Dict with worker count, queue depth (also per priority class),
+            clients waiting, in-flight, completed, failed and dropped counts
+        """
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "queue_depth": self._queued,
+                "queue_by_priority": self._queue.depth_by_priority(),
+                "clients_waiting": len(self._queue.clients()),
+                "in_flight": self._in_flight,
+                "completed": self._completed,
+                "failed": self._failed,
+                "dropped": self._dropped,
+            }
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting work, cancel queued calls and optionally wait for running generations."""
+        with self._lock:
+            self._shutdown = True
+            while self._queue:
+                _, (future, *_) = self._queue.pop()
+                self._queued -= 1
+                future.cancel()
+            self._work_available.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+        logger.info("Inference executor stopped")
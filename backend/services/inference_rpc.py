@@ -0,0 +1,375 @@
+"""
+Running inference in separate processes, reached over Unix sockets.
+
+The web process then only handles HTTP and PDF parsing; model inference
+runs in one or more long-lived inference servers (inference_server.py).
+A server crash fails the generations it was running, not the web tier,
+and either side can be restarted on its own.
+
+Each call uses its own connection. Messages are frames of a 5-byte
+header (frame type, payload length) followed by a compact UTF-8 JSON
+payload:
+
+    client -> server  CALL    {"method": ..., "args": {...}, "request": {...}}
+    server -> client  EVENT   {"event": ..., "data": {...}}  (zero or more)
+    server -> client  RESULT  {"value": ...}                  or
+                      ERROR   {"detail": ...}
+
+Streaming methods send their events; other calls send "progress" events
+with the tokens generated so far. "request" carries the scheduling
+information of the web request (client, priority, remaining deadline),
+and closing the connection abandons the call's queued generations.
+
+The framing is binary but the payloads stay JSON on purpose. They are
+mostly document text and generated questions, which no binary encoding
+makes smaller: a 210 KB document is the same size in JSON as in
+marshal or pickle. Encoding and decoding it takes about 1 ms, and a
+quiz result about 40 us, next to generations that take seconds. JSON
+is also safe to decode from a socket (pickle is not) and does not
+depend on both processes running the same Python version (marshal
+does). msgpack would need a new dependency for no measurable gain.
+
+This module does not import torch, so the web process stays light.
+"""
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import struct
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from services.request_progress import RequestProgress, current_progress, track_progress
+from services.scheduler import GenerationRequest, current_request, track_request
+
+logger = logging.getLogger(__name__)
+
+FRAME_HEADER = struct.Struct("!BI")  # frame type, payload length
+FRAME_CALL = 1
+FRAME_EVENT = 2
+FRAME_RESULT = 3
+FRAME_ERROR = 4
+MAX_FRAME_BYTES = 64 * 1024 * 1024
+
+# Methods of the AI service callable over the socket
+CALL_METHODS = ("generate_quiz", "generate_summary")
+STREAM_METHODS = ("stream_quiz", "stream_summary")
+
+# How often the web process refreshes the status of each inference server
+STATUS_POLL_SECONDS = 2.0
+
+# How often a running call reports the tokens generated so far
+PROGRESS_INTERVAL_SECONDS = 0.5
+
+# How often a client call checks whether its web request was abandoned
+ABANDON_POLL_SECONDS = 0.5
+
+
+async def write_frame(writer: asyncio.StreamWriter, kind: int, payload: Any):
+    """Send one frame."""
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    writer.write(FRAME_HEADER.pack(kind, len(body)) + body)
+    await writer.drain()
+
+
+async def read_frame(reader: asyncio.StreamReader) -> Tuple[int, Any]:
+    """
+    Receive one frame.
+
+    Returns:
+        Tuple of (frame type, decoded payload)
+
+    Raises:
+        asyncio.IncompleteReadError: The other side closed the connection
+    """
+    kind, length = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+    if length > MAX_FRAME_BYTES:
+        raise Exception(f"Frame of {length} bytes exceeds the {MAX_FRAME_BYTES} byte limit")
+    return kind, json.loads(await reader.readexactly(length))
+
+
+class InferenceServer:
+    """Serves an AI service's generation methods on a Unix socket."""
+
+    def __init__(self, service, socket_path: str):
+        """
+        Initialize the server.
+
+        Args:
+            service: The LocalAIService doing the generations
+            socket_path: Path of the Unix socket to listen on
+        """
+        self.service = service
+        self.socket_path = socket_path
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        """Listen on the socket (replacing a stale socket file left by a previous run)."""
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(self.socket_path)
+        self._server = await asyncio.start_unix_server(self._handle, path=self.socket_path)
+        logger.info(f"✅ Inference server listening on {self.socket_path}")
+
+    async def serve_forever(self):
+        """Start and serve until cancelled."""
+        await self.start()
+        try:
+            async with self._server:
+                await self._server.serve_forever()
+        finally:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(self.socket_path)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Run one call and send its result."""
+        method = None
+        try:
+            kind, call = await read_frame(reader)
+            if kind != FRAME_CALL:
+                raise Exception(f"Expected a call frame, got type {kind}")
+            method, args = call["method"], call.get("args", {})
+
+            if method == "status":
+                value = {"ready": self.service.is_ready(), "stats": self.service.get_stats()}
+            elif method in CALL_METHODS or method in STREAM_METHODS:
+                request = GenerationRequest(**call.get("request", {}))
+                # The client sends nothing after the call, so a read only returns once it hangs up
+                watcher = asyncio.ensure_future(self._watch_hangup(reader, request))
+                try:
+                    with track_request(request):
+                        if method in CALL_METHODS:
+                            value = await self._call_with_progress(writer, getattr(self.service, method)(**args))
+                        else:
+                            async for event, data in getattr(self.service, method)(**args):
+                                await write_frame(writer, FRAME_EVENT, {"event": event, "data": data})
+                            value = None
+                finally:
+                    watcher.cancel()
+            else:
+                raise Exception(f"Unknown method: {method}")
+            await write_frame(writer, FRAME_RESULT, {"value": value})
+
+        except (asyncio.IncompleteReadError, ConnectionError):
+            logger.info(f"Client disconnected during {method or 'call'}")
+        except Exception as e:
+            logger.error(f"❌ Error in {method}: {str(e)}")
+            with contextlib.suppress(ConnectionError):
+                await write_frame(writer, FRAME_ERROR, {"detail": str(e)})
+        finally:
+            writer.close()
+
+    async def _watch_hangup(self, reader: asyncio.StreamReader, request: GenerationRequest):
+        """Abandon a call's request once its client closes the connection."""
+        with contextlib.suppress(ConnectionError):
+            await reader.read()
+        request.abandon()
+
+    async def _call_with_progress(self, writer: asyncio.StreamWriter, call) -> Any:
+        """Await a call, sending "progress" events with the tokens generated so far."""
+        progress = RequestProgress()
+        with track_progress(progress):
+            # The task copies the context, so its generations report to progress
+            task = asyncio.ensure_future(call)
+        try:
+            reported = 0
+            while not task.done():
+                await asyncio.wait([task], timeout=PROGRESS_INTERVAL_SECONDS)
+                if progress.tokens != reported:
+                    reported = progress.tokens
+                    await write_frame(writer, FRAME_EVENT, {"event": "progress", "data": {"tokens": reported}})
+            return task.result()
+        finally:
+            task.cancel()
+
+
+class RemoteAIService:
+    """
+    Client with the AI service interface used by the routes, backed by inference servers.
+
+    Calls go to the ready server with the fewest calls in flight. The
+    status of every server is polled in the background, so is_ready(),
+    loading_status() and get_stats() answer without a round trip.
+    """
+
+    def __init__(self, socket_paths: List[str]):
+        """
+        Initialize the client.
+
+        Args:
+            socket_paths: Unix sockets of the inference servers
+        """
+        self.socket_paths = socket_paths
+        self._status: Dict[str, Optional[Dict]] = {path: None for path in socket_paths}
+        self._in_flight: Dict[str, int] = {path: 0 for path in socket_paths}
+        self._poller: Optional[asyncio.Task] = None
+        logger.info(f"Using inference servers: {', '.join(socket_paths)}")
+
+    def start_background_loading(self):
+        """Start polling the inference servers (they load the model themselves)."""
+        if self._poller is None:
+            self._poller = asyncio.get_running_loop().create_task(self._poll_status())
+
+    def shutdown(self):
+        """Stop polling."""
+        if self._poller is not None:
+            self._poller.cancel()
+            self._poller = None
+
+    async def _poll_status(self):
+        """Refresh the status of every server, marking unreachable ones."""
+        while True:
+            for path in self.socket_paths:
+                try:
+                    self._status[path] = await self._call_server(path, "status", {})
+                except Exception as e:
+                    if self._status[path] is not None:
+                        logger.warning(f"Inference server {path} unreachable: {str(e)}")
+                    self._status[path] = None
+            await asyncio.sleep(STATUS_POLL_SECONDS)
+
+    def _ready_paths(self) -> List[str]:
+        return [path for path, status in self._status.items() if status and status["ready"]]
+
+    def is_ready(self) -> bool:
+        """Check if at least one inference server is ready."""
+        return bool(self._ready_paths())
+
+    def loading_status(self) -> Dict:
+        """Loading status of the most advanced inference server."""
+        reachable = [status for status in self._status.values() if status]
+        if not reachable:
+            return {"stage": "waiting for inference server", "progress": 0.0, "elapsed_seconds": 0.0, "error": None}
+        best = max(reachable, key=lambda status: (status["ready"], status["stats"]["loading"]["progress"]))
+        return best["stats"]["loading"]
+
+    def get_stats(self) -> Dict:
+        """
+        Get statistics of the inference servers.
+
+        Returns:
+            Stats of the first reachable server (LocalAIService.get_stats format)
+            with queue depth, in-flight and dropped counts summed over all servers,
+            plus an "inference_servers" list
+        """
+        reachable = [status["stats"] for status in self._status.values() if status]
+        stats = dict(reachable[0]) if reachable else {
+            "model": {"precision": "", "tokens_per_sec": 0.0},
+            "loading": self.loading_status(),
+        }
+        stats["executor"] = {
+            "queue_depth": sum(s["executor"]["queue_depth"] for s in reachable),
+            "in_flight": sum(s["executor"]["in_flight"] for s in reachable),
+            "dropped": sum(s["executor"]["dropped"] for s in reachable),
+        }
+        stats["inference_servers"] = [
+            {
+                "socket": path,
+                "reachable": status is not None,
+                "ready": bool(status and status["ready"]),
+                "calls_in_flight": self._in_flight[path],
+            }
+            for path, status in self._status.items()
+        ]
+        return stats
+
+    def queue_depth(self) -> int:
+        """Number of generations waiting on all inference servers (as of the last status poll)."""
+        return sum(status["stats"]["executor"]["queue_depth"] for status in self._status.values() if status)
+
+    def _pick_server(self) -> str:
+        """Ready server with the fewest calls in flight."""
+        paths = self._ready_paths()
+        if not paths:
+            raise Exception("No inference server is ready")
+        return min(paths, key=lambda path: self._in_flight[path])
+
+    @contextlib.asynccontextmanager
+    async def _connect(self, path: str, method: str, args: Dict):
+        """
+        Open a connection to a server and send a call.
+
+        The call carries the current request, if any; the connection is
+        closed as soon as that request is abandoned, so the server drops
+        the call's generations too.
+        """
+        request = current_request.get()
+        call = {"method": method, "args": args}
+        if request:
+            remaining = request.deadline - time.time() if request.deadline is not None else 0
+            # A deadline that already passed still has to be sent as one
+            call["request"] = dict(request.to_dict(), deadline_seconds=max(remaining, 0.001) if remaining else 0)
+
+        reader, writer = await asyncio.open_unix_connection(path, limit=MAX_FRAME_BYTES)
+        self._in_flight[path] += 1
+        watcher = asyncio.ensure_future(self._watch_abandon(request, writer)) if request else None
+        try:
+            await write_frame(writer, FRAME_CALL, call)
+            yield reader
+        finally:
+            if watcher:
+                watcher.cancel()
+            self._in_flight[path] -= 1
+            writer.close()
+
+    async def _watch_abandon(self, request: GenerationRequest, writer: asyncio.StreamWriter):
+        """Hang up on the server once the request is abandoned."""
+        while not request.abandoned:
+            await asyncio.sleep(ABANDON_POLL_SECONDS)
+        writer.close()
+
+    async def _call_server(self, path: str, method: str, args: Dict) -> Any:
+        """Run a call on one server and return its result, passing on its progress."""
+        progress = current_progress.get()
+        async with self._connect(path, method, args) as reader:
+            while True:
+                kind, payload = await self._read_reply(reader, path)
+                if kind == FRAME_RESULT:
+                    return payload["value"]
+                if progress and payload["event"] == "progress":
+                    progress.set_tokens(payload["data"]["tokens"])
+
+    async def _read_reply(self, reader: asyncio.StreamReader, path: str) -> Tuple[int, Any]:
+        """Read a frame from a server, raising its errors."""
+        try:
+            kind, payload = await read_frame(reader)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            request = current_request.get()
+            if request and request.abandoned:
+                # We hung up ourselves
+                raise Exception("Generation dropped: client disconnected")
+            # The server died or was restarted mid-call
+            self._status[path] = None
+            raise Exception(f"Inference server {path} closed the connection")
+        if kind == FRAME_ERROR:
+            raise Exception(payload["detail"])
+        return kind, payload
+
+    async def _stream(self, method: str, args: Dict) -> AsyncIterator[Tuple[str, Dict]]:
+        """Run a streaming call, yielding its (event, data) tuples."""
+        path = self._pick_server()
+        async with self._connect(path, method, args) as reader:
+            while True:
+                kind, payload = await self._read_reply(reader, path)
+                if kind == FRAME_RESULT:
+                    return
+                yield payload["event"], payload["data"]
+
+    async def generate_quiz(self, content: str, num_questions: int = 5, profile: Optional[str] = None) -> List[Dict]:
+        """Generate quiz questions on an inference server."""
+        args = {"content": content, "num_questions": num_questions, "profile": profile}
+        return await self._call_server(self._pick_server(), "generate_quiz", args)
+
+    async def generate_summary(self, content: str, profile: Optional[str] = None) -> List[Dict]:
+        """Generate summary sections on an inference server."""
+        args = {"content": content, "profile": profile}
+        return await self._call_server(self._pick_server(), "generate_summary", args)
+
+    def stream_quiz(self, content: str, num_questions: int = 5,
+                    profile: Optional[str] = None) -> AsyncIterator[Tuple[str, Dict]]:
+        """Stream quiz events from an inference server."""
+        return self._stream("stream_quiz", {"content": content, "num_questions": num_questions, "profile": profile})
+
+    def stream_summary(self, content: str, profile: Optional[str] = None) -> AsyncIterator[Tuple[str, Dict]]:
+        """Stream summary events from an inference server."""
+        return self._stream("stream_summary", {"content": content, "profile": profile})
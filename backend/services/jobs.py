@@ -0,0 +1,192 @@
+"""
+Background generation jobs that clients poll instead of holding a connection open.
+
+A job runs its generation on the event loop (the model work itself goes
+to the inference worker pool) while the client polls for its status,
+tokens generated so far and result. Finished jobs are kept for a while
+so the result can be fetched, in a store bounded by size and age.
+"""
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from services.request_progress import RequestProgress, track_progress
+from services.scheduler import GenerationRequest
+
+logger = logging.getLogger(__name__)
+
+
+class Job:
+    """One generation job and its outcome."""
+
+    def __init__(self, kind: str, request: Optional[GenerationRequest] = None):
+        """
+        Initialize a queued job.
+
+        Args:
+            kind: What the job generates (e.g. "quiz", "summary")
+            request: Scheduling request of the job's generations; the job
+                     stays queued until the first of them starts
+        """
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.request = request
+        self._status = "queued"  # queued, running, succeeded, failed
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.progress = RequestProgress()
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.task: Optional[asyncio.Task] = None
+
+    @property
+    def status(self) -> str:
+        # Its generations may still wait in the inference queue
+        if self._status == "running" and self.request is not None and not self.request.started:
+            return "queued"
+        return self._status
+
+    @status.setter
+    def status(self, status: str):
+        self._status = status
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("succeeded", "failed")
+
+    @property
+    def elapsed_seconds(self) -> float:
+        """Seconds since the job started running (until it finished)."""
+        started = self.started
+        if self.request is not None and (self.request.started or not self.done):
+            started = self.request.started_at
+        if started is None:
+            return 0.0
+        return (self.finished or time.time()) - started
+
+
+class JobStore:
+    """
+    Runs jobs and keeps them, finished or not, until they expire.
+
+    Finished jobs expire ttl_seconds after finishing; when the store is
+    full the oldest finished jobs make room. Unfinished jobs are never
+    dropped, so a store full of them refuses new jobs.
+    """
+
+    def __init__(self, max_jobs: int = 100, ttl_seconds: int = 3600):
+        """
+        Initialize the store.
+
+        Args:
+            max_jobs: Maximum number of jobs kept (finished or not)
+            ttl_seconds: How long a finished job's result is kept
+        """
+        self.max_jobs = max(1, max_jobs)
+        self.ttl_seconds = ttl_seconds
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._submitted = 0
+        self._rejected = 0
+        self._expired = 0
+
+    def submit(self, kind: str, run: Callable[[], Awaitable[Any]],
+               request: Optional[GenerationRequest] = None) -> Optional[Job]:
+        """
+        Start a job. Must be called from within a running event loop.
+
+        Args:
+            kind: What the job generates
+            run: Coroutine function producing the job's result
+            request: Scheduling request run() generates under, if any
+
+        Returns:
+            The job, or None if the store is full of unfinished jobs
+        """
+        with self._lock:
+            self._expire()
+            self._make_room()
+            if len(self._jobs) >= self.max_jobs:
+                self._rejected += 1
+                return None
+            job = Job(kind, request)
+            self._jobs[job.id] = job
+            self._submitted += 1
+
+        job.task = asyncio.get_running_loop().create_task(self._run(job, run))
+        logger.info(f"Job {job.id} ({kind}) submitted")
+        return job
+
+    async def _run(self, job: Job, run: Callable[[], Awaitable[Any]]):
+        """Run a job, recording its progress and outcome."""
+        job.status = "running"
+        job.started = time.time()
+        try:
+            # Generations started by run() report their tokens to the job
+            with track_progress(job.progress):
+                job.result = await run()
+            job.finished = time.time()
+            job.status = "succeeded"
+            logger.info(f"✅ Job {job.id} ({job.kind}) finished in {job.elapsed_seconds:.2f} seconds")
+        except Exception as e:
+            job.finished = time.time()
+            job.error = str(e)
+            job.status = "failed"
+            logger.error(f"❌ Job {job.id} ({job.kind}) failed: {str(e)}")
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """
+        Look up a job.
+
+        Returns:
+            The job, or None if it is unknown or has expired
+        """
+        with self._lock:
+            self._expire()
+            return self._jobs.get(job_id)
+
+    def _expire(self):
+        """Drop finished jobs older than the TTL."""
+        now = time.time()
+        for job_id, job in list(self._jobs.items()):
+            if job.done and now - job.finished > self.ttl_seconds:
+                del self._jobs[job_id]
+                self._expired += 1
+
+    def _make_room(self):
+        """Drop the oldest finished jobs until a new job fits."""
+        for job_id, job in list(self._jobs.items()):
+            if len(self._jobs) < self.max_jobs:
+                break
+            if job.done:
+                del self._jobs[job_id]
+                self._expired += 1
+
+    def stats(self) -> Dict:
+        """
+        Get job statistics.
+
+        Returns:
+            Dict with jobs kept, running, submitted, rejected and expired counts
+        """
+        with self._lock:
+            return {
+                "max_jobs": self.max_jobs,
+                "jobs": len(self._jobs),
+                "running": sum(1 for job in self._jobs.values() if not job.done),
+                "submitted": self._submitted,
+                "rejected": self._rejected,
+                "expired": self._expired,
+            }
+
+    def shutdown(self):
+        """Cancel unfinished jobs."""
+        with self._lock:
+            for job in self._jobs.values():
+                if job.task and not job.done:
+                    job.task.cancel()
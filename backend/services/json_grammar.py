@@ -0,0 +1,417 @@
+"""
+Schema-constrained JSON decoding.
+
+A JSON schema (from the Pydantic response models) is compiled into a small
+pushdown automaton that accepts exactly the JSON documents of that shape.
+A logits processor then masks every token that would take the output off
+the grammar, and forces end-of-sequence as soon as the top-level object
+is closed.
+"""
+import logging
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import torch
+from transformers import LogitsProcessor
+
+logger = logging.getLogger(__name__)
+
+WHITESPACE = " \t\n\r"
+DIGITS = "0123456789"
+HEX_DIGITS = "0123456789abcdefABCDEF"
+ESCAPES = '"\\/bfnrtu'
+
+# Node kinds
+OBJECT, ARRAY, STRING, INTEGER = "object", "array", "string", "integer"
+
+# A parser frame is (node_id, phase, counter, position); the state is a tuple
+# of frames, so trying a token on a copy of the state costs nothing.
+Frame = Tuple[int, int, int, int]
+State = Tuple[Frame, ...]
+
+
+class JSONGrammar:
+    """
+    Pushdown automaton for the JSON documents matching a schema.
+
+    Supported schema subset (what the Pydantic models use): objects with
+    properties (all emitted, in declaration order), arrays, strings and
+    integers (with minimum/maximum), with $ref to $defs.
+    """
+
+    def __init__(self, schema: Dict, array_limits: Optional[Dict[str, Union[int, Tuple[int, int]]]] = None,
+                 max_string_length: int = 500, max_integer_digits: int = 3,
+                 integer_ranges: Optional[Dict[str, Tuple[int, int]]] = None):
+        """
+        Compile a JSON schema.
+
+        Args:
+            schema: JSON schema (e.g. QuizResponse.model_json_schema())
+            array_limits: Item count for arrays, by property name: a maximum,
+                or a (minimum, maximum) pair
+            max_string_length: Longest string value allowed
+            max_integer_digits: Longest integer value allowed
+            integer_ranges: (minimum, maximum) of integers, by property name
+        """
+        self.definitions = schema.get("$defs", {})
+        self.array_limits = array_limits or {}
+        self.integer_ranges = integer_ranges or {}
+        self.max_string_length = max_string_length
+        self.max_integer_digits = max_integer_digits
+        # Each node: (kind, payload); payload depends on kind
+        self.nodes: List[Tuple[str, object]] = []
+        self.root = self._compile(schema, None)
+
+    def _compile(self, schema: Dict, property_name: Optional[str]) -> int:
+        """Add the node for a (sub)schema and return its id."""
+        if "$ref" in schema:
+            schema = self.definitions[schema["$ref"].split("/")[-1]]
+
+        kind = schema.get("type")
+        node_id = len(self.nodes)
+        self.nodes.append((kind, None))
+
+        if kind == OBJECT:
+            properties = [
+                ('"' + name + '"', self._compile(child, name))
+                for name, child in schema.get("properties", {}).items()
+            ]
+            self.nodes[node_id] = (OBJECT, properties)
+        elif kind == ARRAY:
+            item = self._compile(schema.get("items", {"type": STRING}), None)
+            min_items = schema.get("minItems", 1)
+            max_items = schema.get("maxItems", 0)
+            limit = self.array_limits.get(property_name)
+            if isinstance(limit, tuple):
+                min_items, max_items = limit
+            elif limit:
+                max_items = limit
+            self.nodes[node_id] = (ARRAY, (item, min_items, max_items))
+        elif kind == STRING:
+            self.nodes[node_id] = (STRING, schema.get("maxLength", self.max_string_length))
+        elif kind == INTEGER:
+            minimum, maximum = self.integer_ranges.get(
+                property_name, (schema.get("minimum"), schema.get("maximum"))
+            )
+            self.nodes[node_id] = (INTEGER, (self.max_integer_digits, minimum, maximum))
+        else:
+            raise ValueError(f"Unsupported schema type for constrained decoding: {kind}")
+
+        return node_id
+
+    def initial_state(self) -> State:
+        """State before any output."""
+        return ((self.root, 0, 0, 0),)
+
+    def is_complete(self, state: Optional[State]) -> bool:
+        """Whether the top-level value has been closed."""
+        return state == ()
+
+    def feed(self, state: Optional[State], text: str) -> Optional[State]:
+        """
+        Advance the automaton over text.
+
+        Args:
+            state: Current state (None means already invalid)
+            text: Characters to consume
+
+        Returns:
+            New state, or None if text leaves the grammar
+        """
+        for char in text:
+            if state is None:
+                return None
+            state = self._feed_char(state, char)
+        return state
+
+    def _feed_char(self, state: State, char: str) -> Optional[State]:
+        """Consume one character."""
+        while True:
+            if not state:
+                # Only trailing whitespace after the document is closed
+                return state if char in WHITESPACE else None
+
+            frame = state[-1]
+            action = self._step(frame, char)
+            if action is None:
+                return None
+
+            kind = action[0]
+            if kind == "stay":
+                return state[:-1] + (action[1],)
+            if kind == "enter":
+                # Parent consumed the char (":") and now waits for the child's value
+                return state[:-1] + (action[1], action[2])
+            if kind == "push":
+                # Parent advances to its after-value phase; child sees the same char
+                state = state[:-1] + (action[1], action[2])
+                continue
+            if kind == "pop":
+                return state[:-1]
+            # "pop_refeed": the value ended just before this char (integers)
+            state = state[:-1]
+
+    def _step(self, frame: Frame, char: str):
+        """Transition of a single frame; see the node kinds for the phases."""
+        kind, payload = self.nodes[frame[0]]
+
+        if kind == OBJECT:
+            return self._step_object(frame, payload, char)
+        if kind == ARRAY:
+            return self._step_array(frame, payload, char)
+        if kind == STRING:
+            return self._step_string(frame, payload, char)
+        return self._step_integer(frame, payload, char)
+
+    def _step_object(self, frame: Frame, properties, char: str):
+        # Phases: 0 before "{", 1 before key, 2 inside key literal,
+        # 3 before ":", 4 after value (before "," or "}")
+        node_id, phase, index, position = frame
+
+        if phase == 0:
+            if char in WHITESPACE:
+                return ("stay", frame)
+            if char == "{":
+                # An object without properties goes straight to expecting "}"
+                return ("stay", (node_id, 1, 0, 0)) if properties else ("stay", (node_id, 4, -1, 0))
+            return None
+
+        if phase == 1:
+            if char in WHITESPACE:
+                return ("stay", frame)
+            if char == '"':
+                return ("stay", (node_id, 2, index, 1))
+            return None
+
+        if phase == 2:
+            key = properties[index][0]
+            if char != key[position]:
+                return None
+            if position + 1 == len(key):
+                return ("stay", (node_id, 3, index, 0))
+            return ("stay", (node_id, 2, index, position + 1))
+
+        if phase == 3:
+            if char in WHITESPACE:
+                return ("stay", frame)
+            if char == ":":
+                child = properties[index][1]
+                return ("enter", (node_id, 4, index, 0), (child, 0, 0, 0))
+            return None
+
+        # phase 4
+        if char in WHITESPACE:
+            return ("stay", frame)
+        if index + 1 < len(properties):
+            return ("stay", (node_id, 1, index + 1, 0)) if char == "," else None
+        return ("pop",) if char == "}" else None
+
+    def _step_array(self, frame: Frame, payload, char: str):
+        # Phases: 0 before "[", 1 after "[", 2 after an item, 3 after ","
+        node_id, phase, count, _ = frame
+        item, min_items, max_items = payload
+
+        if char in WHITESPACE:
+            return ("stay", frame)
+
+        if phase == 0:
+            return ("stay", (node_id, 1, 0, 0)) if char == "[" else None
+
+        if phase == 1 and char == "]":
+            return ("pop",) if min_items == 0 else None
+
+        if phase in (1, 3):
+            return ("push", (node_id, 2, count + 1, 0), (item, 0, 0, 0))
+
+        # phase 2
+        if char == "," and (not max_items or count < max_items):
+            return ("stay", (node_id, 3, count, 0))
+        if char == "]" and count >= min_items:
+            return ("pop",)
+        return None
+
+    def _step_string(self, frame: Frame, max_length: int, char: str):
+        # Phases: 0 before opening quote, 1 inside, 2 after backslash, 3 in \\uXXXX
+        node_id, phase, length, hex_left = frame
+
+        if phase == 0:
+            if char in WHITESPACE:
+                return ("stay", frame)
+            return ("stay", (node_id, 1, 0, 0)) if char == '"' else None
+
+        if phase == 1:
+            if char == '"':
+                return ("pop",)
+            if length >= max_length or ord(char) < 0x20:
+                return None
+            if char == "\\":
+                return ("stay", (node_id, 2, length, 0))
+            return ("stay", (node_id, 1, length + 1, 0))
+
+        if phase == 2:
+            if char not in ESCAPES:
+                return None
+            if char == "u":
+                return ("stay", (node_id, 3, length, 4))
+            return ("stay", (node_id, 1, length + 1, 0))
+
+        # phase 3
+        if char not in HEX_DIGITS:
+            return None
+        if hex_left == 1:
+            return ("stay", (node_id, 1, length + 1, 0))
+        return ("stay", (node_id, 3, length, hex_left - 1))
+
+    def _step_integer(self, frame: Frame, payload, char: str):
+        # Phases: 0 before the number, 1 after "-", 2 in digits, 3 after a leading 0;
+        # the last frame slot holds the (signed) value so far
+        node_id, phase, digits, value = frame
+        max_digits, minimum, maximum = payload
+
+        if phase == 0:
+            if char in WHITESPACE:
+                return ("stay", frame)
+            if char == "-":
+                return ("stay", (node_id, 1, 0, 0)) if minimum is None or minimum < 0 else None
+
+        if phase in (0, 1):
+            if char == "0":
+                in_range = (minimum is None or minimum <= 0) and (maximum is None or maximum >= 0)
+                return ("stay", (node_id, 3, 1, 0)) if in_range else None
+            if char in DIGITS:
+                value = -int(char) if phase == 1 else int(char)
+                if not self._integer_reachable(value, max_digits - 1, minimum, maximum):
+                    return None
+                return ("stay", (node_id, 2, 1, value))
+            return None
+
+        if phase == 2 and char in DIGITS:
+            if digits >= max_digits:
+                return None
+            value = value * 10 - int(char) if value < 0 else value * 10 + int(char)
+            if not self._integer_reachable(value, max_digits - digits - 1, minimum, maximum):
+                return None
+            return ("stay", (node_id, 2, digits + 1, value))
+
+        # Any other char ends the number and belongs to the parent
+        if (minimum is not None and value < minimum) or (maximum is not None and value > maximum):
+            return None
+        return ("pop_refeed",)
+
+    @staticmethod
+    def _integer_reachable(value: int, digits_left: int, minimum: Optional[int], maximum: Optional[int]) -> bool:
+        """Whether an integer starting with value's digits can still end in [minimum, maximum]."""
+        for extra in range(digits_left + 1):
+            scale = 10 ** extra
+            if value < 0:
+                low, high = value * scale - (scale - 1), value * scale
+            else:
+                low, high = value * scale, value * scale + (scale - 1)
+            if (minimum is None or high >= minimum) and (maximum is None or low <= maximum):
+                return True
+        return False
+
+
+class JSONLogitsProcessor(LogitsProcessor):
+    """
+    Masks tokens that would make the output leave its JSON grammar.
+
+    Each batch row has its own grammar (or None for unconstrained rows).
+    Only the highest-scoring candidates are checked at every step, so the
+    cost per token stays small even with a 50k-token vocabulary.
+    """
+
+    def __init__(self, grammars: Sequence[Optional[JSONGrammar]], token_strings: List[str],
+                 eos_token_id: int, top_candidates: int = 64, max_whitespace: int = 8):
+        """
+        Initialize the processor.
+
+        Args:
+            grammars: Grammar for each batch row (None = unconstrained)
+            token_strings: Decoded text of every token id
+            eos_token_id: Token allowed once the document is complete
+            top_candidates: Candidates checked per step before a full-vocabulary scan
+            max_whitespace: Longest run of whitespace allowed between tokens
+        """
+        self.grammars = list(grammars)
+        self.token_strings = token_strings
+        self.eos_token_id = eos_token_id
+        self.top_candidates = top_candidates
+        self.max_whitespace = max_whitespace
+        # Generated token ids of each row and the (state, whitespace run) after each of
+        # them. Assisted decoding rolls rejected draft tokens back, so on every call a
+        # row resumes from the longest prefix it has already seen.
+        self.tokens: List[List[int]] = [[] for _ in self.grammars]
+        self.history: List[List[Tuple]] = [
+            [(grammar.initial_state(), 0)] if grammar else [] for grammar in self.grammars
+        ]
+        self.prompt_length = None
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor) -> torch.FloatTensor:
+        # The first call sees only the (padded) prompt
+        if self.prompt_length is None:
+            self.prompt_length = input_ids.shape[1]
+
+        generated = input_ids[:, self.prompt_length:].tolist()
+
+        for row, grammar in enumerate(self.grammars):
+            if grammar is None:
+                continue
+            state, whitespace = self._advance(row, grammar, generated[row])
+
+            allowed = self._allowed_tokens(grammar, state, scores[row], whitespace)
+            mask = torch.full_like(scores[row], float("-inf"))
+            mask[allowed] = 0
+            scores[row] = scores[row] + mask
+
+        return scores
+
+    def _advance(self, row: int, grammar: JSONGrammar, generated: List[int]) -> Tuple:
+        """Bring a row's grammar state up to date with its generated tokens."""
+        tokens, history = self.tokens[row], self.history[row]
+        common = 0
+        for seen, token_id in zip(tokens, generated):
+            if seen != token_id:
+                break
+            common += 1
+        del tokens[common:]
+        del history[common + 1:]
+
+        state, whitespace = history[-1]
+        for token_id in generated[common:]:
+            if state is not None and not grammar.is_complete(state):
+                text = self.token_strings[token_id]
+                state = grammar.feed(state, text)
+                stripped = text.rstrip(WHITESPACE)
+                whitespace = len(text) - len(stripped) if stripped else whitespace + len(text)
+            tokens.append(token_id)
+            history.append((state, whitespace))
+        return state, whitespace
+
+    def _allowed_tokens(self, grammar: JSONGrammar, state: Optional[State], row_scores: torch.Tensor,
+                        whitespace: int) -> List[int]:
+        """Token ids that keep the row on its grammar, best candidates first."""
+        if state is None or grammar.is_complete(state):
+            return [self.eos_token_id]
+
+        vocab_size = min(row_scores.shape[-1], len(self.token_strings))
+        top = torch.topk(row_scores[:vocab_size], min(self.top_candidates, vocab_size)).indices.tolist()
+        allowed = [token_id for token_id in top if self._is_allowed(grammar, state, token_id, whitespace)]
+        if allowed:
+            return allowed
+
+        # None of the likely tokens fit: scan the whole vocabulary by score
+        for token_id in torch.argsort(row_scores[:vocab_size], descending=True).tolist():
+            if self._is_allowed(grammar, state, token_id, whitespace):
+                return [token_id]
+
+        logger.warning("No token satisfies the JSON grammar, ending generation")
+        return [self.eos_token_id]
+
+    def _is_allowed(self, grammar: JSONGrammar, state: State, token_id: int, whitespace: int) -> bool:
+        """Whether a token's text can follow the current state."""
+        text = self.token_strings[token_id]
+        if not text or token_id == self.eos_token_id:
+            return False
+        if not text.strip(WHITESPACE) and whitespace + len(text) > self.max_whitespace:
+            return False
+        return grammar.feed(state, text) is not None
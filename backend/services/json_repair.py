@@ -0,0 +1,189 @@
+"""
+Tolerant parsing of JSON written by language models.
+
+Small models often produce almost-JSON: trailing commas, missing commas,
+single-quoted or unquoted keys, Python literals, markdown fences around
+the object, or output cut off by the token limit. The parser here reads
+such text in one linear pass, repairs what it can, and salvages the
+complete parts of truncated output instead of failing outright.
+"""
+import logging
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+WHITESPACE = " \t\n\r"
+LITERALS = {
+    "true": True, "false": False, "null": None,
+    "True": True, "False": False, "None": None,
+}
+ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f", "/": "/", "\\": "\\", '"': '"', "'": "'"}
+
+
+class _Truncated(Exception):
+    """The input ended inside a value; carries what was complete of it (containers only)."""
+
+    def __init__(self, partial: Any = None):
+        super().__init__()
+        self.partial = partial
+
+
+class _TolerantParser:
+    """Recursive-descent parser that accepts common LLM defects."""
+
+    def __init__(self, text: str, pos: int = 0):
+        self.text = text
+        self.pos = pos
+
+    def _skip(self, chars: str):
+        while self.pos < len(self.text) and self.text[self.pos] in chars:
+            self.pos += 1
+
+    def _peek(self) -> str:
+        if self.pos >= len(self.text):
+            raise _Truncated()
+        return self.text[self.pos]
+
+    def value(self) -> Any:
+        self._skip(WHITESPACE)
+        char = self._peek()
+        if char == "{":
+            return self.object()
+        if char == "[":
+            return self.array()
+        if char in "\"'":
+            return self.string()
+        return self.literal()
+
+    def object(self) -> Dict:
+        self.pos += 1
+        result = {}
+        while True:
+            # Extra and trailing commas are skipped
+            self._skip(WHITESPACE + ",")
+            try:
+                char = self._peek()
+            except _Truncated:
+                raise _Truncated(result)
+            if char == "}":
+                self.pos += 1
+                return result
+            if char == "]":
+                # Mismatched bracket: treat it as the end of this object
+                return result
+
+            key = None
+            try:
+                key = self.string() if char in "\"'" else self._bare_word(":")
+                self._skip(WHITESPACE)
+                if self._peek() == ":":
+                    self.pos += 1
+                value = self.value()
+            except _Truncated as truncated:
+                # Keep what was complete of a container value, drop a cut-off scalar
+                if truncated.partial is not None and key is not None:
+                    result[key] = truncated.partial
+                raise _Truncated(result)
+            result[key] = value
+
+    def array(self) -> list:
+        self.pos += 1
+        result = []
+        while True:
+            self._skip(WHITESPACE + ",")
+            try:
+                char = self._peek()
+            except _Truncated:
+                raise _Truncated(result)
+            if char == "]":
+                self.pos += 1
+                return result
+            if char == "}":
+                return result
+            try:
+                result.append(self.value())
+            except _Truncated:
+                # A cut-off item (e.g. half a question) is dropped
+                raise _Truncated(result)
+
+    def string(self) -> str:
+        quote = self.text[self.pos]
+        self.pos += 1
+        chars = []
+        while True:
+            char = self._peek()
+            self.pos += 1
+            if char == quote:
+                return "".join(chars)
+            if char != "\\":
+                chars.append(char)
+                continue
+            escape = self._peek()
+            self.pos += 1
+            if escape == "u":
+                digits = self.text[self.pos:self.pos + 4]
+                if len(digits) < 4:
+                    raise _Truncated()
+                self.pos += 4
+                try:
+                    chars.append(chr(int(digits, 16)))
+                except ValueError:
+                    chars.append("\\u" + digits)
+            else:
+                chars.append(ESCAPES.get(escape, escape))
+
+    def literal(self) -> Any:
+        word = self._bare_word(",}]" + WHITESPACE)
+        if not word:
+            # Missing value, e.g. {"a": }
+            return None
+        if word in LITERALS:
+            return LITERALS[word]
+        try:
+            return int(word)
+        except ValueError:
+            pass
+        try:
+            return float(word)
+        except ValueError:
+            # Unquoted text value
+            return word
+
+    def _bare_word(self, terminators: str) -> str:
+        start = self.pos
+        while self.pos < len(self.text) and self.text[self.pos] not in terminators:
+            self.pos += 1
+        if self.pos >= len(self.text):
+            # The word may have been cut off mid-way
+            raise _Truncated()
+        return self.text[start:self.pos].strip()
+
+
+def parse_json_tolerant(text: str) -> Optional[Dict]:
+    """
+    Parse the first JSON object in text, repairing common defects.
+
+    Handles markdown fences and text around the object, trailing and
+    missing commas, single-quoted strings, unquoted keys, Python literals
+    and raw newlines in strings. If the output was cut off, the complete
+    members and list items are kept and the unfinished ones dropped.
+
+    Args:
+        text: Model output that should contain a JSON object
+
+    Returns:
+        The parsed object, or None if the text contains no object
+    """
+    start = text.find("{")
+    if start == -1:
+        return None
+
+    parser = _TolerantParser(text, start)
+    try:
+        return parser.object()
+    except _Truncated as truncated:
+        logger.debug(f"Salvaged truncated JSON output ({len(text) - start} characters)")
+        return truncated.partial
+    except RecursionError:
+        logger.warning("JSON output nested too deeply to parse")
+        return None
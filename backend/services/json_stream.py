@@ -0,0 +1,214 @@
+"""Incremental scanning of model output for completed JSON list items."""
+import logging
+from typing import Callable, Dict, List, Optional
+
+import torch
+from transformers import StoppingCriteria
+
+from services.json_repair import parse_json_tolerant
+
+logger = logging.getLogger(__name__)
+
+
+class JSONItemScanner:
+    """
+    Watches generated text as it streams in and yields each object of the
+    top-level list (e.g. one quiz question or summary section) as soon as
+    its closing brace is produced.
+
+    Example: for {"questions":[{...},{...}]} the two inner objects are
+    returned one by one while the rest of the output is still generating.
+
+    Items are parsed with the tolerant parser, so trailing commas or
+    single quotes inside an item don't lose it; result() salvages the
+    whole document, even if generation was cut off.
+    """
+
+    def __init__(self):
+        """Initialize an empty scanner."""
+        self.buffer = ""
+        self._pos = 0
+        self._stack: List[str] = []
+        self._in_string = False
+        self._quote = '"'
+        self._escaped = False
+        self._item_start = None
+        # Buffer offsets just past the last completed item / the top-level closing bracket
+        self.item_end = None
+        self.closed_at = None
+
+    def feed(self, text: str) -> List[Dict]:
+        """
+        Consume a chunk of generated text.
+
+        Args:
+            text: New text produced by the model
+
+        Returns:
+            List of list items completed by this chunk
+        """
+        self.buffer += text
+        items = []
+
+        while self._pos < len(self.buffer):
+            char = self.buffer[self._pos]
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == self._quote:
+                    self._in_string = False
+            elif char == '"' or (char == "'" and self._stack):
+                # Single-quoted strings only count inside the JSON, not in text before it
+                self._in_string = True
+                self._quote = char
+            elif char in "{[":
+                # An object directly inside the top-level object's list is an item
+                if char == "{" and self._stack == ["{", "["]:
+                    self._item_start = self._pos
+                self._stack.append(char)
+            elif char in "}]":
+                if self._stack:
+                    self._stack.pop()
+                    if not self._stack and self.closed_at is None:
+                        self.closed_at = self._pos + 1
+                if char == "}" and self._stack == ["{", "["] and self._item_start is not None:
+                    item = self._parse_item(self.buffer[self._item_start:self._pos + 1])
+                    if item is not None:
+                        items.append(item)
+                        self.item_end = self._pos + 1
+                    self._item_start = None
+
+            self._pos += 1
+
+        return items
+
+    def _parse_item(self, raw: str):
+        """Parse one completed item, skipping it if it can't be repaired."""
+        item = parse_json_tolerant(raw)
+        if not item:
+            logger.debug(f"Skipping malformed streamed item: {raw[:80]}")
+            return None
+        return item
+
+    def result(self) -> Optional[Dict]:
+        """
+        Parse everything fed so far as one document.
+
+        Returns:
+            The top-level object with unfinished trailing items dropped,
+            or None if no object was produced
+        """
+        return parse_json_tolerant(self.buffer)
+
+
+class JSONStoppingCriteria(StoppingCriteria):
+    """
+    Stops generation as soon as each row's JSON output is complete: its
+    top-level object has closed, or its list holds the requested number of
+    items. Without it the model keeps writing extra items or junk after the
+    JSON until max_new_tokens runs out.
+
+    Rows of a batch finish independently; the batch stops once every row
+    is finished (completed JSON, EOS or its own token limit).
+    """
+
+    def __init__(self, tokenizer, max_new_tokens: List[int], max_items: List[int],
+                 prompt_length: Optional[int] = None,
+                 on_items: Optional[Callable[[int, List[Dict]], None]] = None):
+        """
+        Initialize the criteria.
+
+        Args:
+            tokenizer: Tokenizer used to decode the generated tokens
+            max_new_tokens: Token limit of each row
+            max_items: Number of list items wanted for each row (0 = until the object closes)
+            prompt_length: Length of the (padded) prompt; required when a step can add
+                several tokens (assisted decoding), otherwise inferred from the first call
+            on_items: Called with (row, new items) as soon as a row's list items complete,
+                on the thread running the generation
+        """
+        self.tokenizer = tokenizer
+        self.max_new_tokens = max_new_tokens
+        self.max_items = max_items
+        self.scanners = [JSONItemScanner() for _ in max_items]
+        self.item_counts = [0] * len(max_items)
+        self.outputs: List[Optional[str]] = [None] * len(max_items)
+        self.stopped_at: List[Optional[int]] = [None] * len(max_items)
+        self.prompt_length = prompt_length
+        self.on_items = on_items
+        # Per row, (prefix, read) token offsets: text up to read has been fed to the
+        # scanner; tokens from prefix on are decoded again for context
+        self.offsets = [(0, 0)] * len(max_items)
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs) -> bool:
+        # Plain decoding calls after every token, so the first call sees exactly one
+        if self.prompt_length is None:
+            self.prompt_length = input_ids.shape[1] - 1
+        generated = input_ids.shape[1] - self.prompt_length
+
+        for row in range(len(self.scanners)):
+            if self.stopped_at[row] is not None:
+                continue
+
+            tokens = input_ids[row, self.prompt_length:]
+            if generated >= self.max_new_tokens[row]:
+                self.stopped_at[row] = self.max_new_tokens[row]
+                continue
+            if tokens[-1].item() == self.tokenizer.eos_token_id:
+                self.stopped_at[row] = generated
+                continue
+
+            output = self._scan(row, tokens)
+            if output is not None:
+                self.outputs[row] = output
+                self.stopped_at[row] = generated
+
+        return all(stopped is not None for stopped in self.stopped_at)
+
+    def _new_text(self, row: int, tokens: torch.LongTensor) -> Optional[str]:
+        """
+        Text added by a row's tokens since the last call.
+
+        Only the new tokens are decoded, together with the previous token or
+        so as context (tokenizers render a token differently at the start of
+        a sequence, e.g. its leading space), so each step costs the same
+        however long the output already is.
+        """
+        prefix, read = self.offsets[row]
+        # Cleaning up spaces (e.g. " ?" to "?") depends on the following text, so it is left out
+        options = {"skip_special_tokens": True, "clean_up_tokenization_spaces": False}
+        previous = self.tokenizer.decode(tokens[prefix:read], **options)
+        text = self.tokenizer.decode(tokens[prefix:], **options)
+        if text.endswith("\ufffd"):
+            # Incomplete multi-byte character, wait for the next token
+            return None
+        self.offsets[row] = (read, len(tokens))
+        return text[len(previous):]
+
+    def _scan(self, row: int, tokens: torch.LongTensor) -> Optional[str]:
+        """Feed a row's new text to its scanner; return the finished JSON once complete."""
+        text = self._new_text(row, tokens)
+        if not text:
+            return None
+
+        scanner = self.scanners[row]
+        items = scanner.feed(text)
+        self.item_counts[row] += len(items)
+        if self.on_items and items:
+            self.on_items(row, items)
+
+        if scanner.closed_at is not None:
+            return scanner.buffer[:scanner.closed_at]
+        if self.max_items[row] and self.item_counts[row] >= self.max_items[row]:
+            # Items sit directly inside {"key":[...]}, so this closes the document
+            return scanner.buffer[:scanner.item_end] + "]}"
+        return None
+
+    def tokens_saved(self, row: int) -> int:
+        """Tokens not generated for a row because its JSON completed early."""
+        if self.outputs[row] is None:
+            return 0
+        return self.max_new_tokens[row] - self.stopped_at[row]
@@ -1,8 +1,11 @@
 """Local AI service for quiz and summary generation using local models."""
-import json
+import asyncio
+import contextlib
+import copy
 import logging
-import re
-from typing import List, Dict, Optional
+import threading
+import time
+from typing import AsyncIterator, Callable, List, Dict, Optional, Tuple
 
 # Ensure numpy is available before importing torch/transformers
 try:
@@ -13,11 +16,142 @@ except ImportError:
     raise ImportError("numpy is required. Install it with: pip install numpy")
 
 import torch
-from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline
+from transformers import (
+    AutoModelForCausalLM,
+    AutoTokenizer,
+    LogitsProcessorList,
+    StoppingCriteria,
+    StoppingCriteriaList,
+    TextIteratorStreamer,
+)
 from config import settings
+from schemas import QuizResponse, SummaryResponse
+from services.inference_executor import InferenceExecutor
+from services.batch_scheduler import BatchScheduler
+from services.decoding_profiles import DECODING_PROFILES, resolve_profile
+from services.json_grammar import JSONGrammar, JSONLogitsProcessor
+from services.json_repair import parse_json_tolerant
+from services.json_stream import JSONItemScanner, JSONStoppingCriteria
+from services.model_snapshot import has_snapshot, load_snapshot, snapshot_path
+from services.precision import autocast_context, resolve_device, resolve_model_precision
+from services.prefix_cache import PrefixCache
+from services.quantization import load_quantized_model
+from services.request_progress import RequestProgress, current_progress
+from services.result_cache import ResultCache, make_cache_key
+from services.scheduler import GenerationRequest, current_request
+from services.speculative import SpeculativeDecoder, load_draft_model
+from services.text_chunks import chunk_text, select_stable
+from services.segment_ranking import allocate_questions, is_duplicate_question, rank_segments
+from services.serving import apply_thread_budget, get_server_workers, prepare_shared_weights
 
 logger = logging.getLogger(__name__)
 
+# Fixed leading part of each prompt template; their key/value caches are
+# precomputed at startup, so keep anything request-specific after them
+QUIZ_PROMPT_PREFIX = (
+    'Format JSON:{"questions":[{"id":1,"question":"Q?","options":["A","B","C","D"],'
+    '"correctIndex":0,"explanation":"E","explanationDarija":"D"}]}\n\n'
+)
+SUMMARY_PROMPT_PREFIX = (
+    'Format JSON:{"sections":[{"title":"T","content":"C","keyTerms":[{"term":"T",'
+    '"definition":"D","definitionDarija":"DD"}],"essentialPoints":["P1"]}]}\n\n'
+)
+
+
+class GenerationResult:
+    """Text of one generation with its token counts and timings."""
+    
+    def __init__(self, text: str, prompt_tokens: int, new_tokens: int, generate_seconds: float,
+                 total_seconds: float = 0.0, stopped_early: bool = False, cancelled: bool = False):
+        """
+        Initialize the result.
+        
+        Args:
+            text: Generated text (new tokens only, stripped)
+            prompt_tokens: Tokens in the prompt
+            new_tokens: Tokens generated
+            generate_seconds: Time spent in model.generate (the whole batch's when batched)
+            total_seconds: Wall time including tokenization, decoding and batch wait
+            stopped_early: Whether generation stopped at complete JSON before the token limit
+            cancelled: Whether generation stopped because its request was abandoned
+        """
+        self.text = text
+        self.prompt_tokens = prompt_tokens
+        self.new_tokens = new_tokens
+        self.generate_seconds = generate_seconds
+        self.total_seconds = total_seconds or generate_seconds
+        self.stopped_early = stopped_early
+        self.cancelled = cancelled
+    
+    @property
+    def tokens_per_sec(self) -> float:
+        """Generated tokens per second of model.generate time."""
+        return self.new_tokens / self.generate_seconds if self.generate_seconds > 0 else 0.0
+    
+    def to_dict(self) -> Dict:
+        """Token counts and timings, e.g. for the stats endpoint."""
+        return {
+            "prompt_tokens": self.prompt_tokens,
+            "new_tokens": self.new_tokens,
+            "generate_seconds": round(self.generate_seconds, 3),
+            "total_seconds": round(self.total_seconds, 3),
+            "tokens_per_sec": round(self.tokens_per_sec, 1),
+            "stopped_early": self.stopped_early,
+            "cancelled": self.cancelled,
+        }
+
+
+class ProgressStoppingCriteria(StoppingCriteria):
+    """Adds each generation step's new tokens to a request's progress; never stops generation."""
+    
+    def __init__(self, progress: RequestProgress, prompt_length: int):
+        """
+        Track one generation's tokens.
+        
+        Args:
+            progress: Progress of the request the generation belongs to
+            prompt_length: Length of the prompt ids (generated tokens follow it)
+        """
+        self.progress = progress
+        self.length = prompt_length
+    
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs) -> bool:
+        # Several tokens per step with speculative decoding
+        self.progress.add_tokens(input_ids.shape[1] - self.length)
+        self.length = input_ids.shape[1]
+        return False
+
+
+class CancellationStoppingCriteria(StoppingCriteria):
+    """
+    Stops the rows of a generation whose request was abandoned (e.g. its client disconnected).
+    
+    Cancelled rows are marked finished in the generation's JSON stopping
+    criteria, which end the generation once every row is finished, so it
+    must come before them in the criteria list.
+    """
+    
+    def __init__(self, stopping: JSONStoppingCriteria, requests: List[Optional[GenerationRequest]]):
+        """
+        Watch the requests of a generation's rows.
+        
+        Args:
+            stopping: JSON stopping criteria of the generation (with its prompt length set)
+            requests: Scheduling request of each row (None = never cancelled)
+        """
+        self.stopping = stopping
+        self.requests = requests
+        # Tokens each row had generated when it was cancelled (None = not cancelled)
+        self.cancelled_at: List[Optional[int]] = [None] * len(requests)
+    
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs) -> bool:
+        generated = input_ids.shape[1] - self.stopping.prompt_length
+        for row, request in enumerate(self.requests):
+            if request and request.abandoned and self.stopping.stopped_at[row] is None:
+                self.cancelled_at[row] = generated
+                self.stopping.stopped_at[row] = generated
+        return False
+
 
 class LocalAIService:
     """
@@ -29,29 +163,137 @@ class LocalAIService:
         """Initialize the local AI service."""
         self.model = None
         self.tokenizer = None
-        self.pipeline = None
         self.ready = False
         self.model_name = settings.local_model_name
+        self.device = "cpu"
+        self.precision = "fp32"
+        self.prefix_cache = None
+        self.speculative = None
+        
+        # Loading progress, reported on /health while the model loads
+        self._load_lock = threading.Lock()
+        self._load_stage = "not started"
+        self._load_progress = 0.0
+        self._load_error: Optional[str] = None
+        self._load_started: Optional[float] = None
+        self._load_seconds = 0.0
+        
+        # Generation throughput, updated by every worker thread
+        self._throughput_lock = threading.Lock()
+        self._tokens_generated = 0
+        self._generation_seconds = 0.0
+        self._last_tokens_per_sec = 0.0
+        self._last_generation: Optional[GenerationResult] = None
+        
+        # Generations stopped early because their client went away
+        self._cancelled_generations = 0
+        self._cancelled_tokens = 0
+        self._cancelled_tokens_avoided = 0
+        
+        # Constrained decoding: decoded text of every token, and compiled grammars
+        self._token_strings: List[str] = []
+        self._grammars: Dict[Tuple, JSONGrammar] = {}
+        
+        # With batching on, each waiting request holds a worker thread while its
+        # batch fills up, so the pool must be at least as large as a batch
+        workers = settings.inference_workers
+        self.batcher = None
+        if settings.batch_max_size > 1:
+            workers = max(workers, settings.batch_max_size)
+            self.batcher = BatchScheduler(
+                self._generate_batch,
+                max_batch_size=settings.batch_max_size,
+                max_wait_ms=settings.batch_max_wait_ms
+            )
+        self.executor = InferenceExecutor(max_workers=workers)
+        
+        self.cache = ResultCache(
+            max_entries=settings.result_cache_size,
+            ttl_seconds=settings.result_cache_ttl_seconds,
+            disk_path=settings.result_cache_path,
+            disk_max_mb=settings.result_cache_disk_max_mb
+        )
         
         logger.info(f"Initializing Local AI Service with model: {self.model_name}")
     
+    def start_background_loading(self) -> threading.Thread:
+        """
+        Load the model on a background thread so the server can start serving at once.
+        
+        Progress is available from loading_status(); is_ready() turns true
+        once loading and warm-up are done.
+        
+        Returns:
+            The loading thread
+        """
+        def load():
+            try:
+                self.load_model()
+            except Exception:
+                # Already logged and recorded in the loading status
+                pass
+        
+        thread = threading.Thread(target=load, name="model-loader", daemon=True)
+        thread.start()
+        return thread
+    
+    def loading_status(self) -> Dict:
+        """
+        Get the model loading progress.
+        
+        Returns:
+            Dict with the current stage, progress (0-1), elapsed seconds and error (if loading failed)
+        """
+        with self._load_lock:
+            elapsed = self._load_seconds
+            if self._load_started is not None and self._load_stage not in ("ready", "failed"):
+                elapsed = time.time() - self._load_started
+            return {
+                "stage": self._load_stage,
+                "progress": round(self._load_progress, 2),
+                "elapsed_seconds": round(elapsed, 1),
+                "error": self._load_error,
+            }
+    
+    def _set_load_stage(self, stage: str, progress: float):
+        """Record the loading stage reached."""
+        with self._load_lock:
+            if self._load_started is None:
+                self._load_started = time.time()
+            self._load_stage = stage
+            self._load_progress = progress
+            if stage in ("ready", "failed"):
+                self._load_seconds = time.time() - self._load_started
+    
     def load_model(self):
-        """Load the model and tokenizer."""
+        """Load the model and tokenizer, then run a warm-up generation."""
         try:
+            self._set_load_stage("loading tokenizer", 0.0)
             logger.info(f"Loading model: {self.model_name}")
             logger.info("This may take a few minutes on first run (downloading model)...")
             
             # Determine device
-            if settings.device == "auto":
-                device = "cuda" if torch.cuda.is_available() else "cpu"
-            else:
-                device = settings.device
-            
+            device = resolve_device(settings.device)
             logger.info(f"Using device: {device}")
+            self.device = device
+            if device == "cpu":
+                # Several server processes split the cores instead of each using all of them
+                apply_thread_budget()
+                if get_server_workers() > 1:
+                    # ...and memory-map one snapshot instead of each holding its own weights
+                    prepare_shared_weights()
+            
+            # Pick the precision: fp16 on GPU, fp32/bf16 on CPU depending on the CPU
+            self.precision, dtype = resolve_model_precision(
+                device, settings.cpu_precision, settings.cpu_quantization
+            )
+            
+            # A snapshot holds the model exactly as it runs, so it is memory-mapped as is
+            snapshot = self._find_snapshot(device)
             
             # Load tokenizer
             self.tokenizer = AutoTokenizer.from_pretrained(
-                self.model_name,
+                snapshot or self.model_name,
                 trust_remote_code=True
             )
             
@@ -59,92 +301,281 @@ class LocalAIService:
             if self.tokenizer.pad_token is None:
                 self.tokenizer.pad_token = self.tokenizer.eos_token
             
+            # Decoder-only models must be left-padded for batched generation
+            self.tokenizer.padding_side = "left"
+            
             # Load model
+            self._set_load_stage("loading model", 0.1)
             model_kwargs = {
                 "trust_remote_code": True,
-                "torch_dtype": torch.float16 if device == "cuda" else torch.float32,
+                "torch_dtype": dtype,
             }
             
             if settings.load_in_8bit and device == "cuda":
                 model_kwargs["load_in_8bit"] = True
                 model_kwargs["device_map"] = "auto"
             
-            self.model = AutoModelForCausalLM.from_pretrained(
-                self.model_name,
-                **model_kwargs
-            )
+            if snapshot:
+                self.model = load_snapshot(snapshot, device)
+            elif device == "cpu" and settings.cpu_quantization != "none":
+                self.model = load_quantized_model(
+                    self.model_name,
+                    settings.cpu_quantization,
+                    settings.quantized_model_dir,
+                    **model_kwargs
+                )
+            else:
+                if settings.cpu_quantization != "none":
+                    logger.warning(f"CPU_QUANTIZATION={settings.cpu_quantization} is ignored on {device}")
+                self.model = AutoModelForCausalLM.from_pretrained(
+                    self.model_name,
+                    **model_kwargs
+                )
             
-            if not settings.load_in_8bit:
+            if not settings.load_in_8bit and not snapshot:
                 self.model = self.model.to(device)
             
-            # Create text generation pipeline
-            self.pipeline = pipeline(
-                "text-generation",
-                model=self.model,
-                tokenizer=self.tokenizer,
-                device=0 if device == "cuda" else -1,
-                max_length=settings.max_length,
-                temperature=settings.temperature,
-                do_sample=True,
-                top_p=0.95,
-            )
+            if settings.draft_model_name:
+                self._set_load_stage("loading draft model", 0.6)
+                draft_model = load_draft_model(
+                    settings.draft_model_name,
+                    self.tokenizer,
+                    device,
+                    trust_remote_code=True,
+                    torch_dtype=dtype
+                )
+                self.speculative = SpeculativeDecoder(self.model, draft_model, settings.draft_num_tokens)
+                logger.info(f"Speculative decoding enabled ({settings.draft_num_tokens} draft tokens per step)")
+            
+            if settings.constrained_decoding:
+                self._set_load_stage("indexing tokens", 0.7)
+                self._token_strings = [
+                    self.tokenizer.decode([token_id], skip_special_tokens=True)
+                    for token_id in range(len(self.tokenizer))
+                ]
+                logger.info(f"Constrained JSON decoding enabled ({len(self._token_strings)} tokens indexed)")
+            
+            if settings.prefix_cache and self.speculative:
+                # Assisted generation hands every generate argument to the draft model
+                # too, and the draft can't continue from the main model's cached keys/values
+                logger.info("Prefix cache disabled: not supported with speculative decoding")
+            elif settings.prefix_cache:
+                self._set_load_stage("caching prompt prefixes", 0.8)
+                self.prefix_cache = PrefixCache(self.model, self.tokenizer)
+                context = lambda: autocast_context(self.precision, self.device)
+                self.prefix_cache.add("quiz", QUIZ_PROMPT_PREFIX, context)
+                self.prefix_cache.add("summary", SUMMARY_PROMPT_PREFIX, context)
             
             self.ready = True
             logger.info(f"✅ Model loaded successfully: {self.model_name}")
             logger.info(f"   Device: {device}")
+            logger.info(f"   Precision: {self.precision}")
             logger.info(f"   Memory: {torch.cuda.get_device_properties(0).total_memory / 1e9:.2f} GB" if device == "cuda" else "   CPU Mode")
             
+            if settings.warmup_tokens > 0:
+                self._set_load_stage("warming up", 0.9)
+                self._warm_up(settings.warmup_tokens)
+            
+            self._set_load_stage("ready", 1.0)
+            
         except Exception as e:
             logger.error(f"❌ Error loading model: {str(e)}")
             logger.error(f"   Model: {self.model_name}")
             logger.error(f"   Try a smaller model like 'gpt2' or 'microsoft/phi-2'")
             self.ready = False
+            with self._load_lock:
+                self._load_error = str(e)
+            self._set_load_stage("failed", self._load_progress)
             raise
     
+    def _find_snapshot(self, device: str) -> Optional[str]:
+        """Snapshot directory for the model at the chosen precision, if one was saved."""
+        if not settings.snapshot_dir or (settings.load_in_8bit and device == "cuda"):
+            return None
+        path = snapshot_path(self.model_name, self.precision, settings.snapshot_dir)
+        if has_snapshot(path, self.model_name):
+            return path
+        logger.info(f"No {self.precision} snapshot of {self.model_name} (create one with: python snapshot_model.py)")
+        return None
+    
+    def _warm_up(self, max_new_tokens: int):
+        """
+        Run one short generation so the first real request doesn't pay for
+        first-call allocations and kernel selection.
+        
+        Args:
+            max_new_tokens: Tokens to generate
+        """
+        start = time.time()
+        try:
+            prompt = self._build_quiz_prompt("Le contrat est un accord de volontés.", 1)
+            self.generate(prompt, max_new_tokens=max_new_tokens, grammar=self._quiz_grammar(1), max_items=1)
+            logger.info(f"✅ Warm-up generation took {time.time() - start:.2f} seconds")
+        except Exception as e:
+            # The model still works; only the first request will be slower
+            logger.warning(f"Warm-up generation failed: {str(e)}")
+    
     def is_ready(self) -> bool:
-        """Check if the model is loaded and ready."""
-        return self.ready
+        """Check if the model is loaded, warmed up and ready for requests."""
+        return self.ready and self._load_stage == "ready"
+    
+    def get_stats(self) -> Dict:
+        """Get model, inference worker pool and batching statistics."""
+        with self._throughput_lock:
+            model = {
+                "device": self.device,
+                "precision": self.precision,
+                "tokens_generated": self._tokens_generated,
+                "tokens_per_sec": round(self._last_tokens_per_sec, 1),
+                "avg_tokens_per_sec": round(
+                    self._tokens_generated / self._generation_seconds, 1
+                ) if self._generation_seconds else 0.0,
+                "last_generation": self._last_generation.to_dict() if self._last_generation else None,
+            }
+            cancellation = {
+                "generations": self._cancelled_generations,
+                "tokens_generated": self._cancelled_tokens,
+                "tokens_avoided": self._cancelled_tokens_avoided,
+            }
+        return {
+            "model": model,
+            "cancellation": cancellation,
+            "executor": self.executor.stats(),
+            "batching": self.batcher.stats() if self.batcher else None,
+            "cache": self.cache.stats(),
+            "prefix_cache": self.prefix_cache.stats() if self.prefix_cache else None,
+            "speculative": self.speculative.stats() if self.speculative else None,
+            "loading": self.loading_status(),
+        }
+    
+    def queue_depth(self) -> int:
+        """Number of generations waiting for an inference worker."""
+        return self.executor.queue_depth()
     
-    def generate_text(self, prompt: str, max_new_tokens: int = 400) -> str:
+    def shutdown(self):
+        """Stop the inference worker pool."""
+        self.executor.shutdown(wait=False)
+    
+    def _record_cancellation(self, tokens: int, max_new_tokens: int):
+        """Count a generation stopped after tokens because its request was abandoned."""
+        logger.info(f"Generation cancelled after {tokens} of up to {max_new_tokens} tokens: client disconnected")
+        with self._throughput_lock:
+            self._cancelled_generations += 1
+            self._cancelled_tokens += tokens
+            self._cancelled_tokens_avoided += max(0, max_new_tokens - tokens)
+    
+    def _record_throughput(self, tokens: int, seconds: float, result: Optional[GenerationResult] = None):
+        """Add one generation to the throughput statistics."""
+        if result:
+            with self._throughput_lock:
+                self._last_generation = result
+        if not tokens or seconds <= 0:
+            return
+        with self._throughput_lock:
+            self._tokens_generated += tokens
+            self._generation_seconds += seconds
+            self._last_tokens_per_sec = tokens / seconds
+    
+    def generate_text(self, prompt: str, max_new_tokens: int = 400, grammar: Optional[JSONGrammar] = None,
+                      max_items: int = 0, profile: Optional[str] = None) -> str:
         """
         Generate text from a prompt.
         
+        Same as generate(), returning only the text.
+        
+        Returns:
+            Generated text
+        """
+        return self.generate(prompt, max_new_tokens, grammar, max_items, profile).text
+    
+    def generate(self, prompt: str, max_new_tokens: int = 400, grammar: Optional[JSONGrammar] = None,
+                 max_items: int = 0, profile: Optional[str] = None) -> GenerationResult:
+        """
+        Generate text from a prompt with token counts and timings.
+        
+        The prompt is tokenized once and model.generate runs directly;
+        only the new token ids are decoded. Generation stops as soon as the
+        output's JSON object closes, or its list holds max_items items; the
+        output is then cut to that JSON.
+        
         Args:
             prompt: The input prompt
             max_new_tokens: Maximum number of new tokens to generate
+            grammar: Optional JSON grammar the output is constrained to
+            max_items: Number of list items wanted (0 = until the JSON object closes)
+            profile: Decoding profile (None = DECODING_PROFILE setting)
             
         Returns:
-            Generated text
+            The generation result
         """
-        import time
         gen_start = time.time()
         
         if not self.ready:
             raise Exception("Model not loaded. Call load_model() first.")
         
+        profile = resolve_profile(profile)
+        if self.batcher:
+            result = self.batcher.submit(
+                prompt, max_new_tokens, grammar, max_items, profile, current_request.get()
+            ).result()
+            if result.cancelled:
+                raise Exception("Generation cancelled: client disconnected")
+            result.total_seconds = time.time() - gen_start
+            # Batches don't report per-token progress; count the tokens once done
+            progress = current_progress.get()
+            if progress:
+                progress.add_tokens(result.new_tokens)
+            logger.info(f"Batched text generation took {result.total_seconds:.2f} seconds")
+            return result
+        
         try:
-            logger.info(f"Generating text, prompt length: {len(prompt)}, max_tokens: {max_new_tokens}")
-            
-            # Generate with optimized settings for speed
-            outputs = self.pipeline(
-                prompt,
-                max_new_tokens=max_new_tokens,
-                num_return_sequences=1,
-                pad_token_id=self.tokenizer.eos_token_id,
-                do_sample=True,
-                temperature=0.7,
-                top_p=0.9,
-                repetition_penalty=1.1,
-            )
+            logger.info(f"Generating text, prompt length: {len(prompt)}, max_tokens: {max_new_tokens}, profile: {profile}")
+            
+            # Tokenized once; the prefix cache may supply the template's keys/values
+            inputs = self._encode_prompt(prompt)
+            prompt_length = inputs["input_ids"].shape[1]
+            stopping = JSONStoppingCriteria(self.tokenizer, [max_new_tokens], [max_items], prompt_length)
+            criteria = self._stopping_criteria(stopping, prompt_length)
             
-            gen_time = time.time() - gen_start
-            logger.info(f"Text generation took {gen_time:.2f} seconds")
+            start = time.time()
+            with torch.inference_mode(), autocast_context(self.precision, self.device), self._track_speculative() as run:
+                output_ids = self.model.generate(
+                    **inputs,
+                    max_new_tokens=max_new_tokens,
+                    pad_token_id=self.tokenizer.eos_token_id,
+                    logits_processor=self._logits_processor([grammar]),
+                    stopping_criteria=criteria,
+                    **self._assistant_kwargs(),
+                    **DECODING_PROFILES[profile],
+                )
+            generate_seconds = time.time() - start
+            self._raise_if_cancelled(criteria, max_new_tokens)
             
-            # Extract generated text (remove prompt)
-            generated = outputs[0]['generated_text']
-            result = generated[len(prompt):].strip()
+            new_tokens = output_ids[0, prompt_length:]
+            if run:
+                self.speculative.report(run, len(new_tokens), generate_seconds)
+            self._log_early_stop(stopping, 0)
             
-            logger.info(f"Generated {len(result)} characters")
+            # An early stop already has the finished JSON
+            if stopping.outputs[0] is not None:
+                text = stopping.outputs[0].strip()
+            else:
+                text = self.tokenizer.decode(new_tokens, skip_special_tokens=True).strip()
+            
+            result = GenerationResult(
+                text,
+                prompt_tokens=prompt_length,
+                new_tokens=len(new_tokens),
+                generate_seconds=generate_seconds,
+                total_seconds=time.time() - gen_start,
+                stopped_early=stopping.tokens_saved(0) > 0
+            )
+            self._record_throughput(result.new_tokens, generate_seconds, result)
+            logger.info(
+                f"Generated {result.new_tokens} tokens ({result.prompt_tokens} prompt tokens) in "
+                f"{generate_seconds:.2f}s ({result.tokens_per_sec:.1f} tokens/s), "
+                f"{len(text)} characters, {result.total_seconds:.2f}s total"
+            )
             return result
             
         except Exception as e:
@@ -153,45 +584,494 @@ class LocalAIService:
             logger.error(f"   Max tokens: {max_new_tokens}")
             raise
     
+    def _generate_batch(self, prompts: List[str], max_new_tokens: List[int],
+                        grammars: Optional[List[Optional[JSONGrammar]]] = None,
+                        max_items: Optional[List[int]] = None,
+                        requests: Optional[List[Optional[GenerationRequest]]] = None,
+                        profile: Optional[str] = None,
+                        on_items: Optional[Callable[[int, List[Dict]], None]] = None
+                        ) -> Tuple[List[GenerationResult], int]:
+        """
+        Generate text for several prompts in a single padded model.generate call.
+        
+        Args:
+            prompts: The input prompts
+            max_new_tokens: Maximum number of new tokens for each prompt
+            grammars: Optional JSON grammar for each prompt (None = unconstrained)
+            max_items: Number of list items wanted for each prompt (0 = until the JSON object closes)
+            requests: Scheduling request of each prompt; a row stops once its request is abandoned
+            profile: Decoding profile shared by the whole batch (None = DECODING_PROFILE setting)
+            on_items: Called with (row, new list items) as each row's JSON items complete,
+                on this thread, while the batch is still generating
+            
+        Returns:
+            Tuple of (result per prompt, total new tokens produced)
+        """
+        if not self.ready:
+            raise Exception("Model not loaded. Call load_model() first.")
+        
+        # Left padding shifts every row differently, so batches don't use the prefix cache
+        inputs = self.tokenizer(prompts, return_tensors="pt", padding=True).to(self.model.device)
+        
+        # Rows finish on their own limits and JSON; the batch ends when all rows have
+        stopping = JSONStoppingCriteria(
+            self.tokenizer, max_new_tokens, max_items or [0] * len(prompts), inputs["input_ids"].shape[1],
+            on_items=on_items
+        )
+        cancellation = CancellationStoppingCriteria(stopping, requests or [None] * len(prompts))
+        
+        start = time.time()
+        with torch.inference_mode(), autocast_context(self.precision, self.device):
+            outputs = self.model.generate(
+                **inputs,
+                max_new_tokens=max(max_new_tokens),
+                pad_token_id=self.tokenizer.pad_token_id,
+                logits_processor=self._logits_processor(grammars or [None] * len(prompts)),
+                stopping_criteria=StoppingCriteriaList([cancellation, stopping]),
+                **DECODING_PROFILES[resolve_profile(profile)],
+            )
+        
+        generate_seconds = time.time() - start
+        
+        # Left padding means every row's new tokens start at the same offset
+        new_tokens = outputs[:, inputs["input_ids"].shape[1]:]
+        prompt_tokens = inputs["attention_mask"].sum(dim=1).tolist()
+        
+        results = []
+        total_tokens = 0
+        for index, (row, limit) in enumerate(zip(new_tokens, max_new_tokens)):
+            row = row[:stopping.stopped_at[index] or limit]
+            eos_positions = (row == self.tokenizer.eos_token_id).nonzero()
+            if len(eos_positions):
+                row = row[:eos_positions[0].item()]
+            total_tokens += len(row)
+            cancelled = cancellation.cancelled_at[index] is not None
+            if cancelled:
+                self._record_cancellation(len(row), limit)
+            self._log_early_stop(stopping, index)
+            if stopping.outputs[index] is not None:
+                text = stopping.outputs[index].strip()
+            else:
+                text = self.tokenizer.decode(row, skip_special_tokens=True).strip()
+            results.append(GenerationResult(
+                text,
+                prompt_tokens=prompt_tokens[index],
+                new_tokens=len(row),
+                generate_seconds=generate_seconds,
+                stopped_early=stopping.tokens_saved(index) > 0,
+                cancelled=cancelled
+            ))
+        
+        self._record_throughput(total_tokens, generate_seconds, results[-1] if results else None)
+        return results, total_tokens
+    
+    def _generate_streaming(self, prompt: str, max_new_tokens: int, streamer: TextIteratorStreamer,
+                            grammar: Optional[JSONGrammar] = None, max_items: int = 0,
+                            profile: Optional[str] = None):
+        """
+        Run a single generation that pushes decoded text into a streamer.
+        
+        Args:
+            prompt: The input prompt
+            max_new_tokens: Maximum number of new tokens to generate
+            streamer: Streamer the tokens are pushed to as they are produced
+            grammar: Optional JSON grammar the output is constrained to
+            max_items: Number of list items wanted (0 = until the JSON object closes)
+            profile: Decoding profile (None = DECODING_PROFILE setting)
+        """
+        if not self.ready:
+            streamer.end()
+            raise Exception("Model not loaded. Call load_model() first.")
+        
+        inputs = self._encode_prompt(prompt)
+        prompt_length = inputs["input_ids"].shape[1]
+        stopping = JSONStoppingCriteria(self.tokenizer, [max_new_tokens], [max_items], prompt_length)
+        criteria = self._stopping_criteria(stopping, prompt_length)
+        
+        start = time.time()
+        try:
+            with torch.inference_mode(), autocast_context(self.precision, self.device), self._track_speculative() as run:
+                output_ids = self.model.generate(
+                    **inputs,
+                    max_new_tokens=max_new_tokens,
+                    streamer=streamer,
+                    pad_token_id=self.tokenizer.eos_token_id,
+                    logits_processor=self._logits_processor([grammar]),
+                    stopping_criteria=criteria,
+                    **self._assistant_kwargs(),
+                    **DECODING_PROFILES[resolve_profile(profile)],
+                )
+            self._raise_if_cancelled(criteria, max_new_tokens)
+            if run:
+                self.speculative.report(run, output_ids.shape[1] - prompt_length, time.time() - start)
+            self._log_early_stop(stopping, 0)
+            self._record_throughput(stopping.stopped_at[0] or 0, time.time() - start)
+        except Exception as e:
+            logger.error(f"❌ Error during streaming generation: {str(e)}")
+            # Unblock the consumer waiting on the streamer
+            streamer.end()
+            raise
+    
+    async def stream_text(self, prompt: str, max_new_tokens: int = 400, grammar: Optional[JSONGrammar] = None,
+                          max_items: int = 0, profile: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        Generate text from a prompt, yielding decoded chunks as tokens are produced.
+        
+        Streaming generations run on the inference worker pool but bypass
+        dynamic batching.
+        
+        Args:
+            prompt: The input prompt
+            max_new_tokens: Maximum number of new tokens to generate
+            grammar: Optional JSON grammar the output is constrained to
+            max_items: Number of list items wanted (0 = until the JSON object closes)
+            profile: Decoding profile (None = DECODING_PROFILE setting)
+            
+        Yields:
+            Decoded text chunks
+        """
+        streamer = TextIteratorStreamer(self.tokenizer, skip_prompt=True, skip_special_tokens=True)
+        future = self.executor.submit(
+            self._generate_streaming, prompt, max_new_tokens, streamer, grammar, max_items, profile
+        )
+        # A generation dropped from the queue never runs, so it can't end the streamer itself
+        future.add_done_callback(lambda _: streamer.end())
+        loop = asyncio.get_running_loop()
+        
+        try:
+            while True:
+                # The streamer blocks on a queue, so read it off the event loop
+                chunk = await loop.run_in_executor(None, next, streamer, None)
+                if chunk is None:
+                    break
+                if chunk:
+                    yield chunk
+            
+            await future
+        finally:
+            if not future.done():
+                future.cancel()
+                # Release the reader thread if generation never started
+                streamer.end()
+    
+    async def _stream_items(self, prompt: str, max_new_tokens: int, item_event: str,
+                            grammar: Optional[JSONGrammar] = None, max_items: int = 0,
+                            profile: Optional[str] = None) -> AsyncIterator[Tuple[str, Dict]]:
+        """
+        Stream tokens and the list items parsed from them.
+        
+        Args:
+            prompt: The input prompt
+            max_new_tokens: Maximum number of new tokens to generate
+            item_event: Event name used for each completed list item
+            grammar: Optional JSON grammar the output is constrained to
+            max_items: Number of list items wanted (0 = until the JSON object closes)
+            profile: Decoding profile (None = DECODING_PROFILE setting)
+            
+        Yields:
+            (event, data) tuples: ("token", {"text"}) and (item_event, item)
+        """
+        start_time = time.time()
+        scanner = JSONItemScanner()
+        first_item = True
+        
+        async for chunk in self.stream_text(prompt, max_new_tokens=max_new_tokens, grammar=grammar,
+                                            max_items=max_items, profile=profile):
+            yield "token", {"text": chunk}
+            for item in scanner.feed(chunk):
+                if first_item:
+                    logger.info(f"First {item_event} streamed after {time.time() - start_time:.2f} seconds")
+                    first_item = False
+                yield item_event, item
+        
+        logger.info(f"Streaming generation completed in {time.time() - start_time:.2f} seconds")
+    
+    async def stream_quiz(self, content: str, num_questions: int = 5,
+                          profile: Optional[str] = None) -> AsyncIterator[Tuple[str, Dict]]:
+        """
+        Generate quiz questions, streaming tokens and each question as soon as it is complete.
+        
+        Args:
+            content: The text content to generate questions from
+            num_questions: Number of questions to generate
+            profile: Decoding profile (None = DECODING_PROFILE setting)
+            
+        Yields:
+            (event, data) tuples: "token", "question" and a final "done"
+            carrying the full question list. Documents split into several
+            segments send "progress" events instead of tokens.
+        """
+        if not self.ready:
+            raise Exception("Model not loaded")
+        
+        profile = resolve_profile(profile)
+        segments = await self._chunk_content(content, settings.quiz_segment_tokens)
+        if len(segments) > 1:
+            # Long documents: questions arrive as each segment finishes
+            async for event, data in self._coverage_quiz(content, segments, num_questions, profile):
+                yield event, data
+            return
+        
+        content = segments[0] if segments else content
+        logger.info(f"Streaming {num_questions} quiz questions from {len(content)} characters...")
+        
+        cache_key = self._cache_key("quiz", content, profile, num_questions=num_questions, max_new_tokens=400)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"✅ Streaming {len(cached)} cached questions")
+            for question in copy.deepcopy(cached):
+                yield "question", question
+            yield "done", {"questions": copy.deepcopy(cached)}
+            return
+        
+        prompt = self._build_quiz_prompt(content, num_questions)
+        
+        questions = []
+        generated = ""
+        async for event, data in self._stream_items(
+            prompt, 400, "question", self._quiz_grammar(num_questions), max_items=num_questions, profile=profile
+        ):
+            if event == "token":
+                generated += data["text"]
+            elif len(questions) < num_questions:
+                questions.append(data)
+                data = self._normalize_questions(questions)[-1]
+            else:
+                continue
+            yield event, data
+        
+        if not questions:
+            # Items may not have been recognised mid-stream (e.g. code fences)
+            result = self.extract_json_from_text(generated)
+            if not result or not result.get("questions"):
+                raise Exception("Failed to generate valid quiz")
+            questions = self._normalize_questions(result["questions"])[:num_questions]
+        
+        logger.info(f"✅ Streamed {len(questions)} questions")
+        self.cache.set(cache_key, questions)
+        yield "done", {"questions": questions}
+    
+    async def stream_summary(self, content: str, profile: Optional[str] = None) -> AsyncIterator[Tuple[str, Dict]]:
+        """
+        Generate a summary, streaming tokens and each section as soon as it is complete.
+        
+        Args:
+            content: The text content to summarize
+            profile: Decoding profile (None = DECODING_PROFILE setting)
+            
+        Yields:
+            (event, data) tuples: "token", "section" and a final "done"
+            carrying the full section list. Documents split into several
+            chunks send "progress" events instead of tokens.
+        """
+        if not self.ready:
+            raise Exception("Model not loaded")
+        
+        profile = resolve_profile(profile)
+        chunks = await self._chunk_content(content, settings.summary_chunk_tokens, settings.summary_max_chunks)
+        if len(chunks) > 1:
+            # Long documents: report chunk progress, then send the merged sections
+            async for event, data in self._map_reduce_summary(content, chunks, profile):
+                if event == "done":
+                    for section in data["sections"]:
+                        yield "section", section
+                yield event, data
+            return
+        
+        content = chunks[0] if chunks else content
+        logger.info(f"Streaming summary from {len(content)} characters...")
+        
+        cache_key = self._cache_key("summary", content, profile, max_new_tokens=300)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"✅ Streaming {len(cached)} cached summary sections")
+            for section in copy.deepcopy(cached):
+                yield "section", section
+            yield "done", {"sections": copy.deepcopy(cached)}
+            return
+        
+        prompt = self._build_summary_prompt(content)
+        
+        sections = []
+        generated = ""
+        async for event, data in self._stream_items(prompt, 300, "section", self._summary_grammar(), profile=profile):
+            if event == "token":
+                generated += data["text"]
+            else:
+                sections.append(data)
+            yield event, data
+        
+        if not sections:
+            result = self.extract_json_from_text(generated)
+            if not result or not result.get("sections"):
+                raise Exception("Failed to generate valid summary")
+            sections = result["sections"]
+        
+        logger.info(f"✅ Streamed {len(sections)} summary sections")
+        self.cache.set(cache_key, sections)
+        yield "done", {"sections": sections}
+    
     def extract_json_from_text(self, text: str) -> Optional[Dict]:
         """
         Extract JSON from text that may contain markdown or other formatting.
         
+        Common model defects (trailing commas, single quotes, unclosed
+        brackets) are repaired, and truncated output keeps its complete
+        items.
+        
         Args:
             text: Text that may contain JSON
             
         Returns:
             Parsed JSON dict or None
         """
-        # Try to find JSON in code blocks
-        json_match = re.search(r'```json\s*(.*?)\s*```', text, re.DOTALL)
-        if json_match:
-            try:
-                return json.loads(json_match.group(1))
-            except:
-                pass
-        
-        # Try to find JSON without code blocks
-        json_match = re.search(r'\{.*\}', text, re.DOTALL)
-        if json_match:
-            try:
-                return json.loads(json_match.group(0))
-            except:
-                pass
+        return parse_json_tolerant(text)
+    
+    def _build_quiz_prompt(self, content: str, num_questions: int) -> str:
+        """Build the quiz generation prompt."""
+        # Ultra-short prompt for maximum speed; the fixed schema example comes first
+        return QUIZ_PROMPT_PREFIX + f"""Crée {num_questions} questions:
+
+{content}
+
+JSON:"""
+    
+    def _build_summary_prompt(self, content: str) -> str:
+        """Build the summary generation prompt."""
+        # Ultra-short prompt for maximum speed; the fixed schema example comes first
+        return SUMMARY_PROMPT_PREFIX + f"""Résume:
+
+{content}
+
+JSON:"""
+    
+    def _encode_prompt(self, prompt: str) -> Dict:
+        """Tokenize a prompt for model.generate, seeded from the prefix cache when it applies."""
+        if self.prefix_cache:
+            return self.prefix_cache.encode(prompt)
+        return dict(self.tokenizer(prompt, return_tensors="pt").to(self.model.device))
+    
+    def _stopping_criteria(self, stopping: JSONStoppingCriteria, prompt_length: int) -> StoppingCriteriaList:
+        """
+        Stopping criteria of a single generation: stop when the current request
+        is abandoned, and report progress to it, if there is one.
+        """
+        criteria = StoppingCriteriaList([stopping])
+        request = current_request.get()
+        if request:
+            criteria.insert(0, CancellationStoppingCriteria(stopping, [request]))
+        progress = current_progress.get()
+        if progress:
+            criteria.append(ProgressStoppingCriteria(progress, prompt_length))
+        return criteria
+    
+    def _raise_if_cancelled(self, criteria: StoppingCriteriaList, max_new_tokens: int):
+        """Count and fail a single generation that stopped because its request was abandoned."""
+        for criterion in criteria:
+            if isinstance(criterion, CancellationStoppingCriteria) and criterion.cancelled_at[0] is not None:
+                self._record_cancellation(criterion.cancelled_at[0], max_new_tokens)
+                raise Exception("Generation cancelled: client disconnected")
+    
+    def _assistant_kwargs(self) -> Dict:
+        """Extra model.generate arguments for speculative decoding (empty when it is off)."""
+        if not self.speculative:
+            return {}
+        return {"assistant_model": self.speculative.draft_model}
+    
+    def _track_speculative(self):
+        """Context collecting the draft model statistics of one single-prompt generation."""
+        return self.speculative.track() if self.speculative else contextlib.nullcontext()
+    
+    def _cache_key(self, kind: str, content: str, profile: str, **extra) -> Optional[str]:
+        """
+        Build the result cache key for a generation request.
         
-        # Try parsing the whole text
-        try:
-            return json.loads(text)
-        except:
+        Sampled profiles get None (never cached): asking again, e.g. to
+        regenerate a quiz, must give a new sample rather than the last one.
+        """
+        if DECODING_PROFILES[profile].get("do_sample"):
             return None
+        return make_cache_key(
+            kind=kind,
+            content=content,
+            model=self.model_name,
+            params=DECODING_PROFILES[profile],
+            constrained=settings.constrained_decoding,
+            **extra
+        )
+    
+    def _quiz_grammar(self, num_questions: int) -> Optional[JSONGrammar]:
+        """JSON grammar for a quiz of num_questions questions (None when constrained decoding is off)."""
+        return self._grammar(
+            "quiz",
+            QuizResponse,
+            {"questions": (1, num_questions), "options": (4, 4)},
+            max_string_length=300,
+            integer_ranges={"correctIndex": (0, 3)}
+        )
+    
+    def _summary_grammar(self) -> Optional[JSONGrammar]:
+        """JSON grammar for a summary (None when constrained decoding is off)."""
+        return self._grammar(
+            "summary",
+            SummaryResponse,
+            {"sections": 3, "keyTerms": 5, "essentialPoints": 5},
+            max_string_length=400
+        )
     
-    async def generate_quiz(self, content: str, num_questions: int = 5) -> List[Dict]:
+    def _grammar(self, name: str, model, array_limits: Dict, max_string_length: int,
+                 integer_ranges: Optional[Dict] = None) -> Optional[JSONGrammar]:
+        """Compile (once) the grammar for a response model."""
+        if not settings.constrained_decoding:
+            return None
+        key = (name, tuple(sorted(array_limits.items())))
+        if key not in self._grammars:
+            self._grammars[key] = JSONGrammar(
+                model.model_json_schema(),
+                array_limits=array_limits,
+                max_string_length=max_string_length,
+                integer_ranges=integer_ranges
+            )
+        return self._grammars[key]
+    
+    def _log_early_stop(self, stopping: JSONStoppingCriteria, row: int):
+        """Log the tokens a row did not need to generate."""
+        saved = stopping.tokens_saved(row)
+        if saved:
+            limit = stopping.max_new_tokens[row]
+            logger.info(f"Stopped at complete JSON after {limit - saved} tokens, saved {saved} of {limit}")
+    
+    def _logits_processor(self, grammars: List[Optional[JSONGrammar]]) -> Optional[LogitsProcessorList]:
+        """Logits processors for one generate call (None when no row is constrained)."""
+        if not any(grammars) or not self._token_strings:
+            return None
+        return LogitsProcessorList([
+            JSONLogitsProcessor(grammars, self._token_strings, self.tokenizer.eos_token_id)
+        ])
+    
+    def _normalize_questions(self, questions: List[Dict]) -> List[Dict]:
+        """Set sequential IDs and fill in missing optional fields."""
+        # Salvaged output can hold stray non-object items
+        questions = [q for q in questions if isinstance(q, dict)]
+        for i, q in enumerate(questions):
+            q["id"] = i + 1
+            # Ensure all required fields exist
+            if "explanationDarija" not in q:
+                q["explanationDarija"] = q.get("explanation", "")
+        return questions
+    
+    async def generate_quiz(self, content: str, num_questions: int = 5, profile: Optional[str] = None) -> List[Dict]:
         """
         Generate quiz questions from content.
         
+        Long documents are split into segments ranked by information
+        density; questions are spread over the best segments across the
+        whole document, generated in one batch, then merged and de-duplicated.
+        
         Args:
             content: The text content to generate questions from
             num_questions: Number of questions to generate
+            profile: Decoding profile (None = DECODING_PROFILE setting)
             
         Returns:
             List of quiz questions with options and explanations
@@ -199,28 +1079,235 @@ class LocalAIService:
         if not self.ready:
             raise Exception("Model not loaded")
         
-        import time
+        profile = resolve_profile(profile)
+        segments = await self._chunk_content(content, settings.quiz_segment_tokens)
+        if len(segments) <= 1:
+            return await self._generate_quiz_segment(segments[0] if segments else content, num_questions, profile=profile)
+        
+        questions = []
+        async for event, data in self._coverage_quiz(content, segments, num_questions, profile):
+            if event == "done":
+                questions = data["questions"]
+        return questions
+    
+    async def _coverage_quiz(self, content: str, segments: List[str], num_questions: int,
+                             profile: str) -> AsyncIterator[Tuple[str, Dict]]:
+        """
+        Generate questions from the most informative segments of a document.
+        
+        Args:
+            content: The full document text (used for the document-level cache key)
+            segments: Segments of content, in document order
+            num_questions: Total number of questions to generate
+            profile: Decoding profile
+            
+        Yields:
+            ("question", question) as soon as the model completes it,
+            ("progress", {"segmentsDone", "segments"}) as segments finish,
+            then ("done", {"questions"})
+        """
         start_time = time.time()
         
-        # ULTRA aggressive truncation - only 300 chars for MAXIMUM speed!
-        max_content_length = 300
-        if len(content) > max_content_length:
-            content = content[:max_content_length] + "..."
-            logger.info(f"Content truncated to {max_content_length} chars for maximum speed")
+        cache_key = self._cache_key(
+            "quiz-document",
+            content,
+            profile,
+            num_questions=num_questions,
+            segment_tokens=settings.quiz_segment_tokens,
+            max_segments=settings.quiz_max_segments
+        )
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"✅ Returning {len(cached)} cached questions")
+            for question in copy.deepcopy(cached):
+                yield "question", question
+            yield "done", {"questions": copy.deepcopy(cached)}
+            return
+        
+        allocation = allocate_questions(rank_segments(segments), num_questions, settings.quiz_max_segments)
+        logger.info(
+            f"Generating {num_questions} quiz questions from {len(allocation)} of "
+            f"{len(segments)} segments: {allocation}"
+        )
+        
+        jobs = [(segments[index], count) for index, count in allocation.items()]
+        questions = []
+        # Questions of each segment already looked at, and segments with all their questions
+        sent = [0] * len(jobs)
+        finished = set()
+        
+        def accept(index: int, new_items: List) -> List[Dict]:
+            """Keep a segment's new questions that fit its share and aren't duplicates."""
+            new_items = new_items[:max(0, jobs[index][1] - sent[index])]
+            sent[index] += len(new_items)
+            accepted = []
+            for question in new_items:
+                if len(questions) >= num_questions:
+                    break
+                if not isinstance(question, dict) or is_duplicate_question(
+                    str(question.get("question", "")),
+                    [str(kept.get("question", "")) for kept in questions]
+                ):
+                    continue
+                questions.append(question)
+                self._normalize_questions(questions)
+                accepted.append(question)
+            return accepted
+        
+        loop = asyncio.get_running_loop()
+        streamed: asyncio.Queue = asyncio.Queue()
+        
+        def on_questions(index: int, items: List[Dict]):
+            # Runs on the inference worker thread
+            loop.call_soon_threadsafe(streamed.put_nowait, (index, items))
+        
+        # All segments go through the model as one batch: one prefill and
+        # one decoding loop, like a single call, even with a single worker.
+        # Questions are passed on as soon as their row completes them.
+        batch = asyncio.ensure_future(self._generate_quiz_segments(jobs, profile, on_questions))
+        try:
+            while not batch.done() or not streamed.empty():
+                getter = asyncio.ensure_future(streamed.get())
+                await asyncio.wait([getter, batch], return_when=asyncio.FIRST_COMPLETED)
+                if not getter.done():
+                    getter.cancel()
+                    continue
+                index, items = getter.result()
+                for question in accept(index, items):
+                    yield "question", question
+                if sent[index] >= jobs[index][1] and index not in finished:
+                    finished.add(index)
+                    yield "progress", {"segmentsDone": len(finished), "segments": len(jobs)}
+            results = batch.result()
+        finally:
+            batch.cancel()
+        
+        failed = 0
+        for index, result in enumerate(results):
+            if result is None:
+                failed += 1
+                logger.warning("Segment quiz generation failed: no valid questions after retry")
+                result = []
+            
+            # Questions not streamed, e.g. from the cache, a retry or a repaired output
+            for question in accept(index, result[sent[index]:]):
+                yield "question", question
+            if index not in finished:
+                finished.add(index)
+                yield "progress", {"segmentsDone": len(finished), "segments": len(jobs)}
+        
+        if not questions:
+            raise Exception("Failed to generate quiz: no segment produced valid questions")
+        
+        logger.info(f"✅ Generated {len(questions)} questions across the document in {time.time() - start_time:.2f} seconds")
+        if not failed:
+            self.cache.set(cache_key, questions)
+        yield "done", {"questions": questions}
+    
+    async def _generate_quiz_segments(self, segments: List[Tuple[str, int]], profile: str,
+                                      on_questions: Optional[Callable[[int, List[Dict]], None]] = None
+                                      ) -> List[Optional[List[Dict]]]:
+        """
+        Generate questions about several segments in one batched generation (plus one batched retry).
+        
+        Args:
+            segments: (segment text, number of questions) pairs
+            profile: Decoding profile
+            on_questions: Called with (segment index, new questions) as the model
+                completes them, on the inference worker thread
+            
+        Returns:
+            Questions of each segment, or None for segments without valid output
+        """
+        results: List[Optional[List[Dict]]] = [None] * len(segments)
+        # Fewer questions per segment need fewer new tokens
+        limits = [min(400, 60 + 80 * count) for _, count in segments]
+        keys = [
+            self._cache_key("quiz", content, profile, num_questions=count, max_new_tokens=limit)
+            for (content, count), limit in zip(segments, limits)
+        ]
+        
+        pending = []
+        for index, key in enumerate(keys):
+            cached = self.cache.get(key)
+            if cached is not None:
+                results[index] = copy.deepcopy(cached)
+            else:
+                pending.append(index)
+        
+        for retry in (False, True):
+            if not pending:
+                break
+            if retry:
+                logger.warning(f"Could not parse JSON for {len(pending)} segment(s), retrying with shorter prompts")
+                prompts = [f"Crée {segments[i][1]} questions sur: {segments[i][0][:200]}\nJSON:" for i in pending]
+                batch_limits = [300] * len(pending)
+            else:
+                prompts = [self._build_quiz_prompt(*segments[i]) for i in pending]
+                batch_limits = [limits[i] for i in pending]
+            counts = [segments[i][1] for i in pending]
+            
+            generated, new_tokens = await self.executor.submit(
+                self._generate_batch, prompts, batch_limits,
+                grammars=[self._quiz_grammar(count) for count in counts],
+                max_items=counts,
+                requests=[current_request.get()] * len(pending),
+                profile=profile,
+                on_items=(lambda row, items, rows=pending: on_questions(rows[row], items)) if on_questions else None
+            )
+            progress = current_progress.get()
+            if progress:
+                progress.add_tokens(new_tokens)
+            
+            failed = []
+            for index, result in zip(pending, generated):
+                if result.cancelled:
+                    raise Exception("Generation cancelled: client disconnected")
+                parsed = self.extract_json_from_text(result.text)
+                if parsed and parsed.get("questions"):
+                    questions = self._normalize_questions(parsed["questions"])[:segments[index][1]]
+                    self.cache.set(keys[index], questions)
+                    results[index] = questions
+                else:
+                    failed.append(index)
+            pending = failed
+        
+        return results
+    
+    async def _generate_quiz_segment(self, content: str, num_questions: int, max_new_tokens: int = 400,
+                                     profile: Optional[str] = None) -> List[Dict]:
+        """
+        Generate questions about one segment with a single generation (plus one retry).
+        
+        Args:
+            content: Segment text, already within the token budget
+            num_questions: Number of questions to generate
+            max_new_tokens: Maximum number of new tokens to generate
+            profile: Decoding profile (None = DECODING_PROFILE setting)
+            
+        Returns:
+            List of quiz questions with options and explanations
+        """
+        start_time = time.time()
         
         logger.info(f"Generating {num_questions} quiz questions from {len(content)} characters...")
         
-        # Ultra-short prompt for maximum speed
-        prompt = f"""Crée {num_questions} questions:
-
-{content}
-
-JSON:{{"questions":[{{"id":1,"question":"Q?","options":["A","B","C","D"],"correctIndex":0,"explanation":"E","explanationDarija":"D"}}]}}"""
+        profile = resolve_profile(profile)
+        cache_key = self._cache_key("quiz", content, profile, num_questions=num_questions, max_new_tokens=max_new_tokens)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"✅ Returning {len(cached)} cached questions")
+            return copy.deepcopy(cached)
+        
+        prompt = self._build_quiz_prompt(content, num_questions)
 
         try:
             # Generate with model - minimal tokens for maximum speed
             logger.info("Starting AI generation...")
-            generated = self.generate_text(prompt, max_new_tokens=400)
+            generated = await self.executor.submit(
+                self.generate_text, prompt, max_new_tokens=max_new_tokens,
+                grammar=self._quiz_grammar(num_questions), max_items=num_questions, profile=profile
+            )
             
             elapsed = time.time() - start_time
             logger.info(f"AI generation completed in {elapsed:.2f} seconds")
@@ -228,32 +1315,26 @@ JSON:{{"questions":[{{"id":1,"question":"Q?","options":["A","B","C","D"],"correc
             # Try to extract JSON
             result = self.extract_json_from_text(generated)
             
-            if result and "questions" in result:
-                questions = result["questions"]
-                
-                # Ensure IDs are set
-                for i, q in enumerate(questions):
-                    q["id"] = i + 1
-                    # Ensure all required fields exist
-                    if "explanationDarija" not in q:
-                        q["explanationDarija"] = q.get("explanation", "")
+            if result and result.get("questions"):
+                questions = self._normalize_questions(result["questions"])
                 
                 logger.info(f"✅ Generated {len(questions)} questions")
+                self.cache.set(cache_key, questions[:num_questions])
                 return questions[:num_questions]
             else:
                 # No fallback - retry with even shorter prompt
                 logger.warning("Could not parse JSON from model output, retrying with shorter prompt")
                 # Retry with minimal prompt
                 retry_prompt = f"Crée {num_questions} questions sur: {content[:200]}\nJSON:"
-                generated = self.generate_text(retry_prompt, max_new_tokens=300)
+                generated = await self.executor.submit(
+                    self.generate_text, retry_prompt, max_new_tokens=300,
+                    grammar=self._quiz_grammar(num_questions), max_items=num_questions, profile=profile
+                )
                 result = self.extract_json_from_text(generated)
-                if result and "questions" in result:
-                    questions = result["questions"]
-                    for i, q in enumerate(questions):
-                        q["id"] = i + 1
-                        if "explanationDarija" not in q:
-                            q["explanationDarija"] = q.get("explanation", "")
+                if result and result.get("questions"):
+                    questions = self._normalize_questions(result["questions"])
                     logger.info(f"✅ Generated {len(questions)} questions (retry)")
+                    self.cache.set(cache_key, questions[:num_questions])
                     return questions[:num_questions]
                 else:
                     raise Exception("Failed to generate valid quiz after retry")
@@ -262,41 +1343,204 @@ JSON:{{"questions":[{{"id":1,"question":"Q?","options":["A","B","C","D"],"correc
             logger.error(f"Error generating quiz: {str(e)}")
             raise Exception(f"Failed to generate quiz: {str(e)}")
     
-    async def generate_summary(self, content: str) -> List[Dict]:
+    async def generate_summary(self, content: str, profile: Optional[str] = None) -> List[Dict]:
         """
         Generate a structured summary from content.
         
+        Long documents are split into token-budgeted chunks that are
+        summarized (map), then merged into at most SUMMARY_MAX_SECTIONS
+        sections (reduce). At most SUMMARY_MAX_CHUNKS chunks are summarized,
+        chosen by content hash. Chunk boundaries are chosen by content and
+        each chunk's result is cached, so an edited document only
+        regenerates the chunks around the edit.
+        
         Args:
             content: The text content to summarize
+            profile: Decoding profile (None = DECODING_PROFILE setting)
             
         Returns:
             List of summary sections with key terms and essential points
         """
-        import time
-        start_time = time.time()
-        
         if not self.ready:
             raise Exception("Model not loaded")
         
-        # ULTRA aggressive truncation - only 300 chars for MAXIMUM speed!
-        max_content_length = 300
-        if len(content) > max_content_length:
-            content = content[:max_content_length] + "..."
-            logger.info(f"Content truncated to {max_content_length} chars for maximum speed")
+        profile = resolve_profile(profile)
+        chunks = await self._chunk_content(content, settings.summary_chunk_tokens, settings.summary_max_chunks)
+        if len(chunks) <= 1:
+            return await self._summarize_chunk(chunks[0] if chunks else content, profile)
+        
+        sections = []
+        async for event, data in self._map_reduce_summary(content, chunks, profile):
+            if event == "done":
+                sections = data["sections"]
+        return sections
+    
+    async def _map_reduce_summary(self, content: str, chunks: List[str],
+                                  profile: str) -> AsyncIterator[Tuple[str, Dict]]:
+        """
+        Summarize chunks (a few at a time) and merge the results.
+        
+        Args:
+            content: The full document text (used for the document-level cache key)
+            chunks: Chunks of content to summarize
+            profile: Decoding profile
+            
+        Yields:
+            ("progress", {"chunksDone", "chunks"}) as chunks finish, then
+            ("done", {"sections"}) with the merged summary
+        """
+        start_time = time.time()
+        
+        cache_key = self._cache_key(
+            "summary-document",
+            content,
+            profile,
+            chunk_tokens=settings.summary_chunk_tokens,
+            max_chunks=settings.summary_max_chunks,
+            max_sections=settings.summary_max_sections
+        )
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"✅ Returning {len(cached)} cached summary sections")
+            yield "done", {"sections": copy.deepcopy(cached)}
+            return
+        
+        logger.info(f"Summarizing {len(content)} characters in {len(chunks)} chunks...")
+        
+        # Only as many chunks as the workers (or a batch) can take are queued at a
+        # time, so one long summary doesn't fill the queue ahead of other clients
+        slots = asyncio.Semaphore(max(1, settings.inference_workers, settings.batch_max_size))
+        
+        async def summarize(index: int, chunk: str):
+            async with slots:
+                try:
+                    return index, await self._summarize_chunk(chunk, profile)
+                except Exception as e:
+                    return index, e
+        
+        # Chunks run concurrently; collect them in completion order, keep document order
+        results = [None] * len(chunks)
+        tasks = [asyncio.ensure_future(summarize(i, chunk)) for i, chunk in enumerate(chunks)]
+        try:
+            for done_count, task in enumerate(asyncio.as_completed(tasks), start=1):
+                index, result = await task
+                results[index] = result
+                yield "progress", {"chunksDone": done_count, "chunks": len(chunks)}
+        finally:
+            for task in tasks:
+                task.cancel()
+        
+        partials = [result for result in results if not isinstance(result, Exception)]
+        
+        failed = len(results) - len(partials)
+        if failed:
+            logger.warning(f"{failed} of {len(chunks)} chunks could not be summarized")
+        if not partials:
+            raise Exception("Failed to generate summary: no chunk could be summarized")
+        
+        sections = self._reduce_sections(partials, settings.summary_max_sections)
+        
+        logger.info(f"✅ Map-reduce summary: {len(sections)} sections in {time.time() - start_time:.2f} seconds")
+        if not failed:
+            self.cache.set(cache_key, sections)
+        yield "done", {"sections": sections}
+    
+    async def _chunk_content(self, content: str, max_tokens: int, max_chunks: int = 0) -> List[str]:
+        """
+        Split content into chunks that fit a per-generation token budget.
+        
+        Tokenizing a long document takes a while, so it runs on a thread
+        instead of blocking the event loop (and every other request).
+        
+        Args:
+            content: The document text
+            max_tokens: Token budget of each chunk
+            max_chunks: Keep at most this many chunks, chosen by content hash (0 = all)
+            
+        Returns:
+            List of chunks, in document order
+        """
+        def count_tokens(text: str) -> int:
+            return len(self.tokenizer(text, add_special_tokens=False)["input_ids"])
+        
+        loop = asyncio.get_running_loop()
+        chunks = await loop.run_in_executor(None, chunk_text, content, count_tokens, max_tokens)
+        return select_stable(chunks, max_chunks)
+    
+    def _reduce_sections(self, partials: List[List[Dict]], max_sections: int) -> List[Dict]:
+        """
+        Merge per-chunk summaries into at most max_sections sections.
+        
+        Adjacent sections are grouped in document order; each group keeps the
+        first title, joins the contents and de-duplicates key terms and points.
+        
+        Args:
+            partials: Sections produced for each chunk, in document order
+            max_sections: Maximum number of sections to return
+            
+        Returns:
+            Merged list of summary sections
+        """
+        sections = [section for partial in partials for section in partial if isinstance(section, dict)]
+        if len(sections) <= max_sections:
+            return sections
+        
+        group_size = -(-len(sections) // max_sections)  # ceil division
+        merged = []
+        for start in range(0, len(sections), group_size):
+            group = sections[start:start + group_size]
+            
+            key_terms = {}
+            for section in group:
+                for term in section.get("keyTerms", []):
+                    if isinstance(term, dict) and term.get("term"):
+                        key_terms.setdefault(term["term"].strip().lower(), term)
+            
+            points = []
+            for section in group:
+                for point in section.get("essentialPoints", []):
+                    if point not in points:
+                        points.append(point)
+            
+            merged.append({
+                "title": group[0].get("title", ""),
+                "content": " ".join(section.get("content", "") for section in group).strip(),
+                "keyTerms": list(key_terms.values()),
+                "essentialPoints": points,
+            })
+        
+        return merged
+    
+    async def _summarize_chunk(self, content: str, profile: Optional[str] = None) -> List[Dict]:
+        """
+        Summarize one chunk with a single generation (plus one retry).
+        
+        Args:
+            content: Chunk text, already within the token budget
+            profile: Decoding profile (None = DECODING_PROFILE setting)
+            
+        Returns:
+            List of summary sections for this chunk
+        """
+        start_time = time.time()
         
         logger.info(f"Generating summary from {len(content)} characters...")
         
-        # Ultra-short prompt for maximum speed
-        prompt = f"""Résume:
-
-{content}
-
-JSON:{{"sections":[{{"title":"T","content":"C","keyTerms":[{{"term":"T","definition":"D","definitionDarija":"DD"}}],"essentialPoints":["P1"]}}]}}"""
+        profile = resolve_profile(profile)
+        cache_key = self._cache_key("summary", content, profile, max_new_tokens=300)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            logger.info(f"✅ Returning {len(cached)} cached summary sections")
+            return copy.deepcopy(cached)
+        
+        prompt = self._build_summary_prompt(content)
 
         try:
             # Generate with model - minimal tokens for maximum speed
             logger.info("Starting AI generation...")
-            generated = self.generate_text(prompt, max_new_tokens=300)
+            generated = await self.executor.submit(
+                self.generate_text, prompt, max_new_tokens=300, grammar=self._summary_grammar(), profile=profile
+            )
             
             elapsed = time.time() - start_time
             logger.info(f"AI generation completed in {elapsed:.2f} seconds")
@@ -304,20 +1548,25 @@ JSON:{{"sections":[{{"title":"T","content":"C","keyTerms":[{{"term":"T","definit
             # Try to extract JSON
             result = self.extract_json_from_text(generated)
             
-            if result and "sections" in result:
+            if result and result.get("sections"):
                 sections = result["sections"]
                 logger.info(f"✅ Generated {len(sections)} summary sections")
+                self.cache.set(cache_key, sections)
                 return sections
             else:
                 # No fallback - retry with even shorter prompt
                 logger.warning("Could not parse JSON from model output, retrying with shorter prompt")
                 # Retry with minimal prompt
                 retry_prompt = f"Résume: {content[:200]}\nJSON:"
-                generated = self.generate_text(retry_prompt, max_new_tokens=250)
+                generated = await self.executor.submit(
+                    self.generate_text, retry_prompt, max_new_tokens=250, grammar=self._summary_grammar(),
+                    profile=profile
+                )
                 result = self.extract_json_from_text(generated)
-                if result and "sections" in result:
+                if result and result.get("sections"):
                     sections = result["sections"]
                     logger.info(f"✅ Generated {len(sections)} summary sections (retry)")
+                    self.cache.set(cache_key, sections)
                     return sections
                 else:
                     raise Exception("Failed to generate valid summary after retry")
@@ -0,0 +1,197 @@
+"""
+Snapshots of the prepared model in safetensors format.
+
+from_pretrained re-reads the original checkpoint on every start, converts
+it to the runtime dtype (and quantizes it) before the server can answer.
+A snapshot stores the weights exactly as they run - converted dtype,
+quantized layers - next to the config and tokenizer. Loading it
+memory-maps the file and hands the mapped tensors straight to an empty
+model skeleton: nothing is converted or copied, and processes loading the
+same snapshot share one copy in the page cache.
+
+int8 layers keep their weights in fbgemm's packed format, which has no
+file representation; their int8 values and scales are stored and
+re-packed on load (fast, but not shared between processes).
+"""
+import json
+import logging
+import os
+import re
+from typing import Dict
+
+import torch
+from safetensors.torch import load_file, save_file
+from transformers import AutoConfig, AutoModelForCausalLM, GenerationConfig
+
+from services.quantization import QUANTIZATION_MODES, _replace_linear_layers
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_WEIGHTS = "model.safetensors"
+SNAPSHOT_INFO = "snapshot.json"
+SNAPSHOT_FORMAT = 1
+
+DTYPES = {"fp32": torch.float32, "bf16": torch.bfloat16, "fp16": torch.float16}
+
+
+def snapshot_path(model_name: str, precision: str, directory: str) -> str:
+    """Directory the snapshot of a model at a precision (fp32, bf16, fp16, int8, int4) is saved in."""
+    safe_name = re.sub(r"[^A-Za-z0-9._-]+", "_", model_name.strip("/"))
+    return os.path.join(directory, f"{safe_name}-{precision}")
+
+
+def has_snapshot(path: str, model_name: str) -> bool:
+    """Whether path holds a complete snapshot of model_name in the current format."""
+    try:
+        with open(os.path.join(path, SNAPSHOT_INFO)) as f:
+            info = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return (
+        info.get("format") == SNAPSHOT_FORMAT
+        and info.get("model_name") == model_name
+        and os.path.exists(os.path.join(path, SNAPSHOT_WEIGHTS))
+    )
+
+
+def save_snapshot(model, tokenizer, model_name: str, precision: str, directory: str) -> str:
+    """
+    Write a loaded model's weights, config and tokenizer as a snapshot.
+
+    Args:
+        model: The model as it runs (converted and/or quantized)
+        tokenizer: Its tokenizer
+        model_name: Name the model was loaded from (checked on load)
+        precision: fp32, bf16, fp16, int8 or int4
+        directory: Directory holding snapshots
+
+    Returns:
+        The snapshot directory
+    """
+    path = snapshot_path(model_name, precision, directory)
+    os.makedirs(path, exist_ok=True)
+
+    tensors = _snapshot_tensors(model)
+    # Write to a temp file first so an interrupted save never leaves a corrupt snapshot
+    temporary = os.path.join(path, SNAPSHOT_WEIGHTS + ".tmp")
+    save_file(tensors, temporary, metadata={"precision": precision})
+    os.replace(temporary, os.path.join(path, SNAPSHOT_WEIGHTS))
+
+    model.config.save_pretrained(path)
+    if model.generation_config is not None:
+        model.generation_config.save_pretrained(path)
+    tokenizer.save_pretrained(path)
+
+    # Written last: its presence marks the snapshot as complete
+    with open(os.path.join(path, SNAPSHOT_INFO), "w") as f:
+        json.dump({"format": SNAPSHOT_FORMAT, "model_name": model_name, "precision": precision}, f)
+
+    size = sum(t.numel() * t.element_size() for t in tensors.values())
+    logger.info(f"✅ Saved {precision} snapshot of {model_name} to {path} ({size / 1e6:.0f} MB)")
+    return path
+
+
+def _snapshot_tensors(model) -> Dict[str, torch.Tensor]:
+    """Flatten a model's weights into plain tensors (int8 layers unpacked)."""
+    tensors = {}
+    quantized = set()
+    for name, module in model.named_modules():
+        if isinstance(module, torch.ao.nn.quantized.dynamic.Linear):
+            quantized.add(name)
+            weight, bias = module._weight_bias()
+            tensors[f"{name}.weight_int8"] = weight.int_repr()
+            if weight.qscheme() == torch.per_tensor_affine:
+                tensors[f"{name}.weight_scale"] = torch.tensor([weight.q_scale()], dtype=torch.float64)
+                tensors[f"{name}.weight_zero_point"] = torch.tensor([weight.q_zero_point()], dtype=torch.int64)
+            else:
+                tensors[f"{name}.weight_scale"] = weight.q_per_channel_scales()
+                tensors[f"{name}.weight_zero_point"] = weight.q_per_channel_zero_points()
+                tensors[f"{name}.weight_axis"] = torch.tensor([weight.q_per_channel_axis()])
+            if bias is not None:
+                tensors[f"{name}.bias"] = bias.detach()
+
+    # Tied weights (e.g. input/output embeddings) are saved once and re-tied on load
+    seen = set()
+    for key, tensor in model.state_dict().items():
+        if not isinstance(tensor, torch.Tensor) or key.rsplit(".", 1)[0] in quantized:
+            continue
+        if key.split("._packed_params")[0] in quantized:
+            continue
+        identity = (tensor.data_ptr(), tensor.dtype, tuple(tensor.shape))
+        if identity in seen:
+            continue
+        seen.add(identity)
+        tensors[key] = tensor.detach().contiguous()
+    return tensors
+
+
+def load_snapshot(path: str, device: str = "cpu"):
+    """
+    Build a model from a snapshot, using the memory-mapped weights directly.
+
+    Args:
+        path: Snapshot directory
+        device: Device to move the model to (weights stay mapped on CPU)
+
+    Returns:
+        The model in eval mode
+    """
+    from accelerate import init_empty_weights
+
+    with open(os.path.join(path, SNAPSHOT_INFO)) as f:
+        precision = json.load(f)["precision"]
+    quantization = precision if precision in QUANTIZATION_MODES[1:] else None
+    dtype = torch.float32 if quantization else DTYPES[precision]
+
+    config = AutoConfig.from_pretrained(path)
+    # Parameters go on the meta device (no memory); buffers such as rotary tables stay real
+    with init_empty_weights():
+        model = AutoModelForCausalLM.from_config(config, torch_dtype=dtype)
+    if quantization:
+        _replace_linear_layers(model, quantization, empty=True)
+
+    # Tensors backed by the mapped file, not copies
+    tensors = load_file(os.path.join(path, SNAPSHOT_WEIGHTS))
+    _restore_int8_layers(model, tensors)
+    model.load_state_dict(tensors, strict=False, assign=True)
+    for module in model.modules():
+        if isinstance(module, torch.ao.nn.quantized.dynamic.Linear):
+            # Without state dict metadata the layer takes itself for a version 1
+            # checkpoint, which switches off reduce_range activation quantization
+            module.version = module._version
+    model.tie_weights()
+
+    missing = [name for name, param in model.named_parameters() if param.is_meta]
+    if missing:
+        raise Exception(f"Snapshot {path} is missing weights: {', '.join(missing[:5])}")
+
+    try:
+        model.generation_config = GenerationConfig.from_pretrained(path)
+    except OSError:
+        pass
+
+    model.eval()
+    if device != "cpu":
+        model = model.to(device)
+    logger.info(f"Loaded {precision} snapshot from {path}")
+    return model
+
+
+def _restore_int8_layers(model, tensors: Dict[str, torch.Tensor]):
+    """Turn the saved int8 values of dynamic quantized Linear layers back into the entries load_state_dict expects."""
+    for name, module in model.named_modules():
+        if not isinstance(module, torch.ao.nn.quantized.dynamic.Linear):
+            continue
+        values = tensors.pop(f"{name}.weight_int8")
+        scale = tensors.pop(f"{name}.weight_scale")
+        zero_point = tensors.pop(f"{name}.weight_zero_point")
+        axis = tensors.pop(f"{name}.weight_axis", None)
+        if axis is None:
+            weight = torch._make_per_tensor_quantized_tensor(values, scale.item(), zero_point.item())
+        else:
+            weight = torch._make_per_channel_quantized_tensor(values, scale, zero_point, axis.item())
+        # Unversioned layout: the layer packs weight and bias itself
+        tensors[f"{name}.weight"] = weight
+        tensors[f"{name}.bias"] = tensors.pop(f"{name}.bias", None)
+        tensors[f"{name}.scale"] = torch.tensor(module.scale)
+        tensors[f"{name}.zero_point"] = torch.tensor(module.zero_point)
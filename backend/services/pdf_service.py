@@ -1,14 +1,127 @@
 """PDF processing service."""
+import hashlib
 import io
 import logging
-from typing import Optional
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterator, List, Optional
 from PyPDF2 import PdfReader
 
+from config import settings
+from services.result_cache import DiskCache
+
 logger = logging.getLogger(__name__)
 
 # Maximum pages to process (prevent hanging on huge PDFs)
 MAX_PAGES = 100
 
+# PdfReader keeps every object it resolves, so page-by-page extraction
+# reopens it after this many pages to keep memory bounded on large files
+READER_REOPEN_PAGES = 20
+
+# Process pool shared by all parallel extractions (created on first use)
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_pdf_workers() -> int:
+    """Number of processes used for parallel extraction (per server process)."""
+    if settings.pdf_workers > 0:
+        return settings.pdf_workers
+    return max(1, (os.cpu_count() or 1) // settings.server_process_count)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    """Create the extraction process pool on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a process that already holds torch threads can deadlock
+            _pool = ProcessPoolExecutor(
+                max_workers=get_pdf_workers(),
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            logger.info(f"PDF extraction pool started with {get_pdf_workers()} processes")
+        return _pool
+
+
+def shutdown_pdf_pool():
+    """Stop the extraction process pool."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def _extract_page_texts(pdf_reader: PdfReader, start: int, end: int) -> List[str]:
+    """
+    Extract the raw text of pages [start, end).
+    
+    Returns:
+        One string per page, empty for pages without text or that failed
+    """
+    texts = []
+    for page_num in range(start, end):
+        try:
+            text = pdf_reader.pages[page_num].extract_text() or ""
+            logger.debug(f"Extracted {len(text)} chars from page {page_num + 1}")
+        except Exception as e:
+            logger.warning(f"Error extracting text from page {page_num + 1}: {str(e)}")
+            text = ""
+        texts.append(text)
+    return texts
+
+
+def _extract_page_range(pdf_path: str, start: int, end: int) -> List[str]:
+    """Process pool worker: open a private reader over the shared file and extract pages [start, end)."""
+    with open(pdf_path, "rb") as pdf_file:
+        return _extract_page_texts(PdfReader(pdf_file), start, end)
+
+
+def _extract_pages_parallel(pdf_content: bytes, pages: int, workers: int) -> List[str]:
+    """
+    Shard the page range across the process pool and reassemble it in page order.
+    
+    The file is written to a temporary file once and workers open it by
+    path, instead of each shard pickling its own copy of the bytes.
+    
+    Args:
+        pdf_content: PDF file content as bytes
+        pages: Number of pages to extract, starting at page 0
+        workers: Number of shards (one per worker process)
+        
+    Returns:
+        Raw text of each page, in order
+    """
+    shard_size = -(-pages // workers)  # ceil division
+    pool = _get_pool()
+    
+    spool = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False)
+    futures = []
+    try:
+        with spool:
+            spool.write(pdf_content)
+        futures = [
+            pool.submit(_extract_page_range, spool.name, start, min(start + shard_size, pages))
+            for start in range(0, pages, shard_size)
+        ]
+        
+        texts = []
+        for future in futures:
+            texts.extend(future.result())
+        return texts
+    finally:
+        # Shards still reading the file (after another one failed) must close it first on Windows
+        wait(futures)
+        os.unlink(spool.name)
+
+
 def extract_text_from_pdf(pdf_content: bytes) -> str:
     """
     Extract text content from a PDF file.
@@ -19,6 +132,26 @@ def extract_text_from_pdf(pdf_content: bytes) -> str:
     Returns:
         Extracted text as string
     """
+    return extract_pdf_pages(pdf_content)["text"]
+
+
+def extract_pdf_pages(pdf_content: bytes, parallel: Optional[bool] = None) -> Dict:
+    """
+    Extract cleaned text from a PDF file along with page boundaries.
+    
+    Large documents are split across a process pool; documents with fewer
+    than PDF_PARALLEL_MIN_PAGES pages are extracted serially.
+    
+    Args:
+        pdf_content: PDF file content as bytes
+        parallel: Force (True) or disable (False) parallel extraction;
+            None decides from the page count
+        
+    Returns:
+        Dict with "text" (cleaned text), "page_offsets" (start offset in
+        "text" of each page that had text), "page_numbers" (1-based number
+        of each page that had text) and "page_count" (pages processed)
+    """
     try:
         logger.info(f"Starting PDF extraction, file size: {len(pdf_content) / 1024 / 1024:.2f} MB")
         
@@ -34,37 +167,179 @@ def extract_text_from_pdf(pdf_content: bytes) -> str:
         if total_pages > MAX_PAGES:
             logger.warning(f"PDF has {total_pages} pages, only processing first {MAX_PAGES}")
         
+        workers = min(get_pdf_workers(), pages_to_process)
+        if parallel is None:
+            parallel = pages_to_process >= settings.pdf_parallel_min_pages
+        
         # Extract text from pages
-        text_content = []
-        for page_num in range(pages_to_process):
+        page_texts = None
+        if parallel and workers > 1:
             try:
-                page = pdf_reader.pages[page_num]
-                text = page.extract_text()
-                if text and text.strip():
-                    text_content.append(text)
-                    logger.debug(f"Extracted {len(text)} chars from page {page_num + 1}")
-            except Exception as e:
-                logger.warning(f"Error extracting text from page {page_num + 1}: {str(e)}")
-                continue
-        
-        if not text_content:
-            raise Exception("No text could be extracted from the PDF. The PDF might be image-based or encrypted.")
+                page_texts = _extract_pages_parallel(pdf_content, pages_to_process, workers)
+            except BrokenProcessPool as e:
+                logger.warning(f"PDF extraction pool failed, falling back to serial: {str(e)}")
+                shutdown_pdf_pool()
         
-        # Combine all text
-        full_text = "\n\n".join(text_content)
+        if page_texts is None:
+            page_texts = _extract_page_texts(pdf_reader, 0, pages_to_process)
+        
+        text_pages = [(number, text) for number, text in enumerate(page_texts, start=1) if text.strip()]
+        
+        if not text_pages:
+            raise Exception("No text could be extracted from the PDF. The PDF might be image-based or encrypted.")
         
-        # Clean up the text
-        full_text = clean_text(full_text)
+        result = assemble_pages(
+            [clean_text(text) for _, text in text_pages],
+            [number for number, _ in text_pages],
+            pages_to_process
+        )
         
-        logger.info(f"✅ Extracted {len(full_text)} characters from {len(text_content)} pages")
+        logger.info(f"✅ Extracted {len(result['text'])} characters from {len(text_pages)} pages")
         
-        return full_text
+        return result
     
     except Exception as e:
         logger.error(f"❌ Error reading PDF: {str(e)}")
         raise Exception(f"Failed to extract text from PDF: {str(e)}")
 
 
+def assemble_pages(cleaned_pages: List[str], page_numbers: List[int], page_count: int) -> Dict:
+    """
+    Join cleaned page texts and record where each page starts.
+    
+    Cleaning pages separately and joining them with newlines gives the
+    same text as cleaning the whole document at once.
+    
+    Args:
+        cleaned_pages: Cleaned text of each page that had text
+        page_numbers: 1-based page number of each of those pages
+        page_count: Number of pages processed
+        
+    Returns:
+        Same dict as extract_pdf_pages
+    """
+    page_offsets = []
+    offset = 0
+    for cleaned in cleaned_pages:
+        page_offsets.append(offset)
+        offset += len(cleaned) + 1
+    
+    return {
+        "text": "\n".join(cleaned_pages),
+        "page_offsets": page_offsets,
+        "page_numbers": page_numbers,
+        "page_count": page_count,
+    }
+
+
+def split_pages(extracted: Dict) -> List[str]:
+    """
+    Split an extraction result back into its page texts using the page offsets.
+    
+    Args:
+        extracted: Dict returned by extract_pdf_pages
+        
+    Returns:
+        Cleaned text of each page that had text
+    """
+    text = extracted["text"]
+    offsets = extracted["page_offsets"]
+    ends = [offset - 1 for offset in offsets[1:]] + [len(text)]
+    return [text[start:end] for start, end in zip(offsets, ends)]
+
+
+def iter_pdf_pages(pdf_path: str) -> Iterator[Dict]:
+    """
+    Extract a PDF on disk one page at a time.
+    
+    The file is read from disk as pages need it, and the reader (with the
+    objects it has resolved) is replaced every READER_REOPEN_PAGES pages,
+    so memory use does not grow with the page count.
+    
+    Args:
+        pdf_path: Path of the PDF file
+        
+    Yields:
+        {"page", "total_pages", "text"} for each page, with cleaned text
+        (empty for pages without text)
+    """
+    with open(pdf_path, "rb") as pdf_file:
+        pdf_reader = PdfReader(pdf_file)
+        
+        total_pages = len(pdf_reader.pages)
+        pages_to_process = min(total_pages, MAX_PAGES)
+        if total_pages > MAX_PAGES:
+            logger.warning(f"PDF has {total_pages} pages, only processing first {MAX_PAGES}")
+        
+        for page_num in range(pages_to_process):
+            if page_num and page_num % READER_REOPEN_PAGES == 0:
+                pdf_reader = PdfReader(pdf_file)
+            text = _extract_page_texts(pdf_reader, page_num, page_num + 1)[0]
+            yield {
+                "page": page_num + 1,
+                "total_pages": pages_to_process,
+                "text": clean_text(text) if text.strip() else "",
+            }
+
+
+def extract_pdf_pages_cached(pdf_content: bytes, cache: Optional[DiskCache]) -> Dict:
+    """
+    Extract a PDF, reusing the stored result for byte-identical files.
+    
+    Args:
+        pdf_content: PDF file content as bytes
+        cache: Extraction cache keyed by SHA-256 of the file (None disables caching)
+        
+    Returns:
+        Same dict as extract_pdf_pages
+    """
+    if cache is None:
+        return extract_pdf_pages(pdf_content)
+    
+    digest = hashlib.sha256(pdf_content).hexdigest()
+    cached = get_cached_extraction(cache, digest)
+    if cached is not None:
+        logger.info(f"✅ Using cached extraction for {digest[:12]}")
+        return cached
+    
+    result = extract_pdf_pages(pdf_content)
+    store_cached_extraction(cache, digest, result)
+    return result
+
+
+def get_cached_extraction(cache: Optional[DiskCache], digest: str) -> Optional[Dict]:
+    """
+    Look up a stored extraction, treating database errors as a miss.
+    
+    Several server processes share the SQLite file, so a lookup can fail
+    with "database is locked"; the upload is then extracted again.
+    
+    Args:
+        cache: Extraction cache (None disables caching)
+        digest: SHA-256 hex digest of the file
+        
+    Returns:
+        The stored extraction, or None
+    """
+    if cache is None:
+        return None
+    try:
+        return cache.get(digest)
+    except sqlite3.Error as e:
+        logger.warning(f"Could not read PDF extraction cache: {str(e)}")
+        return None
+
+
+def store_cached_extraction(cache: Optional[DiskCache], digest: str, extracted: Dict):
+    """Store an extraction, logging (not raising) database errors."""
+    if cache is None:
+        return
+    try:
+        cache.set(digest, extracted)
+    except sqlite3.Error as e:
+        logger.warning(f"Could not cache PDF extraction: {str(e)}")
+
+
 def clean_text(text: str) -> str:
     """
     Clean extracted text by removing excessive whitespace and formatting issues.
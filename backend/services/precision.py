@@ -0,0 +1,110 @@
+"""Choosing the floating-point precision the model runs in on CPU."""
+import contextlib
+import logging
+from typing import Tuple
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+PRECISIONS = ("auto", "fp32", "bf16")
+
+# CPU flags with native bfloat16 matmul support (AVX512-BF16 on Cooper Lake+, AMX on Sapphire Rapids+)
+BF16_CPU_FLAGS = {"avx512_bf16", "amx_bf16"}
+
+
+def cpu_bf16_flags() -> set:
+    """
+    Native bfloat16 instruction sets of this CPU.
+
+    Returns:
+        Subset of BF16_CPU_FLAGS found in /proc/cpuinfo (empty where unavailable)
+    """
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("flags"):
+                    return BF16_CPU_FLAGS & set(line.split(":", 1)[1].split())
+    except OSError:
+        pass
+    return set()
+
+
+def resolve_cpu_precision(setting: str) -> Tuple[str, torch.dtype]:
+    """
+    Turn the CPU_PRECISION setting into the precision to load the model in.
+
+    Args:
+        setting: "auto", "fp32" or "bf16"
+
+    Returns:
+        Tuple of (precision name, torch dtype)
+    """
+    if setting not in PRECISIONS:
+        raise Exception(f"Unknown CPU precision: {setting} (expected one of {', '.join(PRECISIONS)})")
+
+    flags = cpu_bf16_flags()
+    if setting == "auto":
+        setting = "bf16" if flags else "fp32"
+        logger.info(f"CPU bf16 support: {', '.join(sorted(flags)) or 'none'} -> using {setting}")
+    elif setting == "bf16" and not flags:
+        # Still works, but bf16 is emulated and usually slower than fp32
+        logger.warning("CPU_PRECISION=bf16 but this CPU has no native bf16 support")
+
+    return setting, torch.bfloat16 if setting == "bf16" else torch.float32
+
+
+def resolve_device(setting: str) -> str:
+    """
+    Turn the DEVICE setting into the device to run on.
+
+    Args:
+        setting: "auto", "cpu" or "cuda"
+
+    Returns:
+        "cuda" if auto and a GPU is available, otherwise the setting ("cpu" for auto without GPU)
+    """
+    if setting == "auto":
+        return "cuda" if torch.cuda.is_available() else "cpu"
+    return setting
+
+
+def resolve_model_precision(device: str, cpu_precision: str, cpu_quantization: str) -> Tuple[str, torch.dtype]:
+    """
+    Precision the model is loaded and run in on a device.
+
+    Args:
+        device: "cpu" or "cuda"
+        cpu_precision: CPU_PRECISION setting
+        cpu_quantization: CPU_QUANTIZATION setting
+
+    Returns:
+        Tuple of (precision name, torch dtype to load the weights in):
+        fp16 on GPU, the quantization mode (float32 weights) when quantizing
+        on CPU, otherwise the resolved CPU precision
+    """
+    if device == "cuda":
+        return "fp16", torch.float16
+    if cpu_quantization != "none":
+        # Quantized kernels take float32 activations
+        return cpu_quantization, torch.float32
+    return resolve_cpu_precision(cpu_precision)
+
+
+def autocast_context(precision: str, device: str):
+    """
+    Context manager for running generation at the chosen precision.
+
+    Under bf16 on CPU, autocast keeps precision-sensitive ops (softmax,
+    layer norm) in float32 while matmuls run in bfloat16.
+
+    Args:
+        precision: Resolved precision name
+        device: "cpu" or "cuda"
+
+    Returns:
+        torch.autocast for bf16 on CPU, otherwise a no-op context
+    """
+    if precision == "bf16" and device == "cpu":
+        return torch.autocast("cpu", dtype=torch.bfloat16)
+    return contextlib.nullcontext()
@@ -0,0 +1,119 @@
+"""Reusing the attention key/value cache of fixed prompt prefixes across requests."""
+import contextlib
+import logging
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+
+class PrefixCache:
+    """
+    Precomputed past_key_values for the fixed leading part of prompt templates.
+
+    Every quiz (or summary) prompt starts with the same instructions and
+    JSON example. Their key/value tensors are computed once; a generation
+    whose prompt starts with a cached prefix is seeded with them, so the
+    model only runs over the document content and the new tokens.
+    """
+
+    def __init__(self, model, tokenizer):
+        """
+        Initialize an empty cache.
+
+        Args:
+            model: The loaded causal language model
+            tokenizer: Its tokenizer
+        """
+        self.model = model
+        self.tokenizer = tokenizer
+        # name -> (prefix text, prefix token ids, legacy past_key_values)
+        self._prefixes: Dict[str, Tuple[str, torch.Tensor, Tuple]] = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._tokens_reused = 0
+
+    def add(self, name: str, prefix: str, context: Callable = None):
+        """
+        Run the model over a prefix and keep its key/value cache.
+
+        Args:
+            name: Template name (e.g. "quiz")
+            prefix: Fixed leading text of the template
+            context: Optional context manager factory for the forward pass (e.g. autocast)
+        """
+        input_ids = self.tokenizer(prefix, return_tensors="pt")["input_ids"].to(self.model.device)
+        with torch.no_grad(), (context() if context else contextlib.nullcontext()):
+            outputs = self.model(input_ids=input_ids, use_cache=True)
+
+        past = outputs.past_key_values
+        if hasattr(past, "to_legacy_cache"):
+            past = past.to_legacy_cache()
+
+        # Tuples are never written to: each generation builds its own cache
+        # from them and appends new keys/values to fresh tensors
+        self._prefixes[name] = (prefix, input_ids, past)
+        logger.info(f"Prefix cache: '{name}' template prefix precomputed ({input_ids.shape[1]} tokens)")
+
+    def encode(self, prompt: str) -> Dict:
+        """
+        Tokenize a prompt for model.generate, reusing a cached prefix when it matches.
+
+        The remainder is tokenized on its own and appended to the cached
+        prefix ids, so the ids always line up with the cached keys/values.
+
+        Args:
+            prompt: Full prompt text
+
+        Returns:
+            Keyword arguments for model.generate (input_ids, attention_mask
+            and, on a hit, past_key_values)
+        """
+        match = self._match(prompt)
+        if match is None:
+            with self._lock:
+                self._misses += 1
+            return dict(self.tokenizer(prompt, return_tensors="pt").to(self.model.device))
+
+        prefix, prefix_ids, past = match
+        rest = self.tokenizer(
+            prompt[len(prefix):], return_tensors="pt", add_special_tokens=False
+        )["input_ids"].to(self.model.device)
+        input_ids = torch.cat([prefix_ids, rest], dim=1)
+
+        with self._lock:
+            self._hits += 1
+            self._tokens_reused += prefix_ids.shape[1]
+
+        return {
+            "input_ids": input_ids,
+            "attention_mask": torch.ones_like(input_ids),
+            "past_key_values": past,
+        }
+
+    def _match(self, prompt: str) -> Optional[Tuple[str, torch.Tensor, Tuple]]:
+        """Longest cached prefix the prompt starts with."""
+        best = None
+        for entry in self._prefixes.values():
+            if prompt.startswith(entry[0]) and len(prompt) > len(entry[0]):
+                if best is None or len(entry[0]) > len(best[0]):
+                    best = entry
+        return best
+
+    def stats(self) -> Dict:
+        """
+        Get prefix cache statistics.
+
+        Returns:
+            Dict with cached prefix lengths, hits, misses and tokens reused
+        """
+        with self._lock:
+            return {
+                "prefixes": {name: entry[1].shape[1] for name, entry in self._prefixes.items()},
+                "hits": self._hits,
+                "misses": self._misses,
+                "tokens_reused": self._tokens_reused,
+            }
@@ -0,0 +1,243 @@
+"""
+CPU weight quantization for the local model.
+
+Two modes are available for GPU-less machines:
+- int8: torch dynamic quantization of every nn.Linear (int8 weights,
+  activations quantized on the fly). About 4x less weight memory and
+  faster matmuls through fbgemm/qnnpack.
+- int4: weight-only 4-bit quantization with group-wise scales. About 7x
+  less weight memory on disk and in snapshots. Each layer dequantizes its
+  weight on its first forward pass and keeps it (INT4_CACHE_WEIGHTS), as
+  torch has no packed int4 CPU kernel; with the cache off, weights are
+  dequantized on every pass, trading speed for the smallest footprint.
+
+Quantized weights are saved under QUANTIZED_MODEL_DIR and reloaded on
+the next start without materializing the float32 model again.
+"""
+import logging
+import os
+import re
+from typing import Dict, Optional
+
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from transformers import AutoConfig, AutoModelForCausalLM, GenerationConfig
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+QUANTIZATION_MODES = ("none", "int8", "int4")
+
+# Input features sharing one int4 scale
+INT4_GROUP_SIZE = 128
+
+
+class Int4Linear(nn.Module):
+    """
+    Linear layer storing its weight as packed 4-bit integers.
+
+    Each row is split into groups of INT4_GROUP_SIZE inputs with one
+    float16 scale per group (symmetric, values -8..7). Two weights share
+    a byte. The dequantized weight is kept after the first forward pass
+    unless INT4_CACHE_WEIGHTS is off; it is not part of the state dict.
+    """
+
+    def __init__(self, in_features: int, out_features: int, bias: bool = True, group_size: int = INT4_GROUP_SIZE):
+        """
+        Create an empty layer (weights are filled by from_float or load_state_dict).
+
+        Args:
+            in_features: Input size
+            out_features: Output size
+            bias: Whether the layer has a bias
+            group_size: Inputs per quantization group
+        """
+        super().__init__()
+        self.in_features = in_features
+        self.out_features = out_features
+        self.group_size = group_size
+        groups = -(-in_features // group_size)
+        padded = groups * group_size
+        self.register_buffer("packed_weight", torch.zeros(out_features, padded // 2, dtype=torch.uint8))
+        self.register_buffer("scales", torch.ones(out_features, groups, dtype=torch.float16))
+        if bias:
+            self.register_buffer("bias", torch.zeros(out_features))
+        else:
+            self.bias = None
+        self.cache_weight = settings.int4_cache_weights
+        self._weight: Optional[torch.Tensor] = None
+
+    @classmethod
+    def from_float(cls, linear: nn.Linear, group_size: int = INT4_GROUP_SIZE) -> "Int4Linear":
+        """Quantize a float Linear layer."""
+        layer = cls(linear.in_features, linear.out_features, linear.bias is not None, group_size)
+        weight = linear.weight.detach().float()
+
+        padding = layer.packed_weight.shape[1] * 2 - layer.in_features
+        if padding:
+            weight = F.pad(weight, (0, padding))
+        grouped = weight.view(layer.out_features, -1, group_size)
+
+        scales = grouped.abs().amax(dim=-1).clamp(min=1e-8) / 7
+        quantized = torch.clamp(torch.round(grouped / scales.unsqueeze(-1)), -8, 7).to(torch.int8)
+        # Shift to 0..15 and pack pairs of nibbles into bytes
+        nibbles = (quantized + 8).to(torch.uint8).view(layer.out_features, -1)
+        layer.packed_weight.copy_(nibbles[:, 0::2] | (nibbles[:, 1::2] << 4))
+        layer.scales.copy_(scales.to(torch.float16))
+        if linear.bias is not None:
+            layer.bias.copy_(linear.bias.detach().float())
+        return layer
+
+    def dequantize(self) -> torch.Tensor:
+        """Rebuild the float32 weight matrix."""
+        low = (self.packed_weight & 0x0F).to(torch.int8) - 8
+        high = (self.packed_weight >> 4).to(torch.int8) - 8
+        nibbles = torch.stack((low, high), dim=-1).view(self.out_features, -1, self.group_size)
+        weight = nibbles.float() * self.scales.float().unsqueeze(-1)
+        return weight.view(self.out_features, -1)[:, :self.in_features]
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        weight = self._weight
+        if weight is None or weight.dtype != x.dtype:
+            weight = self.dequantize().to(x.dtype)
+            if self.cache_weight:
+                self._weight = weight
+        return F.linear(x, weight, self.bias)
+
+    def extra_repr(self) -> str:
+        return f"in_features={self.in_features}, out_features={self.out_features}, group_size={self.group_size}"
+
+
+def _replace_linear_layers(module: nn.Module, mode: str, empty: bool = False):
+    """
+    Swap every nn.Linear under module for its quantized counterpart.
+
+    Args:
+        module: Model (or submodule) to convert in place
+        mode: "int8" or "int4"
+        empty: Create uninitialized layers to be filled from a saved state dict
+    """
+    for name, child in module.named_children():
+        if isinstance(child, nn.Linear):
+            has_bias = child.bias is not None
+            if mode == "int8":
+                layer = (
+                    torch.ao.nn.quantized.dynamic.Linear(
+                        child.in_features, child.out_features, bias_=has_bias, dtype=torch.qint8
+                    )
+                    if empty else torch.ao.nn.quantized.dynamic.Linear.from_float(_with_qconfig(child))
+                )
+            else:
+                layer = (
+                    Int4Linear(child.in_features, child.out_features, has_bias)
+                    if empty else Int4Linear.from_float(child)
+                )
+            setattr(module, name, layer)
+        else:
+            _replace_linear_layers(child, mode, empty)
+
+
+def _with_qconfig(linear: nn.Linear) -> nn.Linear:
+    """Attach the dynamic int8 qconfig that from_float expects."""
+    linear.qconfig = torch.ao.quantization.default_dynamic_qconfig
+    return linear
+
+
+def quantize_model(model: nn.Module, mode: str) -> nn.Module:
+    """
+    Quantize a float32 model's Linear layers in place.
+
+    Args:
+        model: The loaded float32 model
+        mode: "int8" or "int4"
+
+    Returns:
+        The same model, quantized
+    """
+    _check_mode(mode)
+    _replace_linear_layers(model, mode)
+    return model
+
+
+def _check_mode(mode: str):
+    """Reject unknown quantization modes."""
+    if mode not in QUANTIZATION_MODES[1:]:
+        raise Exception(f"Unknown CPU quantization mode: {mode} (expected one of {', '.join(QUANTIZATION_MODES)})")
+
+
+def quantized_weights_path(model_name: str, mode: str, directory: str) -> str:
+    """File the quantized state dict of a model is saved to."""
+    safe_name = re.sub(r"[^A-Za-z0-9._-]+", "_", model_name.strip("/"))
+    return os.path.join(directory, f"{safe_name}-{mode}.pt")
+
+
+def model_weight_bytes(model: nn.Module) -> int:
+    """Bytes taken by the model's parameters and buffers (packed int8 weights included)."""
+    total = sum(t.numel() * t.element_size() for t in model.state_dict().values() if isinstance(t, torch.Tensor))
+    for module in model.modules():
+        if isinstance(module, torch.ao.nn.quantized.dynamic.Linear):
+            weight, _ = module._weight_bias()
+            total += weight.numel() * weight.element_size()
+    return total
+
+
+def load_quantized_model(model_name: str, mode: str, directory: str, **model_kwargs) -> nn.Module:
+    """
+    Load a model with quantized Linear layers, reusing saved weights if present.
+
+    The first run loads the float32 model, quantizes it and saves the
+    quantized state dict. Later runs build the model skeleton without
+    allocating float weights and load the saved quantized weights.
+
+    Args:
+        model_name: Hugging Face model name or local path
+        mode: "int8" or "int4"
+        directory: Directory holding saved quantized weights
+        **model_kwargs: Extra arguments for from_pretrained
+
+    Returns:
+        The quantized model in eval mode
+    """
+    _check_mode(mode)
+    path = quantized_weights_path(model_name, mode, directory)
+
+    if os.path.exists(path):
+        logger.info(f"Loading {mode} quantized weights from {path}")
+        model = _load_saved(model_name, mode, path, model_kwargs.get("trust_remote_code", True))
+    else:
+        logger.info(f"Quantizing {model_name} to {mode} (first run, the float32 model is loaded once)")
+        model = AutoModelForCausalLM.from_pretrained(model_name, **{**model_kwargs, "torch_dtype": torch.float32})
+        quantize_model(model, mode)
+
+        os.makedirs(directory, exist_ok=True)
+        # Write to a temp file first so an interrupted save never leaves a corrupt cache
+        temporary = path + ".tmp"
+        torch.save(model.state_dict(), temporary)
+        os.replace(temporary, path)
+        logger.info(f"✅ Saved {mode} quantized weights to {path}")
+
+    model.eval()
+    logger.info(f"   Quantized weights: {model_weight_bytes(model) / 1e6:.0f} MB ({mode})")
+    return model
+
+
+def _load_saved(model_name: str, mode: str, path: str, trust_remote_code: bool) -> nn.Module:
+    """Build the quantized skeleton of a model and fill it from a saved state dict."""
+    from accelerate import init_empty_weights
+
+    config = AutoConfig.from_pretrained(model_name, trust_remote_code=trust_remote_code)
+    # Parameters go on the meta device (no memory); buffers such as rotary tables stay real
+    with init_empty_weights():
+        model = AutoModelForCausalLM.from_config(config, trust_remote_code=trust_remote_code, torch_dtype=torch.float32)
+    _replace_linear_layers(model, mode, empty=True)
+
+    state: Dict = torch.load(path, map_location="cpu")
+    model.load_state_dict(state, assign=True)
+
+    try:
+        model.generation_config = GenerationConfig.from_pretrained(model_name)
+    except OSError:
+        pass
+    return model
@@ -0,0 +1,53 @@
+"""
+Per-request generation progress, tracked across every generation a request runs.
+
+A request (e.g. a quiz job) sets a RequestProgress as the current one;
+context variables follow it into the tasks it starts and, through the
+inference executor, into the worker threads running model.generate. Each
+generation adds the tokens it produces through a stopping criterion that
+sees every new token.
+
+Free of torch imports, so the web process can track requests it sends to
+separate inference servers.
+"""
+import contextlib
+import contextvars
+import threading
+from typing import Iterator, Optional
+
+current_progress: contextvars.ContextVar[Optional["RequestProgress"]] = contextvars.ContextVar(
+    "current_progress", default=None
+)
+
+
+class RequestProgress:
+    """Tokens generated so far for one request, over all its generations."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tokens = 0
+
+    @property
+    def tokens(self) -> int:
+        with self._lock:
+            return self._tokens
+
+    def add_tokens(self, count: int):
+        """Count tokens produced by one of the request's generations."""
+        with self._lock:
+            self._tokens += count
+
+    def set_tokens(self, count: int):
+        """Set the total (from progress reported by another process)."""
+        with self._lock:
+            self._tokens = max(self._tokens, count)
+
+
+@contextlib.contextmanager
+def track_progress(progress: RequestProgress) -> Iterator[RequestProgress]:
+    """Make progress the current request's progress inside the block."""
+    token = current_progress.set(progress)
+    try:
+        yield progress
+    finally:
+        current_progress.reset(token)
@@ -0,0 +1,242 @@
+"""Content-addressed cache for generated quizzes and summaries."""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(**parts: Any) -> str:
+    """
+    Build a stable cache key from the inputs that determine a generation.
+
+    Args:
+        **parts: Content, model name, generation params, etc. (JSON-serializable)
+
+    Returns:
+        SHA-256 hex digest of the canonical JSON encoding of parts
+    """
+    canonical = json.dumps(parts, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class DiskCache:
+    """
+    SQLite-backed cache tier with TTL and least-recently-used eviction
+    once the stored values exceed a size budget.
+    """
+
+    def __init__(self, path: str, max_bytes: int, ttl_seconds: int):
+        """
+        Open (or create) the cache database.
+
+        Args:
+            path: SQLite database file
+            max_bytes: Maximum total size of stored values
+            ttl_seconds: Age after which entries expire
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, "
+            "created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the stored value, or None if missing or expired."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            value, created = row
+            if now - created > self.ttl_seconds:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+
+            self._conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+
+        return json.loads(value)
+
+    def set(self, key: str, value: Any):
+        """Store a value, then evict expired and least-recently-used entries over budget."""
+        encoded = json.dumps(value, ensure_ascii=False)
+        size = len(encoded.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, encoded, size, now, now)
+            )
+            self._conn.execute("DELETE FROM entries WHERE created < ?", (now - self.ttl_seconds,))
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Drop least-recently-used entries until the total size fits the budget."""
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        evicted = 0
+        for key, size in self._conn.execute("SELECT key, size FROM entries ORDER BY accessed").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            evicted += 1
+
+        logger.info(f"Result cache evicted {evicted} entries from disk")
+
+    def stats(self) -> Dict[str, int]:
+        """Get entry count and total size on disk."""
+        with self._lock:
+            count, total = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()
+        return {"entries": count, "bytes": total}
+
+
+class ResultCache:
+    """
+    Two-tier result cache: an in-memory LRU in front of an optional
+    on-disk SQLite tier. Both tiers honour the same TTL.
+    """
+
+    def __init__(self, max_entries: int = 128, ttl_seconds: int = 86400,
+                 disk_path: str = "", disk_max_mb: int = 100):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Size of the in-memory LRU (0 disables caching)
+            ttl_seconds: Age after which entries expire
+            disk_path: SQLite file for the on-disk tier (empty disables it)
+            disk_max_mb: Size budget of the on-disk tier
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._memory: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+
+        self.disk = None
+        if max_entries > 0 and disk_path:
+            try:
+                self.disk = DiskCache(disk_path, disk_max_mb * 1024 * 1024, ttl_seconds)
+                logger.info(f"Result cache on disk: {disk_path} ({disk_max_mb} MB)")
+            except Exception as e:
+                logger.warning(f"Could not open result cache at {disk_path}, using memory only: {str(e)}")
+
+    @property
+    def enabled(self) -> bool:
+        """Whether caching is turned on."""
+        return self.max_entries > 0
+
+    def get(self, key: Optional[str]) -> Optional[Any]:
+        """
+        Look up a cached result.
+
+        Args:
+            key: Cache key from make_cache_key (None = not cacheable)
+
+        Returns:
+            The cached value, or None on a miss
+        """
+        if not self.enabled or key is None:
+            return None
+
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                created, value = entry
+                if now - created <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self._hits += 1
+                    return value
+                del self._memory[key]
+
+        value = self.disk.get(key) if self.disk else None
+
+        with self._lock:
+            if value is None:
+                self._misses += 1
+                return None
+            self._hits += 1
+            self._disk_hits += 1
+            self._store_in_memory(key, value, now)
+        return value
+
+    def set(self, key: Optional[str], value: Any):
+        """
+        Store a result in both tiers.
+
+        Args:
+            key: Cache key from make_cache_key (None = not cacheable, nothing is stored)
+            value: JSON-serializable result
+        """
+        if not self.enabled or key is None:
+            return
+
+        with self._lock:
+            self._store_in_memory(key, value, time.time())
+
+        if self.disk:
+            try:
+                self.disk.set(key, value)
+            except Exception as e:
+                logger.warning(f"Could not write result cache entry to disk: {str(e)}")
+
+    def _store_in_memory(self, key: str, value: Any, created: float):
+        """Insert into the LRU, evicting the oldest entry when full (lock held)."""
+        self._memory[key] = (created, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> Dict:
+        """
+        Get cache counters.
+
+        Returns:
+            Dict with hit/miss counts, hit rate and tier sizes
+        """
+        with self._lock:
+            lookups = self._hits + self._misses
+            stats = {
+                "enabled": self.enabled,
+                "hits": self._hits,
+                "disk_hits": self._disk_hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+            }
+        stats["disk"] = self.disk.stats() if self.disk else None
+        return stats
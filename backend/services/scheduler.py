@@ -0,0 +1,204 @@
+"""
+Ordering of queued generations: priority classes, fair between clients.
+
+Every generation call waiting for an inference worker belongs to a
+request. Requests carry a priority class (interactive quiz before bulk
+summary), the client they came from and, for requests a client waits on,
+a deadline. The queue serves the highest class first and, inside a
+class, takes one generation per client in turn, so one client's twenty
+summaries don't hold back everyone else's. Generations whose request was
+abandoned (client disconnected) or never got a worker before its deadline
+are dropped before they reach the model.
+"""
+import contextlib
+import contextvars
+import threading
+import time
+import weakref
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Iterator, List, Optional
+
+# Lower runs first
+PRIORITIES = {"interactive": 0, "bulk": 1}
+
+# Lower-priority generations waiting this long are served like interactive ones, so they can't starve
+PROMOTION_SECONDS = 30.0
+
+current_request: contextvars.ContextVar[Optional["GenerationRequest"]] = contextvars.ContextVar(
+    "current_request", default=None
+)
+
+
+class GenerationRequest:
+    """Scheduling information of one API request, shared by all its generations."""
+
+    def __init__(self, client: str = "", priority: str = "interactive", deadline_seconds: float = 0):
+        """
+        Initialize a request.
+
+        Args:
+            client: Client identifier (fair queuing shares workers between clients)
+            priority: Priority class name from PRIORITIES
+            deadline_seconds: Seconds within which its first generation must start (0 = none)
+        """
+        if priority not in PRIORITIES:
+            raise Exception(f"Unknown priority class: {priority} (expected one of {', '.join(PRIORITIES)})")
+        self.client = client
+        self.priority = priority
+        self.created = time.time()
+        self.deadline = self.created + deadline_seconds if deadline_seconds > 0 else None
+        # Set once a generation runs; later generations (e.g. retries) then aren't dropped for the deadline
+        self.started = False
+        self.started_at: Optional[float] = None
+        # Set when the request's block of generations (track_request) exits
+        self.finished = False
+        self._abandoned = threading.Event()
+
+    def mark_started(self):
+        """Record that one of its generations is running."""
+        if not self.started:
+            self.started_at = time.time()
+        self.started = True
+
+    def abandon(self):
+        """Mark the request as no longer wanted (e.g. its client disconnected)."""
+        self._abandoned.set()
+
+    @property
+    def abandoned(self) -> bool:
+        return self._abandoned.is_set()
+
+    def drop_reason(self) -> Optional[str]:
+        """Why its queued generations should be dropped, or None to run them."""
+        if self.abandoned:
+            return "client disconnected"
+        if not self.started and self.deadline is not None and time.time() > self.deadline:
+            return "deadline passed"
+        return None
+
+    def to_dict(self) -> Dict:
+        """Client and priority, e.g. to forward to an inference server."""
+        return {"client": self.client, "priority": self.priority}
+
+
+@contextlib.contextmanager
+def track_request(request: GenerationRequest) -> Iterator[GenerationRequest]:
+    """Make request the current request inside the block, and mark it finished when the block exits."""
+    token = current_request.set(request)
+    try:
+        yield request
+    finally:
+        request.finished = True
+        current_request.reset(token)
+
+
+class AdmittedRequests:
+    """
+    Requests let in and not finished yet, counted per priority class.
+
+    Admission limits count these rather than queued generations, since one
+    request (e.g. a long summary) can queue many generations. Requests are
+    held weakly, so one whose response never ran (its client hung up first)
+    stops counting once it is dropped.
+    """
+
+    def __init__(self):
+        self._requests: "weakref.WeakSet[GenerationRequest]" = weakref.WeakSet()
+        self._lock = threading.Lock()
+
+    def add(self, request: GenerationRequest):
+        """Count a request until it finishes."""
+        with self._lock:
+            self._requests.add(request)
+
+    def count(self, priority: Optional[str] = None) -> int:
+        """Unfinished requests, of one priority class or all."""
+        with self._lock:
+            return sum(
+                1 for request in self._requests
+                if not request.finished and (priority is None or request.priority == priority)
+            )
+
+
+class FairQueue:
+    """
+    Queue of work items served by priority class, then round-robin over clients.
+
+    Not thread-safe: the inference executor guards it with its lock.
+    """
+
+    def __init__(self):
+        # priority -> client -> that client's items in arrival order
+        self._classes: Dict[int, "OrderedDict[str, Deque]"] = {
+            rank: OrderedDict() for rank in sorted(PRIORITIES.values())
+        }
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def push(self, item: Any, request: Optional[GenerationRequest]):
+        """Add an item for a request (None: anonymous interactive work)."""
+        rank = PRIORITIES[request.priority] if request else 0
+        client = request.client if request else ""
+        self._classes[rank].setdefault(client, deque()).append((time.time(), request, item))
+        self._size += 1
+
+    def pop(self) -> Optional[tuple]:
+        """
+        Take the next item.
+
+        Returns:
+            (request, item) of the next item, or None if the queue is empty
+        """
+        rank = self._starving_rank()
+        for candidate in ([rank] if rank is not None else []) + list(self._classes):
+            clients = self._classes[candidate]
+            if not clients:
+                continue
+            # The client at the front goes to the back of its class after one item
+            client, items = next(iter(clients.items()))
+            _, request, item = items.popleft()
+            del clients[client]
+            if items:
+                clients[client] = items
+            self._size -= 1
+            return request, item
+        return None
+
+    def remove(self, item: Any) -> bool:
+        """
+        Take a specific item out of the queue (e.g. cancelled while waiting).
+
+        Returns:
+            True if the item was queued
+        """
+        for clients in self._classes.values():
+            for client, items in clients.items():
+                for entry in items:
+                    if entry[2] is item:
+                        items.remove(entry)
+                        if not items:
+                            del clients[client]
+                        self._size -= 1
+                        return True
+        return False
+
+    def _starving_rank(self) -> Optional[int]:
+        """A lower class whose oldest item has waited past PROMOTION_SECONDS."""
+        now = time.time()
+        for rank, clients in list(self._classes.items())[1:]:
+            if any(now - items[0][0] > PROMOTION_SECONDS for items in clients.values()):
+                return rank
+        return None
+
+    def depth_by_priority(self) -> Dict[str, int]:
+        """Queued items per priority class."""
+        return {
+            name: sum(len(items) for items in self._classes[rank].values())
+            for name, rank in PRIORITIES.items()
+        }
+
+    def clients(self) -> List[str]:
+        """Clients with queued items."""
+        return sorted({client for clients in self._classes.values() for client in clients})
@@ -0,0 +1,109 @@
+"""Ranking document segments by information density and de-duplicating questions."""
+import math
+import re
+from collections import Counter
+from typing import Dict, List
+
+# Common French/English words that carry no topical information
+STOPWORDS = {
+    "les", "des", "une", "est", "sont", "dans", "pour", "par", "sur", "avec", "qui", "que",
+    "quoi", "dont", "aux", "ces", "ses", "son", "leur", "leurs", "cette", "cet",
+    "pas", "plus", "ont", "été", "être", "avoir", "fait", "elle", "elles", "ils", "nous",
+    "vous", "mais", "donc", "car", "ainsi", "comme", "tout", "tous", "toute",
+    "the", "and", "for", "are", "with", "that", "this", "from", "was", "were", "which",
+    "have", "has", "not", "but", "its", "can", "all", "also", "their", "they",
+}
+
+WORD_PATTERN = re.compile(r"[^\W\d_]{3,}", re.UNICODE)
+
+
+def tokenize_words(text: str) -> List[str]:
+    """Lowercase content words of at least three letters, without stopwords."""
+    return [word for word in WORD_PATTERN.findall(text.lower()) if word not in STOPWORDS]
+
+
+def rank_segments(segments: List[str]) -> List[float]:
+    """
+    Score segments by TF-IDF information density.
+
+    A segment scores high when it contains many terms that are frequent in
+    it but rare in the rest of the document (definitions, key concepts),
+    and low when it is boilerplate repeated across pages (headers, tables
+    of contents).
+
+    Args:
+        segments: Document segments in order
+
+    Returns:
+        One score per segment, in the same order
+    """
+    term_counts = [Counter(tokenize_words(segment)) for segment in segments]
+    document_frequency = Counter(term for counts in term_counts for term in counts)
+    total = len(segments)
+
+    scores = []
+    for counts in term_counts:
+        length = sum(counts.values())
+        if not length:
+            scores.append(0.0)
+            continue
+        tfidf = sum(
+            count * math.log((1 + total) / (1 + document_frequency[term])) + count
+            for term, count in counts.items()
+        )
+        # Normalize by the square root of length so short, dense segments can win
+        # without favouring one-line fragments
+        scores.append(tfidf / math.sqrt(length))
+    return scores
+
+
+def allocate_questions(scores: List[float], num_questions: int, max_segments: int) -> Dict[int, int]:
+    """
+    Decide how many questions to ask about each segment.
+
+    The best-scoring segments are picked (at most one per question and at
+    most max_segments), then questions are dealt to them round-robin in
+    score order so every picked segment gets at least one.
+
+    Args:
+        scores: Segment scores from rank_segments
+        num_questions: Total number of questions wanted
+        max_segments: Maximum number of segments to generate from
+
+    Returns:
+        Mapping of segment index to question count, in document order
+    """
+    picked_count = max(1, min(num_questions, max_segments, len(scores)))
+    by_score = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)[:picked_count]
+
+    allocation = {index: 0 for index in by_score}
+    for i in range(num_questions):
+        allocation[by_score[i % picked_count]] += 1
+
+    return dict(sorted(allocation.items()))
+
+
+def is_duplicate_question(question: str, kept: List[str], threshold: float = 0.8) -> bool:
+    """
+    Check whether a question repeats one already kept.
+
+    Args:
+        question: Candidate question text
+        kept: Texts of questions already accepted
+        threshold: Word-set Jaccard similarity above which two questions are the same
+
+    Returns:
+        True if the question is a near-duplicate
+    """
+    words = set(tokenize_words(question))
+    if not words:
+        return question.strip().lower() in (other.strip().lower() for other in kept)
+
+    for other in kept:
+        other_words = set(tokenize_words(other))
+        if not other_words:
+            continue
+        similarity = len(words & other_words) / len(words | other_words)
+        if similarity >= threshold:
+            return True
+    return False
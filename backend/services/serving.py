@@ -0,0 +1,106 @@
+"""
+Serving the API from several processes that share one copy of the model weights.
+
+Each uvicorn worker process loads the model itself. Loaded from the
+original checkpoint, every process would hold its own converted copy of
+the weights; loaded from a snapshot (see services.model_snapshot), the
+processes memory-map the same file and the OS keeps a single copy in the
+page cache. Each worker makes sure the snapshot exists before loading (the
+first one writes it while the others wait on a lock file), and limits
+torch to its share of the cores. This works the same whether the workers
+were started by python main.py or by uvicorn --workers.
+"""
+import logging
+import os
+import subprocess
+import sys
+
+import torch
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: no file locks, workers may write the snapshot concurrently
+    fcntl = None
+
+from config import settings
+from services.model_snapshot import has_snapshot, snapshot_path
+from services.precision import resolve_device, resolve_model_precision
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Held while a worker checks for (and if needed writes) the snapshot
+PREPARE_LOCK_FILE = ".prepare.lock"
+
+
+def get_server_workers() -> int:
+    """Number of server processes (SERVER_WORKERS, or WEB_CONCURRENCY as set for uvicorn)."""
+    return settings.server_process_count
+
+
+def torch_thread_budget() -> int:
+    """Intra-op threads torch may use in this process."""
+    if settings.torch_threads > 0:
+        return settings.torch_threads
+    return max(1, (os.cpu_count() or 1) // get_server_workers())
+
+
+def apply_thread_budget() -> int:
+    """
+    Limit torch in this process to its thread budget.
+
+    Returns:
+        The number of threads set
+    """
+    threads = torch_thread_budget()
+    torch.set_num_threads(threads)
+    logger.info(
+        f"Torch threads: {threads} ({os.cpu_count()} cores, {get_server_workers()} server process(es))"
+    )
+    return threads
+
+
+def prepare_shared_weights() -> bool:
+    """
+    Make sure the worker processes can share the model weights.
+
+    Called by every worker before it loads the model. Writes the snapshot
+    with snapshot_model.py if there is none yet; that runs in its own
+    process so the worker doesn't keep a second copy of the model while
+    serving. Workers take turns on a lock file in SNAPSHOT_DIR, so only the
+    first writes the snapshot and the others then find it.
+
+    Returns:
+        True if the workers will memory-map a shared snapshot
+    """
+    device = resolve_device(settings.device)
+    if device == "cuda":
+        logger.warning("Server workers each load the model onto the GPU; weights are only shared on CPU")
+        return False
+    if not settings.snapshot_dir:
+        logger.warning("SNAPSHOT_DIR is empty: every server worker loads its own copy of the model")
+        return False
+
+    precision, _ = resolve_model_precision(device, settings.cpu_precision, settings.cpu_quantization)
+    path = snapshot_path(settings.local_model_name, precision, settings.snapshot_dir)
+    os.makedirs(settings.snapshot_dir, exist_ok=True)
+    with open(os.path.join(settings.snapshot_dir, PREPARE_LOCK_FILE), "w") as lock:
+        if fcntl:
+            # Released when the file is closed
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        if not has_snapshot(path, settings.local_model_name):
+            logger.info(f"Writing the {precision} snapshot shared by the server workers...")
+            # The writer is a single process: all cores, and no snapshot of its own to prepare
+            env = {**os.environ, "SERVER_WORKERS": "1", "WEB_CONCURRENCY": "1"}
+            subprocess.run([sys.executable, os.path.join(BACKEND_DIR, "snapshot_model.py")], cwd=BACKEND_DIR, env=env)
+            if not has_snapshot(path, settings.local_model_name):
+                logger.error("❌ Snapshot could not be written: every server worker loads its own copy of the model")
+                return False
+
+    if precision == "int8":
+        # fbgemm's packed int8 weights are rebuilt in every process (see services.model_snapshot)
+        logger.warning("int8 layers are re-packed in every server worker; use CPU_QUANTIZATION=int4 or none to share them")
+    logger.info(f"✅ Server worker {os.getpid()} shares {path} with {get_server_workers() - 1} other(s)")
+    return True
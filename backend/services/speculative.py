@@ -0,0 +1,178 @@
+"""
+Speculative (assisted) decoding with a small draft model.
+
+A much smaller model sharing the main model's tokenizer proposes a few
+tokens at a time; the main model checks all of them in one forward pass
+and keeps the longest prefix it agrees with, plus one token of its own.
+With greedy decoding the output is exactly what the main model alone
+would produce; the gain depends on how often the draft guesses right.
+"""
+import contextlib
+import logging
+import threading
+import time
+from typing import Dict, Iterator, List
+
+from transformers import AutoModelForCausalLM, AutoTokenizer
+
+logger = logging.getLogger(__name__)
+
+
+class SpeculativeRun:
+    """Forward passes of the main and draft models during one generation."""
+
+    def __init__(self):
+        self.target_seconds: List[float] = []
+        self.draft_forwards = 0
+        self.draft_seconds = 0.0
+
+
+class SpeculativeDecoder:
+    """
+    Draft model for transformers' assisted generation, plus acceptance statistics.
+
+    Forward hooks on both models count passes per thread, so concurrent
+    generations on the worker pool each get their own numbers.
+    """
+
+    def __init__(self, model, draft_model, num_tokens: int):
+        """
+        Attach to a loaded main model and draft model.
+
+        Args:
+            model: The main causal language model
+            draft_model: The draft model (same tokenizer as the main model)
+            num_tokens: Tokens the draft proposes per step to start with
+                (adjusted during each generation by how many get accepted)
+        """
+        self.model = model
+        self.draft_model = draft_model
+        self.draft_model.generation_config.num_assistant_tokens = num_tokens
+        self._local = threading.local()
+
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._proposed = 0
+        self._accepted = 0
+        self._tokens = 0
+        self._seconds = 0.0
+        self._plain_seconds = 0.0
+
+        model.register_forward_pre_hook(self._start_forward)
+        model.register_forward_hook(self._end_target_forward)
+        draft_model.register_forward_pre_hook(self._start_forward)
+        draft_model.register_forward_hook(self._end_draft_forward)
+
+    def _run(self):
+        return getattr(self._local, "run", None)
+
+    def _start_forward(self, module, args):
+        if self._run() is not None:
+            self._local.forward_start = time.perf_counter()
+
+    def _end_target_forward(self, module, args, output):
+        run = self._run()
+        if run is not None:
+            run.target_seconds.append(time.perf_counter() - self._local.forward_start)
+
+    def _end_draft_forward(self, module, args, output):
+        run = self._run()
+        if run is not None:
+            run.draft_forwards += 1
+            run.draft_seconds += time.perf_counter() - self._local.forward_start
+
+    @contextlib.contextmanager
+    def track(self) -> Iterator[SpeculativeRun]:
+        """Count the forward passes of the generation run inside the block (this thread only)."""
+        self._local.run = SpeculativeRun()
+        try:
+            yield self._local.run
+        finally:
+            self._local.run = None
+
+    def report(self, run: SpeculativeRun, new_tokens: int, seconds: float):
+        """
+        Log one generation's acceptance rate and estimated speedup.
+
+        Every main-model pass yields the accepted draft tokens plus one of
+        its own, so accepted = new tokens - passes. Each draft pass proposes
+        one token. Plain decoding time is estimated from this run's own
+        passes: the first (prompt) pass plus one average later pass per
+        remaining token.
+
+        Args:
+            run: Counters collected by track()
+            new_tokens: Tokens generated
+            seconds: Wall time of the generation
+        """
+        passes = len(run.target_seconds)
+        if not new_tokens or not passes or seconds <= 0:
+            return
+
+        accepted = max(0, new_tokens - passes)
+        proposed = max(run.draft_forwards, accepted)
+        step = sum(run.target_seconds[1:]) / (passes - 1) if passes > 1 else run.target_seconds[0]
+        plain_seconds = run.target_seconds[0] + (new_tokens - 1) * step
+
+        with self._lock:
+            self._requests += 1
+            self._proposed += proposed
+            self._accepted += accepted
+            self._tokens += new_tokens
+            self._seconds += seconds
+            self._plain_seconds += plain_seconds
+
+        rate = accepted / proposed if proposed else 0.0
+        logger.info(
+            f"Speculative decoding: {accepted}/{proposed} draft tokens accepted ({rate:.0%}), "
+            f"{new_tokens} tokens in {passes} main-model passes, "
+            f"~{plain_seconds / seconds:.2f}x vs plain decoding "
+            f"(draft took {run.draft_seconds:.2f}s of {seconds:.2f}s)"
+        )
+
+    def stats(self) -> Dict:
+        """
+        Get speculative decoding statistics.
+
+        Returns:
+            Dict with requests, acceptance rate and estimated overall speedup
+        """
+        with self._lock:
+            return {
+                "draft_model": self.draft_model.name_or_path,
+                "num_tokens": self.draft_model.generation_config.num_assistant_tokens,
+                "requests": self._requests,
+                "tokens": self._tokens,
+                "acceptance_rate": round(self._accepted / self._proposed, 3) if self._proposed else 0.0,
+                "speedup": round(self._plain_seconds / self._seconds, 2) if self._seconds else 0.0,
+            }
+
+
+def load_draft_model(draft_model_name: str, tokenizer, device: str, **model_kwargs):
+    """
+    Load the draft model and check it can assist the main model.
+
+    Args:
+        draft_model_name: Hugging Face model name or local path of the draft model
+        tokenizer: Tokenizer of the main model
+        device: Device the main model runs on
+        **model_kwargs: Extra arguments for from_pretrained (dtype, trust_remote_code)
+
+    Returns:
+        The draft model in eval mode on device
+    """
+    draft_tokenizer = AutoTokenizer.from_pretrained(
+        draft_model_name, trust_remote_code=model_kwargs.get("trust_remote_code", True)
+    )
+    # Draft tokens are verified by id, so both models must split text identically
+    if draft_tokenizer.get_vocab() != tokenizer.get_vocab():
+        raise Exception(f"Draft model {draft_model_name} does not share the main model's tokenizer")
+
+    draft_model = AutoModelForCausalLM.from_pretrained(draft_model_name, **model_kwargs).to(device)
+    draft_model.eval()
+    if draft_model.get_output_embeddings().weight.shape[0] < len(tokenizer):
+        raise Exception(f"Draft model {draft_model_name} has a smaller vocabulary than the tokenizer")
+
+    parameters = sum(p.numel() for p in draft_model.parameters())
+    logger.info(f"✅ Draft model loaded: {draft_model_name} ({parameters / 1e6:.0f}M parameters)")
+    return draft_model
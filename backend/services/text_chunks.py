@@ -0,0 +1,120 @@
+"""Splitting long documents into token-budgeted chunks."""
+import hashlib
+import logging
+import zlib
+from typing import Callable, List
+
+logger = logging.getLogger(__name__)
+
+# Chunks end after "boundary" lines, picked by a hash of the line text
+# rather than by position, so an edit only moves the boundaries next to it
+# and the other chunks (and their cached results) stay the same. Chunks
+# hold at least MIN_FILL of the budget; after that, a line of n tokens is a
+# boundary with probability n / (BOUNDARY_SPACING * budget), so boundaries
+# come about every BOUNDARY_SPACING of the budget whatever the line lengths.
+MIN_FILL = 0.25
+BOUNDARY_SPACING = 0.5
+
+
+def chunk_text(text: str, count_tokens: Callable[[str], int], max_tokens: int) -> List[str]:
+    """
+    Split text into chunks of at most max_tokens tokens, at content-defined boundaries.
+
+    Lines are kept whole where possible; a line that is longer than the
+    budget on its own is split between words. A chunk ends after a
+    boundary line (see is_boundary) once it holds MIN_FILL of the budget,
+    or earlier when the next line would not fit.
+
+    Args:
+        text: Cleaned document text (one paragraph or line per row)
+        count_tokens: Function returning the token count of a string
+        max_tokens: Token budget of each chunk
+
+    Returns:
+        List of chunks, in document order
+    """
+    chunks = []
+    current: List[str] = []
+    current_tokens = 0
+
+    def flush():
+        nonlocal current, current_tokens
+        if current:
+            chunks.append("\n".join(current))
+        current = []
+        current_tokens = 0
+
+    for line in text.split("\n"):
+        line = line.strip()
+        if not line:
+            continue
+
+        # +1 for the newline joining it to the previous line
+        line_tokens = count_tokens(line) + 1
+
+        if line_tokens > max_tokens:
+            flush()
+            chunks.extend(_split_long_line(line, count_tokens, max_tokens))
+            continue
+
+        if current_tokens + line_tokens > max_tokens:
+            flush()
+
+        current.append(line)
+        current_tokens += line_tokens
+
+        if current_tokens >= max_tokens * MIN_FILL and is_boundary(line, line_tokens, max_tokens):
+            flush()
+
+    flush()
+    return chunks
+
+
+def is_boundary(line: str, line_tokens: int, max_tokens: int) -> bool:
+    """Whether a chunk may end after this line: decided by its text, more likely for longer lines."""
+    spacing = max(1, int(max_tokens * BOUNDARY_SPACING))
+    return zlib.crc32(line.encode("utf-8")) % spacing < line_tokens
+
+
+def _split_long_line(line: str, count_tokens: Callable[[str], int], max_tokens: int) -> List[str]:
+    """Split a single oversized line between words."""
+    pieces = []
+    current: List[str] = []
+    current_tokens = 0
+
+    for word in line.split(" "):
+        word_tokens = count_tokens(" " + word)
+        if current and current_tokens + word_tokens > max_tokens:
+            pieces.append(" ".join(current))
+            current = []
+            current_tokens = 0
+        current.append(word)
+        current_tokens += word_tokens
+
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def select_stable(chunks: List[str], limit: int) -> List[str]:
+    """
+    Keep at most limit chunks, chosen by a hash of their content.
+
+    The same chunk is kept (or dropped) whatever else changed in the
+    document, so an edit doesn't turn the selection, and every cached
+    chunk result with it, into a different set.
+
+    Args:
+        chunks: Chunks in document order
+        limit: Maximum number of chunks to keep (0 = all)
+
+    Returns:
+        The selected chunks, still in document order
+    """
+    if limit <= 0 or len(chunks) <= limit:
+        return chunks
+
+    ranked = sorted(range(len(chunks)), key=lambda index: hashlib.sha256(chunks[index].encode("utf-8")).digest())
+    keep = set(ranked[:limit])
+    logger.info(f"Document has {len(chunks)} chunks, keeping {limit} of them")
+    return [chunk for index, chunk in enumerate(chunks) if index in keep]
@@ -0,0 +1,84 @@
+"""
+Write a snapshot of the model as the server runs it, for fast cold starts.
+Usage: python snapshot_model.py [model_name]
+
+The model is loaded from its original weights with the current settings
+(device, CPU_PRECISION, CPU_QUANTIZATION), then saved in safetensors form
+under SNAPSHOT_DIR. The server memory-maps it on the next start.
+Run it again after changing the model, precision or quantization.
+"""
+import sys
+import time
+
+import torch
+
+from config import settings
+
+
+def print_header(text):
+    """Print a formatted header."""
+    print("\n" + "=" * 60)
+    print(f"  {text}")
+    print("=" * 60 + "\n")
+
+
+def create_snapshot(model_name: str = None) -> bool:
+    """
+    Load a model with the server's settings and save its snapshot.
+
+    Args:
+        model_name: Model name from Hugging Face (default: LOCAL_MODEL_NAME)
+
+    Returns:
+        True if the snapshot was written and reloads identically
+    """
+    from services.local_ai_service import LocalAIService
+    from services.model_snapshot import load_snapshot, save_snapshot
+
+    directory = settings.snapshot_dir or "models/snapshots"
+    if model_name:
+        settings.local_model_name = model_name
+    # Load from the original weights, and skip what a snapshot doesn't need
+    settings.snapshot_dir = ""
+    settings.draft_model_name = ""
+    settings.prefix_cache = False
+    settings.constrained_decoding = False
+    settings.warmup_tokens = 0
+
+    print_header(f"Snapshot: {settings.local_model_name}")
+
+    try:
+        service = LocalAIService()
+        start = time.perf_counter()
+        service.load_model()
+        print(f"✅ Loaded from original weights in {time.perf_counter() - start:.1f}s ({service.precision})")
+
+        path = save_snapshot(service.model, service.tokenizer, service.model_name, service.precision, directory)
+        print(f"✅ Snapshot written to {path}")
+
+        # Check the snapshot reproduces the model
+        start = time.perf_counter()
+        reloaded = load_snapshot(path, service.device)
+        print(f"✅ Snapshot loads in {time.perf_counter() - start:.2f}s")
+
+        inputs = service.tokenizer("Le contrat est un accord de volontés", return_tensors="pt").to(service.device)
+        with torch.inference_mode():
+            expected = service.model(**inputs).logits
+            actual = reloaded(**inputs).logits
+        if not torch.equal(expected, actual):
+            print(f"❌ Reloaded model differs (max difference {(expected - actual).abs().max().item():.3g})")
+            return False
+
+        service.shutdown()
+        print_header("Success!")
+        print("The server loads this snapshot on its next start with the same settings.")
+        return True
+
+    except Exception as e:
+        print(f"\n❌ Error: {str(e)}\n")
+        return False
+
+
+if __name__ == "__main__":
+    success = create_snapshot(sys.argv[1] if len(sys.argv) > 1 else None)
+    sys.exit(0 if success else 1)
@@ -0,0 +1,5 @@
+"""Shared pytest setup: import the backend modules (config, services) from the tests."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
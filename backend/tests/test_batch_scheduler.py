@@ -0,0 +1,30 @@
+"""Tests for services.batch_scheduler.BatchScheduler."""
+import threading
+
+from services.batch_scheduler import BatchScheduler
+
+
+def test_prompts_of_another_profile_wait_for_the_next_batch():
+    started = threading.Event()
+    release = threading.Event()
+    batches = []
+
+    def generate_batch(prompts, limits, grammars, max_items, requests, profile):
+        batches.append((profile, prompts))
+        started.set()
+        release.wait(5)
+        return [prompt.upper() for prompt in prompts], len(prompts)
+
+    scheduler = BatchScheduler(generate_batch, max_batch_size=4, max_wait_ms=200)
+    first = scheduler.submit("a", 10, profile="fast-greedy")
+    other = scheduler.submit("b", 10, profile="creative")
+    second = scheduler.submit("c", 10, profile="fast-greedy")
+
+    assert started.wait(5)
+    # The creative prompt is set aside while the fast-greedy batch runs
+    assert scheduler.stats()["pending"] == 1
+
+    release.set()
+    assert (first.result(5), second.result(5), other.result(5)) == ("A", "C", "B")
+    assert batches == [("fast-greedy", ["a", "c"]), ("creative", ["b"])]
+    assert scheduler.stats()["pending"] == 0
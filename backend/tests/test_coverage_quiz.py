@@ -0,0 +1,88 @@
+"""Tests for quizzes over long documents (questions spread across segments, generated as one batch)."""
+import asyncio
+import json
+import threading
+
+import pytest
+
+from services.local_ai_service import GenerationResult, LocalAIService
+from services.result_cache import ResultCache
+
+SEGMENTS = [
+    "Le gage est un contrat par lequel le débiteur remet une chose mobilière au créancier.",
+    "L'hypothèque est un droit réel immobilier affecté à l'acquittement d'une obligation.",
+    "La prescription extinctive éteint l'action après l'écoulement d'un délai fixé par la loi.",
+]
+
+
+@pytest.fixture
+def service():
+    service = LocalAIService()
+    service.cache = ResultCache(max_entries=16)
+    yield service
+    service.shutdown()
+
+
+# Distinct words per row and item, so no question is a near-duplicate of another
+TOPICS = ["créancier gagiste", "inscription hypothécaire", "délai quinquennal"]
+ASPECTS = ["définition", "conditions", "effets", "preuve", "extinction"]
+
+
+def question(text: str) -> dict:
+    return {"question": text, "options": ["a", "b", "c", "d"], "correctIndex": 0, "explanation": "e"}
+
+
+def test_first_question_arrives_before_batch_finishes(service):
+    release = threading.Event()
+    finished = threading.Event()
+
+    def generate_batch(prompts, max_new_tokens, grammars=None, max_items=None, requests=None, profile=None,
+                       on_items=None):
+        # Row 0 completes its first question, then the batch keeps generating until released
+        on_items(0, [question("Qu'est-ce que le gage ?")])
+        release.wait(5)
+        finished.set()
+        texts = [json.dumps({"questions": [question(f"Quelle {ASPECTS[item]} pour {TOPICS[row]} ?")
+                                           for item in range(count)]})
+                 for row, count in enumerate(max_items)]
+        return [GenerationResult(text, 10, 20, 0.1) for text in texts], 20 * len(prompts)
+
+    service._generate_batch = generate_batch
+
+    async def run():
+        events = []
+        async for event, data in service._coverage_quiz("\n".join(SEGMENTS), SEGMENTS, 3, "fast-greedy"):
+            if event == "question" and not events:
+                # The batch is still running when the first question is sent
+                assert not finished.is_set()
+                release.set()
+            events.append((event, data))
+        return events
+
+    events = asyncio.run(run())
+    questions = [data for event, data in events if event == "question"]
+    assert questions[0]["question"] == "Qu'est-ce que le gage ?"
+    assert len(questions) == 3
+    assert [event for event, _ in events].count("progress") == 3
+    assert events[-1][0] == "done" and events[-1][1]["questions"] == questions
+
+
+def test_streamed_questions_are_not_repeated_from_the_final_output(service):
+    def generate_batch(prompts, max_new_tokens, grammars=None, max_items=None, requests=None, profile=None,
+                       on_items=None):
+        texts = []
+        for row, count in enumerate(max_items):
+            items = [question(f"Quelle {ASPECTS[item]} pour {TOPICS[row]} ?") for item in range(count)]
+            on_items(row, items[:1])
+            texts.append(json.dumps({"questions": items}))
+        return [GenerationResult(text, 10, 20, 0.1) for text in texts], 20 * len(prompts)
+
+    service._generate_batch = generate_batch
+
+    async def run():
+        return [data async for event, data in service._coverage_quiz("\n".join(SEGMENTS), SEGMENTS, 5, "fast-greedy")
+                if event == "question"]
+
+    questions = asyncio.run(run())
+    assert len(questions) == 5
+    assert len({q["question"] for q in questions}) == 5
@@ -0,0 +1,92 @@
+"""Tests for decoding profiles and how they interact with the result cache."""
+import asyncio
+import json
+
+import pytest
+
+from services.decoding_profiles import DECODING_PROFILES, resolve_profile
+from services.local_ai_service import GenerationResult, LocalAIService
+from services.result_cache import ResultCache
+
+
+@pytest.fixture
+def service():
+    service = LocalAIService()
+    service.cache = ResultCache(max_entries=16)
+    yield service
+    service.shutdown()
+
+
+def fake_batch(calls):
+    """Stand-in for _generate_batch returning a new question on every call."""
+    def generate_batch(prompts, max_new_tokens, grammars=None, max_items=None, requests=None, profile=None,
+                       on_items=None):
+        calls.append(profile)
+        results = []
+        for prompt in prompts:
+            question = {"question": f"Question {len(calls)} ?", "options": ["a", "b", "c", "d"],
+                        "correctIndex": 0, "explanation": "e"}
+            results.append(GenerationResult(json.dumps({"questions": [question]}), len(prompt), 20, 0.1))
+        return results, 20 * len(prompts)
+    return generate_batch
+
+
+def test_resolve_profile():
+    assert resolve_profile("creative") == "creative"
+    assert resolve_profile(None) in DECODING_PROFILES
+    with pytest.raises(Exception, match="Unknown decoding profile"):
+        resolve_profile("wild")
+
+
+def test_only_deterministic_profiles_have_cache_keys(service):
+    assert service._cache_key("quiz", "Le gage", "fast-greedy", num_questions=1)
+    assert service._cache_key("quiz", "Le gage", "balanced", num_questions=1) is None
+    assert service._cache_key("quiz", "Le gage", "creative", num_questions=1) is None
+
+
+def test_regenerating_with_creative_profile_gives_a_new_quiz(service):
+    calls = []
+    service._generate_batch = fake_batch(calls)
+    segments = [("Le gage est un contrat réel.", 1)]
+
+    async def run():
+        first = await service._generate_quiz_segments(segments, "creative")
+        second = await service._generate_quiz_segments(segments, "creative")
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert len(calls) == 2
+    assert first[0][0]["question"] != second[0][0]["question"]
+    assert service.cache.stats()["memory_entries"] == 0
+
+
+def test_fast_greedy_results_are_served_from_cache(service):
+    calls = []
+    service._generate_batch = fake_batch(calls)
+    segments = [("Le gage est un contrat réel.", 1)]
+
+    async def run():
+        first = await service._generate_quiz_segments(segments, "fast-greedy")
+        second = await service._generate_quiz_segments(segments, "fast-greedy")
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert calls == ["fast-greedy"]
+    assert first == second
+
+
+def test_default_profile_is_cached(service):
+    calls = []
+    service._generate_batch = fake_batch(calls)
+    segments = [("Le gage est un contrat réel.", 1)]
+    profile = resolve_profile(None)
+
+    async def run():
+        first = await service._generate_quiz_segments(segments, profile)
+        second = await service._generate_quiz_segments(segments, profile)
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert service._cache_key("summary", "Le gage", profile, max_new_tokens=300) is not None
+    assert len(calls) == 1
+    assert first == second
@@ -0,0 +1,123 @@
+"""Tests for services.inference_rpc: frame encoding and calls over a Unix socket."""
+import asyncio
+import socket
+
+import pytest
+
+from services.inference_rpc import (
+    FRAME_CALL, FRAME_HEADER, FRAME_RESULT, MAX_FRAME_BYTES,
+    InferenceServer, RemoteAIService, read_frame, write_frame,
+)
+
+
+class BufferWriter:
+    """Stand-in for asyncio.StreamWriter collecting the written bytes."""
+
+    def __init__(self):
+        self.data = b""
+
+    def write(self, data: bytes):
+        self.data += data
+
+    async def drain(self):
+        pass
+
+
+def reader_for(data: bytes) -> asyncio.StreamReader:
+    reader = asyncio.StreamReader()
+    reader.feed_data(data)
+    reader.feed_eof()
+    return reader
+
+
+def test_frame_round_trip():
+    async def run():
+        writer = BufferWriter()
+        await write_frame(writer, FRAME_CALL, {"method": "generate_quiz", "args": {"content": "Le bail é"}})
+        await write_frame(writer, FRAME_RESULT, {"value": None})
+
+        kind, length = FRAME_HEADER.unpack(writer.data[:FRAME_HEADER.size])
+        assert kind == FRAME_CALL
+        # Compact UTF-8 JSON payload
+        assert writer.data[FRAME_HEADER.size:FRAME_HEADER.size + length].decode("utf-8") == (
+            '{"method":"generate_quiz","args":{"content":"Le bail é"}}'
+        )
+
+        reader = reader_for(writer.data)
+        assert await read_frame(reader) == (FRAME_CALL, {"method": "generate_quiz", "args": {"content": "Le bail é"}})
+        assert await read_frame(reader) == (FRAME_RESULT, {"value": None})
+        with pytest.raises(asyncio.IncompleteReadError):
+            await read_frame(reader)
+
+    asyncio.run(run())
+
+
+def test_oversized_frame_is_refused():
+    async def run():
+        reader = reader_for(FRAME_HEADER.pack(FRAME_RESULT, MAX_FRAME_BYTES + 1))
+        with pytest.raises(Exception, match="exceeds"):
+            await read_frame(reader)
+
+    asyncio.run(run())
+
+
+def test_truncated_frame_raises_incomplete_read():
+    async def run():
+        reader = reader_for(FRAME_HEADER.pack(FRAME_RESULT, 20) + b'{"value"')
+        with pytest.raises(asyncio.IncompleteReadError):
+            await read_frame(reader)
+
+    asyncio.run(run())
+
+
+class FakeService:
+    """The parts of LocalAIService an inference server calls."""
+
+    def is_ready(self):
+        return True
+
+    def get_stats(self):
+        return {
+            "model": {"precision": "fp32", "tokens_per_sec": 0.0},
+            "loading": {"stage": "ready", "progress": 1.0, "elapsed_seconds": 0.0, "error": None},
+            "executor": {"queue_depth": 0, "in_flight": 0, "dropped": 0},
+        }
+
+    async def generate_quiz(self, content, num_questions=5, profile=None):
+        return [{"id": index + 1, "question": content} for index in range(num_questions)]
+
+    async def generate_summary(self, content, profile=None):
+        raise Exception("Model is not loaded")
+
+    async def stream_quiz(self, content, num_questions=5, profile=None):
+        for index in range(num_questions):
+            yield "question", {"id": index + 1}
+        yield "done", {"count": num_questions}
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="Unix sockets only")
+def test_calls_over_socket(tmp_path):
+    async def run():
+        path = str(tmp_path / "inference.sock")
+        server = InferenceServer(FakeService(), path)
+        await server.start()
+        client = RemoteAIService([path])
+        try:
+            client._status[path] = await client._call_server(path, "status", {})
+            assert client.is_ready()
+
+            assert await client.generate_quiz("Le gage", num_questions=2) == [
+                {"id": 1, "question": "Le gage"}, {"id": 2, "question": "Le gage"}
+            ]
+            events = [event async for event in client.stream_quiz("Le gage", num_questions=2)]
+            assert events == [("question", {"id": 1}), ("question", {"id": 2}), ("done", {"count": 2})]
+
+            # Errors raised by the service reach the caller with their message
+            with pytest.raises(Exception, match="Model is not loaded"):
+                await client.generate_summary("Le gage")
+            assert client._in_flight[path] == 0
+        finally:
+            server._server.close()
+            await server._server.wait_closed()
+
+    asyncio.run(run())
@@ -0,0 +1,134 @@
+"""Tests for services.jobs.JobStore."""
+import asyncio
+
+from services import jobs
+from services.jobs import JobStore
+from services.request_progress import current_progress
+from services.scheduler import GenerationRequest
+
+
+async def wait_done(job, timeout: float = 5.0):
+    """Let the event loop run until the job finishes."""
+    await asyncio.wait_for(job.task, timeout)
+
+
+def test_job_succeeds_and_reports_progress():
+    async def run():
+        store = JobStore(max_jobs=2)
+
+        async def generate():
+            current_progress.get().add_tokens(42)
+            return {"questions": [{"id": 1}]}
+
+        job = store.submit("quiz", generate)
+        assert job.status == "queued" and not job.done
+        await wait_done(job)
+
+        assert store.get(job.id) is job
+        assert job.status == "succeeded"
+        assert job.result == {"questions": [{"id": 1}]}
+        assert job.progress.tokens == 42
+        assert job.elapsed_seconds >= 0
+
+    asyncio.run(run())
+
+
+def test_job_failure_is_recorded():
+    async def run():
+        store = JobStore()
+
+        async def generate():
+            raise Exception("Failed to generate quiz")
+
+        job = store.submit("quiz", generate)
+        await wait_done(job)
+
+        assert job.status == "failed"
+        assert job.error == "Failed to generate quiz"
+        assert job.result is None
+
+    asyncio.run(run())
+
+
+def test_full_store_refuses_new_jobs_until_one_finishes():
+    async def run():
+        store = JobStore(max_jobs=2)
+        release = asyncio.Event()
+
+        async def generate():
+            await release.wait()
+            return "ok"
+
+        first = store.submit("summary", generate)
+        second = store.submit("summary", generate)
+        assert store.submit("summary", generate) is None
+        assert store.stats()["rejected"] == 1
+
+        release.set()
+        await wait_done(first)
+        await wait_done(second)
+
+        # Finished jobs make room for new ones, oldest first
+        third = store.submit("summary", generate)
+        assert third is not None
+        assert store.get(first.id) is None
+        assert store.get(second.id) is second
+        await wait_done(third)
+
+    asyncio.run(run())
+
+
+def test_finished_jobs_expire(monkeypatch):
+    async def run():
+        store = JobStore(ttl_seconds=60)
+
+        async def generate():
+            return "ok"
+
+        job = store.submit("quiz", generate)
+        await wait_done(job)
+
+        finished = job.finished
+        monkeypatch.setattr(jobs.time, "time", lambda: finished + 61)
+        assert store.get(job.id) is None
+        assert store.stats()["expired"] == 1
+
+    asyncio.run(run())
+
+
+def test_shutdown_cancels_unfinished_jobs():
+    async def run():
+        store = JobStore()
+        job = store.submit("quiz", lambda: asyncio.sleep(60))
+        await asyncio.sleep(0)
+
+        store.shutdown()
+        await asyncio.sleep(0)
+        assert job.task.cancelled()
+
+    asyncio.run(run())
+
+
+def test_job_is_queued_until_its_first_generation_starts():
+    async def run():
+        store = JobStore()
+        generation = GenerationRequest("a", "bulk")
+        release = asyncio.Event()
+
+        async def generate():
+            await release.wait()
+            return "ok"
+
+        job = store.submit("summary", generate, generation)
+        await asyncio.sleep(0)
+        # The job's coroutine runs, but its generation still waits for a worker
+        assert job.status == "queued"
+        assert job.elapsed_seconds == 0.0
+
+        generation.mark_started()
+        assert job.status == "running"
+        release.set()
+        await wait_done(job)
+        assert job.status == "succeeded"
+
+    asyncio.run(run())
@@ -0,0 +1,57 @@
+"""Tests for services.json_grammar.JSONGrammar."""
+import json
+
+from schemas import QuizResponse, SummaryResponse
+from services.json_grammar import JSONGrammar
+
+
+def quiz_grammar() -> JSONGrammar:
+    """The quiz grammar as the service compiles it."""
+    return JSONGrammar(
+        QuizResponse.model_json_schema(),
+        array_limits={"questions": (1, 2), "options": (4, 4)},
+        integer_ranges={"correctIndex": (0, 3)}
+    )
+
+
+def quiz(correct_index) -> str:
+    question = {"id": 1, "question": "Q ?", "options": ["a", "b", "c", "d"], "correctIndex": correct_index,
+                "explanation": "E", "explanationDarija": "D"}
+    return json.dumps({"questions": [question]})
+
+
+def accepts(grammar: JSONGrammar, text: str) -> bool:
+    return grammar.is_complete(grammar.feed(grammar.initial_state(), text))
+
+
+def test_matching_documents_are_accepted():
+    assert accepts(quiz_grammar(), quiz(2))
+    term = {"term": "t", "definition": "d", "definitionDarija": "D"}
+    summary = {"sections": [{"title": "T", "content": "C", "keyTerms": [term], "essentialPoints": ["P"]}]}
+    assert accepts(JSONGrammar(SummaryResponse.model_json_schema()), json.dumps(summary))
+
+
+def test_correct_index_is_limited_to_the_options():
+    grammar = quiz_grammar()
+    for index in range(4):
+        assert accepts(grammar, quiz(index))
+    for index in (4, 9, 10, 30, -1):
+        assert grammar.feed(grammar.initial_state(), quiz(index)) is None
+
+
+def test_out_of_range_digit_is_refused_as_it_is_typed():
+    grammar = quiz_grammar()
+    prefix = quiz(0)[:quiz(0).index('"correctIndex": ') + len('"correctIndex": ')]
+    state = grammar.feed(grammar.initial_state(), prefix)
+    assert grammar.feed(state, "3") is not None
+    assert grammar.feed(state, "4") is None
+    assert grammar.feed(state, "-") is None
+
+
+def test_schema_minimum_and_maximum_apply():
+    grammar = JSONGrammar({"type": "object", "properties": {"n": {"type": "integer", "minimum": 10, "maximum": 250}}})
+    assert accepts(grammar, '{"n": 10}') and accepts(grammar, '{"n": 250}')
+    assert not accepts(grammar, '{"n": 9}')
+    assert grammar.feed(grammar.initial_state(), '{"n": 3') is not None  # may still become 30-250
+    assert grammar.feed(grammar.initial_state(), '{"n": 26') is not None
+    assert grammar.feed(grammar.initial_state(), '{"n": 251') is None
@@ -0,0 +1,39 @@
+"""Tests for services.json_repair."""
+from services.json_repair import parse_json_tolerant
+
+
+def test_valid_json_inside_text_and_fences():
+    text = 'Voici le quiz:\n```json\n{"questions": [{"id": 1, "correctIndex": 2}]}\n```\nBonne chance!'
+    assert parse_json_tolerant(text) == {"questions": [{"id": 1, "correctIndex": 2}]}
+
+
+def test_no_object_returns_none():
+    assert parse_json_tolerant("Je ne peux pas répondre.") is None
+
+
+def test_trailing_and_missing_commas():
+    assert parse_json_tolerant('{"a": [1, 2, 3,], "b": 4,}') == {"a": [1, 2, 3], "b": 4}
+    assert parse_json_tolerant('{"a": 1 "b": [1 2]}') == {"a": 1, "b": [1, 2]}
+
+
+def test_single_quotes_unquoted_keys_and_python_literals():
+    assert parse_json_tolerant("{'term': 'Gage', valid: True, note: None}") == {
+        "term": "Gage", "valid": True, "note": None
+    }
+
+
+def test_escapes_and_raw_newlines_in_strings():
+    assert parse_json_tolerant('{"text": "ligne 1\nligne \\"2\\" \\u00e9"}') == {"text": 'ligne 1\nligne "2" é'}
+
+
+def test_truncated_output_keeps_complete_items():
+    text = '{"questions": [{"id": 1, "question": "Q1?"}, {"id": 2, "question": "Q2'
+    assert parse_json_tolerant(text) == {"questions": [{"id": 1, "question": "Q1?"}]}
+
+
+def test_truncated_scalar_is_dropped():
+    assert parse_json_tolerant('{"title": "Contrats", "count": 12') == {"title": "Contrats"}
+
+
+def test_mismatched_bracket_closes_object():
+    assert parse_json_tolerant('{"sections": [{"title": "A"]}') == {"sections": [{"title": "A"}]}
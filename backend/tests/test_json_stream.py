@@ -0,0 +1,124 @@
+"""Tests for services.json_stream."""
+import torch
+
+from services.json_stream import JSONItemScanner, JSONStoppingCriteria
+
+OUTPUT = (
+    'Voici: {"questions": [{"id": 1, "question": "Qu\'est-ce qu\'un {contrat} ?"}, '
+    "{'id': 2, 'question': 'Le gage [mobilier]',}, "
+    '{"id": 3, "question": "Q3'
+)
+
+
+def feed_in_pieces(scanner: JSONItemScanner, text: str, size: int):
+    """Feed text a few characters at a time, as tokens arrive."""
+    items = []
+    for start in range(0, len(text), size):
+        items.extend(scanner.feed(text[start:start + size]))
+    return items
+
+
+def test_items_are_yielded_as_they_complete():
+    scanner = JSONItemScanner()
+    first = scanner.feed(OUTPUT[:OUTPUT.index("}, ") + 1])
+    assert first == [{"id": 1, "question": "Qu'est-ce qu'un {contrat} ?"}]
+
+    rest = scanner.feed(OUTPUT[OUTPUT.index("}, ") + 1:])
+    # Braces and brackets inside strings don't end items; single quotes are repaired
+    assert rest == [{"id": 2, "question": "Le gage [mobilier]"}]
+    assert scanner.closed_at is None
+
+
+def test_chunk_size_does_not_matter():
+    whole = JSONItemScanner().feed(OUTPUT)
+    for size in (1, 3, 7):
+        assert feed_in_pieces(JSONItemScanner(), OUTPUT, size) == whole
+
+
+def test_result_salvages_truncated_document():
+    scanner = JSONItemScanner()
+    scanner.feed(OUTPUT)
+    assert [item["id"] for item in scanner.result()["questions"]] == [1, 2]
+
+
+def test_closing_bracket_is_recorded():
+    text = '{"sections": [{"title": "A"}]} et du texte en trop'
+    scanner = JSONItemScanner()
+    items = scanner.feed(text)
+
+    assert items == [{"title": "A"}]
+    assert text[:scanner.closed_at] == '{"sections": [{"title": "A"}]}'
+    assert text[:scanner.item_end] == '{"sections": [{"title": "A"}'
+
+
+def test_nested_objects_are_part_of_their_item():
+    scanner = JSONItemScanner()
+    items = scanner.feed('{"sections": [{"title": "A", "keyTerms": [{"term": "t"}]}, {"title": "B"}]}')
+    assert items == [{"title": "A", "keyTerms": [{"term": "t"}]}, {"title": "B"}]
+
+
+class CharTokenizer:
+    """Stand-in tokenizer: one token per character."""
+
+    eos_token_id = 0
+
+    def decode(self, tokens, skip_special_tokens=True, **kwargs):
+        return "".join(chr(token) for token in tokens.tolist() if token)
+
+
+def run_criteria(criteria: JSONStoppingCriteria, prompt: str, outputs: list) -> int:
+    """Generate the rows' outputs one character per step; return the steps taken."""
+    length = max(len(output) for output in outputs)
+    rows = [[ord(char) for char in prompt + output.ljust(length)] for output in outputs]
+    for step in range(1, length + 1):
+        input_ids = torch.tensor([row[:len(prompt) + step] for row in rows])
+        if criteria(input_ids, None):
+            return step
+    return length
+
+
+def test_stopping_criteria_reports_items_as_they_complete():
+    outputs = [
+        '{"questions": [{"q": "A"}, {"q": "B"}, {"q": "C"}]}',
+        '{"questions": [{"q": "D"}]} plus du texte',
+    ]
+    reported = []
+    criteria = JSONStoppingCriteria(CharTokenizer(), [200, 200], [2, 0], prompt_length=3,
+                                    on_items=lambda row, items: reported.append((row, items)))
+    run_criteria(criteria, "Q: ", outputs)
+
+    assert reported == [(0, [{"q": "A"}]), (1, [{"q": "D"}]), (0, [{"q": "B"}])]
+    # Row 0 stops after its two items, row 1 when its object closes
+    assert criteria.outputs == ['{"questions": [{"q": "A"}, {"q": "B"}]}', '{"questions": [{"q": "D"}]}']
+
+
+class ByteTokenizer:
+    """Stand-in byte-level tokenizer: one token per UTF-8 byte, counting the tokens it decodes."""
+
+    eos_token_id = 0
+
+    def __init__(self):
+        self.decoded = 0
+
+    def encode(self, text: str) -> list:
+        return [byte + 1 for byte in text.encode("utf-8")]
+
+    def decode(self, tokens, skip_special_tokens=True, **kwargs):
+        self.decoded += len(tokens)
+        return bytes(token - 1 for token in tokens.tolist() if token).decode("utf-8", errors="replace")
+
+
+def test_stopping_criteria_decodes_only_new_tokens():
+    tokenizer = ByteTokenizer()
+    output = '{"sections": [{"title": "L\'hypothèque — droit réel ✓"}, {"title": "' + "x" * 400 + '"}]}'
+    tokens = tokenizer.encode(output)
+    criteria = JSONStoppingCriteria(tokenizer, [1000], [0], prompt_length=0)
+
+    for step in range(1, len(tokens) + 1):
+        if criteria(torch.tensor([tokens[:step]]), None):
+            break
+
+    # Characters split over several tokens come out whole
+    assert criteria.outputs == [output]
+    # Each step decodes a few tokens, not the whole output again
+    assert tokenizer.decoded < 6 * len(tokens)
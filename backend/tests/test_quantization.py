@@ -0,0 +1,35 @@
+"""Tests for services.quantization.Int4Linear."""
+import torch
+import torch.nn as nn
+
+from services.quantization import Int4Linear
+
+
+def test_int4_layer_is_close_to_float():
+    torch.manual_seed(0)
+    linear = nn.Linear(300, 64)
+    layer = Int4Linear.from_float(linear)
+    x = torch.randn(2, 300)
+
+    error = (layer(x) - linear(x)).abs().max() / linear(x).abs().max()
+    assert error < 0.2
+
+
+def test_dequantized_weight_is_cached_outside_the_state_dict():
+    layer = Int4Linear.from_float(nn.Linear(256, 32))
+    layer.cache_weight = True
+    x = torch.randn(1, 256)
+
+    first = layer(x)
+    cached = layer._weight
+    assert cached is not None
+    assert torch.equal(layer(x), first)
+    assert layer._weight is cached
+    assert set(layer.state_dict()) == {"packed_weight", "scales", "bias"}
+
+
+def test_uncached_layer_dequantizes_every_pass():
+    layer = Int4Linear.from_float(nn.Linear(256, 32))
+    layer.cache_weight = False
+    layer(torch.randn(1, 256))
+    assert layer._weight is None
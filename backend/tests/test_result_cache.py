@@ -0,0 +1,83 @@
+"""Tests for services.result_cache."""
+from services import result_cache
+from services.result_cache import DiskCache, ResultCache, make_cache_key
+
+
+def test_cache_key_is_stable_and_order_independent():
+    key = make_cache_key(kind="quiz", content="texte", params={"do_sample": False, "top_p": 1})
+    assert key == make_cache_key(params={"top_p": 1, "do_sample": False}, content="texte", kind="quiz")
+    assert key != make_cache_key(kind="quiz", content="texte modifié", params={"do_sample": False, "top_p": 1})
+
+
+def test_disk_cache_round_trip(tmp_path):
+    cache = DiskCache(str(tmp_path / "cache" / "results.sqlite3"), max_bytes=10_000, ttl_seconds=60)
+    cache.set("a", {"questions": [{"id": 1, "question": "Qu'est-ce qu'un bail ?"}]})
+
+    assert cache.get("a") == {"questions": [{"id": 1, "question": "Qu'est-ce qu'un bail ?"}]}
+    assert cache.get("missing") is None
+    assert cache.stats()["entries"] == 1
+
+
+def test_disk_cache_persists_across_instances(tmp_path):
+    path = str(tmp_path / "results.sqlite3")
+    DiskCache(path, max_bytes=10_000, ttl_seconds=60).set("a", [1, 2, 3])
+    assert DiskCache(path, max_bytes=10_000, ttl_seconds=60).get("a") == [1, 2, 3]
+
+
+def test_disk_cache_expires_entries(tmp_path, monkeypatch):
+    cache = DiskCache(str(tmp_path / "results.sqlite3"), max_bytes=10_000, ttl_seconds=60)
+    cache.set("a", "value")
+
+    now = result_cache.time.time()
+    monkeypatch.setattr(result_cache.time, "time", lambda: now + 61)
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_disk_cache_evicts_least_recently_used(tmp_path):
+    cache = DiskCache(str(tmp_path / "results.sqlite3"), max_bytes=25, ttl_seconds=60)
+    cache.set("a", "x" * 8)
+    cache.set("b", "y" * 8)
+    cache.get("a")
+    cache.set("c", "z" * 8)
+
+    assert cache.get("a") == "x" * 8
+    assert cache.get("b") is None
+    assert cache.get("c") == "z" * 8
+    # Values larger than the whole budget are not stored
+    cache.set("big", "w" * 100)
+    assert cache.get("big") is None
+
+
+def test_result_cache_serves_disk_hits_from_memory(tmp_path):
+    path = str(tmp_path / "results.sqlite3")
+    ResultCache(max_entries=4, disk_path=path).set("a", {"sections": []})
+
+    cache = ResultCache(max_entries=4, disk_path=path)
+    assert cache.get("a") == {"sections": []}
+    cache.disk = None
+    assert cache.get("a") == {"sections": []}
+    assert cache.stats()["hits"] == 2 and cache.stats()["disk_hits"] == 1
+
+
+def test_result_cache_memory_lru():
+    cache = ResultCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+
+
+def test_uncacheable_key_and_disabled_cache():
+    cache = ResultCache(max_entries=2)
+    cache.set(None, "sampled")
+    assert cache.get(None) is None
+    assert cache.stats()["memory_entries"] == 0
+
+    disabled = ResultCache(max_entries=0)
+    disabled.set("a", 1)
+    assert disabled.get("a") is None
+    assert not disabled.enabled
@@ -0,0 +1,107 @@
+"""Tests for services.scheduler."""
+import gc
+import time
+
+import pytest
+
+from services import scheduler
+from services.scheduler import AdmittedRequests, FairQueue, GenerationRequest, current_request, track_request
+
+
+def drain(queue: FairQueue):
+    """Pop every item, in serving order."""
+    items = []
+    while len(queue):
+        _, item = queue.pop()
+        items.append(item)
+    return items
+
+
+def test_interactive_before_bulk():
+    queue = FairQueue()
+    queue.push("summary", GenerationRequest("a", "bulk"))
+    queue.push("quiz", GenerationRequest("b", "interactive"))
+    queue.push("anonymous", None)
+
+    assert drain(queue) == ["quiz", "anonymous", "summary"]
+    assert queue.pop() is None
+
+
+def test_clients_take_turns_within_a_class():
+    queue = FairQueue()
+    busy, other = GenerationRequest("busy", "bulk"), GenerationRequest("other", "bulk")
+    for index in range(3):
+        queue.push(f"busy-{index}", busy)
+    queue.push("other-0", other)
+
+    assert queue.clients() == ["busy", "other"]
+    assert queue.depth_by_priority() == {"interactive": 0, "bulk": 4}
+    assert drain(queue) == ["busy-0", "other-0", "busy-1", "busy-2"]
+
+
+def test_starving_bulk_item_is_promoted(monkeypatch):
+    queue = FairQueue()
+    queue.push("old summary", GenerationRequest("a", "bulk"))
+    queue.push("quiz", GenerationRequest("b", "interactive"))
+
+    now = time.time()
+    monkeypatch.setattr(scheduler.time, "time", lambda: now + scheduler.PROMOTION_SECONDS + 1)
+    assert queue.pop()[1] == "old summary"
+
+
+def test_remove_takes_item_out():
+    queue = FairQueue()
+    request = GenerationRequest("a")
+    first, second = object(), object()
+    queue.push(first, request)
+    queue.push(second, request)
+
+    assert queue.remove(first)
+    assert not queue.remove(first)
+    assert len(queue) == 1
+    assert queue.pop() == (request, second)
+    assert queue.clients() == []
+
+
+def test_drop_reasons():
+    request = GenerationRequest("a", deadline_seconds=0.01)
+    assert request.drop_reason() is None
+
+    time.sleep(0.02)
+    assert request.drop_reason() == "deadline passed"
+
+    # Once a generation ran, follow-up generations are not dropped for the deadline
+    request.started = True
+    assert request.drop_reason() is None
+
+    request.abandon()
+    assert request.drop_reason() == "client disconnected"
+
+
+def test_unknown_priority_is_rejected():
+    with pytest.raises(Exception, match="Unknown priority class"):
+        GenerationRequest("a", "urgent")
+
+
+def test_track_request_sets_current_request():
+    request = GenerationRequest("a")
+    with track_request(request):
+        assert current_request.get() is request
+    assert current_request.get() is None
+
+
+def test_admitted_requests_count_until_finished():
+    admitted = AdmittedRequests()
+    quiz, summary = GenerationRequest("a", "interactive"), GenerationRequest("b", "bulk")
+    admitted.add(quiz)
+    admitted.add(summary)
+    assert (admitted.count(), admitted.count("bulk")) == (2, 1)
+
+    with track_request(summary):
+        pass
+    assert (admitted.count(), admitted.count("bulk")) == (1, 0)
+
+    # A request dropped without running (e.g. its stream never started) stops counting
+    del quiz
+    gc.collect()
+    assert admitted.count() == 0
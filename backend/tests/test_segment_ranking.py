@@ -0,0 +1,43 @@
+"""Tests for services.segment_ranking."""
+from services.segment_ranking import allocate_questions, is_duplicate_question, rank_segments, tokenize_words
+
+
+def test_tokenize_words_drops_stopwords_and_short_words():
+    assert tokenize_words("Les contrats de vente sont dans le Code 2024") == ["contrats", "vente", "code"]
+
+
+def test_boilerplate_ranks_below_dense_segments():
+    header = "Université Hassan II - Faculté de Droit - Cours de droit civil"
+    segments = [
+        header,
+        header + "\nLe gage est un contrat par lequel le débiteur remet une chose mobilière au créancier.",
+        header,
+        header + "\nL'hypothèque est un droit réel immobilier affecté à l'acquittement d'une obligation.",
+        "",
+    ]
+    scores = rank_segments(segments)
+
+    assert len(scores) == len(segments)
+    assert scores[1] > scores[0] and scores[3] > scores[2]
+    assert scores[4] == 0.0
+
+
+def test_allocate_questions_spreads_over_best_segments():
+    scores = [0.1, 0.9, 0.5, 0.8, 0.2]
+    allocation = allocate_questions(scores, num_questions=5, max_segments=3)
+
+    assert allocation == {1: 2, 2: 1, 3: 2}
+    assert list(allocation) == sorted(allocation)
+
+
+def test_allocate_questions_with_fewer_questions_than_segments():
+    assert allocate_questions([0.3, 0.7, 0.5], num_questions=1, max_segments=5) == {1: 1}
+    assert allocate_questions([0.3], num_questions=4, max_segments=5) == {0: 4}
+
+
+def test_duplicate_questions_are_detected():
+    kept = ["Qu'est-ce que le gage en droit civil marocain ?"]
+
+    assert is_duplicate_question("Qu'est-ce que le gage en droit civil marocain?", kept)
+    assert not is_duplicate_question("Quelle est la durée de prescription de l'action en nullité ?", kept)
+    assert not is_duplicate_question("Qu'est-ce que le gage ?", [])
@@ -0,0 +1,70 @@
+"""Tests for summaries of long documents (chunked map-reduce)."""
+import asyncio
+import time
+
+import pytest
+
+from config import settings
+from services.local_ai_service import LocalAIService
+from services.result_cache import ResultCache
+
+
+@pytest.fixture
+def service():
+    service = LocalAIService()
+    service.cache = ResultCache(max_entries=16)
+    yield service
+    service.shutdown()
+
+
+def test_map_calls_are_queued_a_few_at_a_time(service):
+    running = 0
+    most_running = 0
+
+    async def summarize_chunk(chunk, profile):
+        nonlocal running, most_running
+        running += 1
+        most_running = max(most_running, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return [{"title": chunk, "content": chunk, "keyTerms": [], "essentialPoints": []}]
+
+    service._summarize_chunk = summarize_chunk
+    chunks = [f"Chapitre {index}" for index in range(12)]
+
+    async def run():
+        return [event async for event in service._map_reduce_summary("\n".join(chunks), chunks, "fast-greedy")]
+
+    events = asyncio.run(run())
+    assert most_running == max(1, settings.inference_workers, settings.batch_max_size)
+    assert [event for event, _ in events].count("progress") == len(chunks)
+    assert events[-1][0] == "done"
+
+
+def test_chunking_does_not_block_the_event_loop(service):
+    def slow_tokenizer(text, add_special_tokens=False):
+        time.sleep(0.002)
+        return {"input_ids": text.split()}
+
+    service.tokenizer = slow_tokenizer
+    document = "\n".join(f"Article {index}: le contrat de bail est conclu pour une durée déterminée"
+                         for index in range(100))
+
+    async def run():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.ensure_future(tick())
+        chunks = await service._chunk_content(document, max_tokens=120)
+        ticker.cancel()
+        return chunks, ticks
+
+    chunks, ticks = asyncio.run(run())
+    assert len(chunks) > 1
+    # Other coroutines kept running while the document was tokenized (about 0.2 seconds)
+    assert ticks >= 5
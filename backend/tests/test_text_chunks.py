@@ -0,0 +1,82 @@
+"""Tests for services.text_chunks."""
+import random
+
+from services.text_chunks import chunk_text, select_stable
+
+
+def count_words(text: str) -> int:
+    """Stand-in tokenizer: one token per word."""
+    return len(text.split())
+
+
+def make_document(lines: int = 400, seed: int = 0) -> str:
+    """Document of varied lines, like cleaned PDF text."""
+    rng = random.Random(seed)
+    words = ["contrat", "obligation", "vente", "bail", "hypothèque", "gage", "créancier",
+             "débiteur", "nullité", "preuve", "dommage", "responsabilité", "clause", "délai"]
+    return "\n".join(
+        f"Article {index}: " + " ".join(rng.choice(words) for _ in range(rng.randint(3, 25)))
+        for index in range(lines)
+    )
+
+
+def test_chunks_respect_budget_and_keep_all_text():
+    text = make_document()
+    chunks = chunk_text(text, count_words, max_tokens=120)
+
+    assert len(chunks) > 1
+    # Each line is counted with one extra token for its newline
+    assert all(count_words(chunk) + chunk.count("\n") + 1 <= 120 for chunk in chunks)
+    assert "\n".join(chunks).split() == text.split()
+
+
+def test_long_line_is_split_between_words():
+    line = " ".join(f"mot{index}" for index in range(250))
+    chunks = chunk_text(line, count_words, max_tokens=100)
+
+    assert len(chunks) == 3
+    assert all(count_words(chunk) <= 100 for chunk in chunks)
+    assert " ".join(chunks) == line
+
+
+def test_blank_lines_are_dropped():
+    assert chunk_text("\n\n  un  \n\n deux \n", count_words, max_tokens=50) == ["un\ndeux"]
+    assert chunk_text("", count_words, max_tokens=50) == []
+
+
+def test_edit_only_changes_nearby_chunks():
+    lines = make_document().split("\n")
+    before = chunk_text("\n".join(lines), count_words, max_tokens=120)
+
+    edited = lines[:50] + ["Note ajoutée: le vendeur garantit les vices cachés de la chose vendue."] + lines[50:]
+    after = chunk_text("\n".join(edited), count_words, max_tokens=120)
+
+    # Boundaries are picked by line content, so chunks after the edit realign
+    changed = set(after) - set(before)
+    assert 1 <= len(changed) <= 3
+    assert after[-10:] == before[-10:]
+
+
+def test_select_stable_keeps_document_order():
+    chunks = [f"chunk {index}" for index in range(20)]
+    selected = select_stable(chunks, 5)
+
+    assert len(selected) == 5
+    assert selected == [chunk for chunk in chunks if chunk in selected]
+
+
+def test_select_stable_limit_zero_keeps_all():
+    chunks = ["a", "b", "c"]
+    assert select_stable(chunks, 0) == chunks
+    assert select_stable(chunks, 10) == chunks
+
+
+def test_select_stable_survives_edits():
+    chunks = [f"chunk {index}" for index in range(30)]
+    selected = select_stable(chunks, 8)
+
+    # Inserting or removing other chunks doesn't change which of the remaining ones are picked
+    edited = chunks[:10] + ["new chunk"] + chunks[10:]
+    kept = [chunk for chunk in select_stable(edited, 8) if chunk != "new chunk"]
+    assert set(kept) <= set(selected)
+    assert len(set(selected) - set(kept)) <= 1
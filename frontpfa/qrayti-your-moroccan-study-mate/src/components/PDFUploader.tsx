@@ -3,7 +3,7 @@ import { motion } from "framer-motion";
 import { Upload, FileText, Loader2, AlertCircle, CheckCircle, Wifi, WifiOff } from "lucide-react";
 import { Button } from "@/components/ui/button";
 import { ContentData } from "./AppSection";
-import { uploadPDF } from "@/services/api";
+import { uploadPDFStream } from "@/services/api";
 import { checkBackendConnection } from "@/utils/checkBackend";
 
 interface PDFUploaderProps {
@@ -13,6 +13,7 @@ interface PDFUploaderProps {
 const PDFUploader = ({ onFileProcessed }: PDFUploaderProps) => {
   const [isDragging, setIsDragging] = useState(false);
   const [isProcessing, setIsProcessing] = useState(false);
+  const [progress, setProgress] = useState<{ page: number; totalPages: number } | null>(null);
   const [error, setError] = useState<string | null>(null);
   const [backendStatus, setBackendStatus] = useState<{
     isConnected: boolean;
@@ -49,6 +50,7 @@ const PDFUploader = ({ onFileProcessed }: PDFUploaderProps) => {
 
   const processFile = async (file: File) => {
     setIsProcessing(true);
+    setProgress(null);
     setError(null);
 
     try {
@@ -69,8 +71,10 @@ const PDFUploader = ({ onFileProcessed }: PDFUploaderProps) => {
       // Show size info
       console.log(`Processing PDF: ${file.name} (${(file.size / 1024 / 1024).toFixed(2)} MB)`);
 
-      // Upload PDF to backend and extract text
-      const data = await uploadPDF(file);
+      // Upload PDF to backend and extract text, page by page
+      const data = await uploadPDFStream(file, (page, totalPages) =>
+        setProgress({ page, totalPages })
+      );
 
       onFileProcessed(data);
     } catch (err) {
@@ -213,7 +217,9 @@ const PDFUploader = ({ onFileProcessed }: PDFUploaderProps) => {
               Extraction du texte en cours...
             </p>
             <p className="text-sm text-muted-foreground">
-              Cela prend généralement 5-20 secondes
+              {progress
+                ? `Page ${progress.page} / ${progress.totalPages}`
+                : "Cela prend généralement 5-20 secondes"}
             </p>
             <div className="flex items-center justify-center gap-2">
               {[0, 1, 2].map((i) => (
@@ -12,7 +12,7 @@ import {
   Brain,
   AlertCircle,
 } from "lucide-react";
-import { generateQuiz } from "@/services/api";
+import { streamQuiz } from "@/services/api";
 
 interface QuizModeProps {
   content: string;
@@ -38,6 +38,7 @@ const QuizMode = ({ content, pages }: QuizModeProps) => {
   const [isComplete, setIsComplete] = useState(false);
   const [answers, setAnswers] = useState<(number | null)[]>([]);
   const [error, setError] = useState<string | null>(null);
+  const [isStreaming, setIsStreaming] = useState(false);
 
   useEffect(() => {
     const loadQuiz = async () => {
@@ -45,8 +46,13 @@ const QuizMode = ({ content, pages }: QuizModeProps) => {
       setError(null);
       
       try {
-        // Generate quiz using AI backend
-        const response = await generateQuiz(content, 5);
+        // Generate quiz using AI backend, showing questions as they arrive
+        setQuestions([]);
+        setIsStreaming(true);
+        const response = await streamQuiz(content, 5, (question) => {
+          setQuestions((prev) => [...prev, question]);
+          setIsLoading(false);
+        });
         
         if (response.questions && response.questions.length > 0) {
           setQuestions(response.questions);
@@ -59,6 +65,7 @@ const QuizMode = ({ content, pages }: QuizModeProps) => {
         setError(err instanceof Error ? err.message : "Failed to generate quiz");
       } finally {
         setIsLoading(false);
+        setIsStreaming(false);
       }
     };
 
@@ -85,7 +92,7 @@ const QuizMode = ({ content, pages }: QuizModeProps) => {
       setCurrentIndex((prev) => prev + 1);
       setSelectedAnswer(null);
       setShowExplanation(false);
-    } else {
+    } else if (!isStreaming) {
       setIsComplete(true);
     }
   };
@@ -397,8 +404,8 @@ const QuizMode = ({ content, pages }: QuizModeProps) => {
 
               {/* Next Button */}
               <div className="pt-4">
-                <Button variant="hero" onClick={handleNext} className="w-full">
-                  {currentIndex < questions.length - 1 ? (
+                <Button variant="hero" onClick={handleNext} className="w-full" disabled={isStreaming && currentIndex >= questions.length - 1}>
+                  {currentIndex < questions.length - 1 || isStreaming ? (
                     <>
                       Question suivante
                       <ArrowRight className="w-5 h-5" />
@@ -14,7 +14,7 @@ import {
   AlertCircle,
   RefreshCw,
 } from "lucide-react";
-import { generateSummary } from "@/services/api";
+import { streamSummary } from "@/services/api";
 
 interface ResumeModeProps {
   content: string;
@@ -41,8 +41,12 @@ const ResumeMode = ({ content, pages }: ResumeModeProps) => {
       setError(null);
       
       try {
-        // Generate summary using AI backend
-        const response = await generateSummary(content);
+        // Generate summary using AI backend, showing sections as they arrive
+        setSummary([]);
+        const response = await streamSummary(content, (section) => {
+          setSummary((prev) => [...prev, section]);
+          setIsLoading(false);
+        });
         
         if (response.sections && response.sections.length > 0) {
           setSummary(response.sections);
@@ -236,6 +236,182 @@ export async function generateSummary(content: string): Promise<SummaryResponse>
   }
 }
 
+type StreamEventHandler = (event: string, data: any) => void;
+
+/**
+ * POST to a Server-Sent Events endpoint and dispatch each event as it arrives.
+ * The timeout is reset every time data is received, so long generations are
+ * fine as long as the server keeps producing tokens or its keep-alive comments.
+ */
+async function postEventStream(
+  path: string,
+  body: unknown,
+  onEvent: StreamEventHandler,
+  idleTimeoutMs: number = 60000
+): Promise<void> {
+  const controller = new AbortController();
+  let timeoutId = setTimeout(() => controller.abort(), idleTimeoutMs);
+  const resetTimeout = () => {
+    clearTimeout(timeoutId);
+    timeoutId = setTimeout(() => controller.abort(), idleTimeoutMs);
+  };
+
+  try {
+    // FormData sets its own multipart Content-Type
+    const isForm = body instanceof FormData;
+    const response = await fetch(`${API_BASE_URL}${path}`, {
+      method: 'POST',
+      headers: isForm
+        ? { Accept: 'text/event-stream' }
+        : { 'Content-Type': 'application/json', Accept: 'text/event-stream' },
+      body: isForm ? body : JSON.stringify(body),
+      signal: controller.signal,
+    });
+
+    if (!response.ok || !response.body) {
+      const error = await response.json().catch(() => ({ detail: 'Generation failed' }));
+      throw new Error(error.detail || 'Generation failed');
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+
+    while (true) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      resetTimeout();
+
+      buffer += decoder.decode(value, { stream: true });
+      const messages = buffer.split('\n\n');
+      buffer = messages.pop() ?? '';
+
+      for (const message of messages) {
+        let event = 'message';
+        let data = '';
+        for (const line of message.split('\n')) {
+          if (line.startsWith('event: ')) event = line.slice(7);
+          else if (line.startsWith('data: ')) data += line.slice(6);
+        }
+        if (!data) continue;
+
+        const parsed = JSON.parse(data);
+        if (event === 'error') {
+          throw new Error(parsed.detail || 'Generation failed');
+        }
+        onEvent(event, parsed);
+      }
+    }
+  } catch (error) {
+    if (error instanceof Error && error.name === 'AbortError') {
+      throw new Error(
+        `No response from the server for ${idleTimeoutMs / 1000} seconds. ` +
+        'Please check backend logs and restart the server if needed.'
+      );
+    }
+
+    if (error instanceof TypeError && error.message.includes('fetch')) {
+      throw new Error(
+        `Cannot connect to backend at ${API_BASE_URL}. ` +
+        'Make sure the server is running: cd backend && python main.py'
+      );
+    }
+
+    throw error;
+  } finally {
+    clearTimeout(timeoutId);
+  }
+}
+
+/**
+ * Upload a PDF and receive its text page by page as the server extracts it
+ */
+export async function uploadPDFStream(
+  file: File,
+  onProgress?: (page: number, totalPages: number) => void
+): Promise<UploadPDFResponse> {
+  console.log('📤 Streaming PDF upload:', file.name, `(${(file.size / 1024 / 1024).toFixed(2)} MB)`);
+
+  const MAX_SIZE = 50 * 1024 * 1024; // 50MB
+  if (file.size > MAX_SIZE) {
+    throw new Error(`File too large. Maximum size is 50MB. Your file is ${(file.size / 1024 / 1024).toFixed(2)}MB`);
+  }
+
+  const formData = new FormData();
+  formData.append('file', file);
+
+  const pages: string[] = [];
+  let result: UploadPDFResponse | null = null;
+  await postEventStream('/api/upload-pdf/stream', formData, (event, data) => {
+    if (event === 'page') {
+      if (data.text) pages.push(data.text);
+      onProgress?.(data.page, data.totalPages);
+    } else if (event === 'done') {
+      result = { fileName: data.fileName, content: pages.join('\n'), pageCount: data.pageCount };
+    }
+  });
+
+  if (!result) {
+    throw new Error('Upload ended before the PDF was fully processed');
+  }
+
+  console.log('✅ Upload successful:', file.name, `(${pages.length} pages with text)`);
+  return result;
+}
+
+/**
+ * Generate a quiz, receiving each question as soon as the model finishes it
+ */
+export async function streamQuiz(
+  content: string,
+  numQuestions: number = 5,
+  onQuestion?: (question: QuizQuestion) => void
+): Promise<QuizResponse> {
+  console.log('🧠 Streaming quiz, content length:', content.length, 'questions:', numQuestions);
+
+  let result: QuizResponse = { questions: [] };
+  await postEventStream(
+    '/api/generate-quiz/stream',
+    { content, num_questions: numQuestions },
+    (event, data) => {
+      if (event === 'question') {
+        onQuestion?.(data);
+      } else if (event === 'done') {
+        result = data;
+      }
+    }
+  );
+
+  console.log('✅ Quiz streamed:', result.questions?.length, 'questions');
+  return result;
+}
+
+/**
+ * Generate a summary, receiving each section as soon as the model finishes it
+ */
+export async function streamSummary(
+  content: string,
+  onSection?: (section: SummarySection) => void
+): Promise<SummaryResponse> {
+  console.log('🧠 Streaming summary, content length:', content.length);
+
+  let result: SummaryResponse = { sections: [] };
+  await postEventStream(
+    '/api/generate-summary/stream',
+    { content },
+    (event, data) => {
+      if (event === 'section') {
+        onSection?.(data);
+      } else if (event === 'done') {
+        result = data;
+      }
+    }
+  );
+
+  console.log('✅ Summary streamed:', result.sections?.length, 'sections');
+  return result;
+}
+
 /**
  * Check if the backend is healthy and ready
  */